@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+# Serves the REST API and the lesson progress streams (SSE), e.g.
+#   uvicorn config.asgi:application --workers 2
+application = get_asgi_application()
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv(os.path.join(Path(__file__).resolve().parents[1], '..', '.env'))
 
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
     'users',
+    'lessons',
 ]
 
 MIDDLEWARE = [
@@ -109,17 +111,100 @@ else:
     CORS_ALLOWED_ORIGINS = []
     CORS_ALLOW_ALL_ORIGINS = False
 
+# JWT_AUTH_MODE=cached resolves the token's user from the `auth` cache
+# (users.authentication); `db` loads it from the database on every request.
+JWT_AUTH_MODE = os.environ.get('JWT_AUTH_MODE', 'db')
+_JWT_AUTH_CLASSES = {
+    'cached': 'users.authentication.CachedJWTAuthentication',
+    'db': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+}
+if JWT_AUTH_MODE not in _JWT_AUTH_CLASSES:
+    raise ImproperlyConfigured(
+        f"JWT_AUTH_MODE must be one of {', '.join(_JWT_AUTH_CLASSES)}, not {JWT_AUTH_MODE!r}."
+    )
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        _JWT_AUTH_CLASSES[JWT_AUTH_MODE],
     ),
 }
 
-from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+# The user cache must be shared for invalidations (deactivation, password
+# change) to reach every API process, so the cached mode needs Redis
+# (AUTH_CACHE_REDIS_URL) in production. Development falls back to an
+# in-process cache with a short TTL: another process may serve a stale
+# user for up to AUTH_USER_CACHE_SECONDS.
+_auth_cache_redis = os.environ.get('AUTH_CACHE_REDIS_URL', '')
+if JWT_AUTH_MODE == 'cached' and not DEBUG and not _auth_cache_redis:
+    raise ImproperlyConfigured(
+        'JWT_AUTH_MODE=cached needs a shared cache in production: set AUTH_CACHE_REDIS_URL '
+        '(e.g. redis://localhost:6379/1) or use JWT_AUTH_MODE=db.'
+    )
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': _auth_cache_redis,
+    } if _auth_cache_redis else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+AUTH_USER_CACHE_ALIAS = 'auth'
+AUTH_USER_CACHE_SECONDS = int(os.environ.get('AUTH_USER_CACHE_SECONDS', 300 if _auth_cache_redis else 30))
 
+# Don't import rest_framework_simplejwt.settings here: it reads SIMPLE_JWT
+# once at import time, before this dict exists, and would ignore it.
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_MINUTES', 15))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.environ.get('REFRESH_TOKEN_DAYS', 7))),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Blacklisted JTIs are answered from the `auth` cache (users.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CachedTokenRefreshSerializer',
 }
+
+# `manage.py prune_tokens` deletes expired outstanding/blacklisted tokens in
+# batches of this many rows, each in its own short transaction.
+TOKEN_PRUNE_BATCH_SIZE = int(os.environ.get('TOKEN_PRUNE_BATCH_SIZE', 5000))
+
+# Bulk registration (`/api/auth/register/bulk/`, `manage.py bulk_register`)
+BULK_REGISTER_MAX_ROWS = int(os.environ.get('BULK_REGISTER_MAX_ROWS', 5000))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
+# Lesson generation workers (see `manage.py run_lesson_workers`)
+BLINKED_AI_DIR = os.environ.get('BLINKED_AI_DIR', str(BASE_DIR.parents[1] / 'ai'))
+LESSON_WORKERS = int(os.environ.get('LESSON_WORKERS', 2))
+LESSON_WORKER_EXECUTOR = os.environ.get('LESSON_WORKER_EXECUTOR', 'lessons.worker.run_lesson_pipeline')
+LESSON_WORKER_WARMUP = os.environ.get('LESSON_WORKER_WARMUP', '1') == '1'
+LESSON_WORKER_POLL_SECONDS = float(os.environ.get('LESSON_WORKER_POLL_SECONDS', 1.0))
+# Workers bump a running job's heartbeat this often; a job without one for
+# LESSON_JOB_TIMEOUT_SECONDS is requeued (jobs of workers that exit are
+# requeued right away by run_lesson_workers)
+LESSON_JOB_HEARTBEAT_SECONDS = float(os.environ.get('LESSON_JOB_HEARTBEAT_SECONDS', 30))
+LESSON_JOB_TIMEOUT_SECONDS = int(os.environ.get('LESSON_JOB_TIMEOUT_SECONDS', 300))
+LESSON_SIMULATED_SECONDS = float(os.environ.get('LESSON_SIMULATED_SECONDS', 2.0))
+
+# Lesson progress streams (SSE, served by config.asgi)
+LESSON_EVENTS_POLL_SECONDS = float(os.environ.get('LESSON_EVENTS_POLL_SECONDS', 0.5))
+LESSON_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('LESSON_EVENTS_HEARTBEAT_SECONDS', 15))
+# Each SSE response ends after this long and the client reconnects with
+# Last-Event-ID (nothing is missed). Django 4.2 never tells a streaming
+# response that its client went away, so this cap is what frees the broker
+# subscription and heartbeats of an abandoned connection.
+LESSON_EVENTS_MAX_SECONDS = int(os.environ.get('LESSON_EVENTS_MAX_SECONDS', 120))
+LESSON_EVENTS_RETENTION_SECONDS = int(os.environ.get('LESSON_EVENTS_RETENTION_SECONDS', 86400))
+
+# Metrics (`GET /metrics`, Prometheus text format). Lesson workers write a
+# snapshot of their AI pipeline metrics here every METRICS_FLUSH_SECONDS;
+# the endpoint merges them. Set METRICS_TOKEN to require
+# `Authorization: Bearer <token>` from the scraper. Without a token the
+# endpoint is open only in development (DEBUG); otherwise it answers 404.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(Path(BLINKED_AI_DIR) / '.cache' / 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 10))
+METRICS_STALE_SECONDS = float(os.environ.get('METRICS_STALE_SECONDS', 3 * METRICS_FLUSH_SECONDS))
+METRICS_RETENTION_SECONDS = int(os.environ.get('METRICS_RETENTION_SECONDS', 86400))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from lessons.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
+    path('api/lessons/', include('lessons.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
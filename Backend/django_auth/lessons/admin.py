@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import LessonJob
+
+
+@admin.register(LessonJob)
+class LessonJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'user', 'status', 'stage', 'worker_id', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('topic',)
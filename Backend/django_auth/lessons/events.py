@@ -0,0 +1,96 @@
+"""
+In-process fan-out of lesson progress events to SSE streams.
+
+Workers write LessonEvent rows. Each ASGI process runs a single relay task
+that polls for rows newer than the last one it has seen and hands them to
+the asyncio queues of the streams subscribed to that lesson. The cost of a
+connection is one queue and one suspended coroutine, and the database
+sees one query per poll interval however many clients are connected. The
+relay only runs while there is at least one subscriber.
+"""
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import LessonEvent
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on events buffered for one slow client before new ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 1000
+RELAY_BATCH_SIZE = 1000
+
+
+class EventBroker:
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self._subscribers = defaultdict(set)
+        self._last_id = 0
+        self._relay = None
+        self._starting = asyncio.Lock()
+
+    @property
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def subscribe(self, job_id):
+        """
+        Register a stream for `job_id` and return its queue. Once this
+        returns, every event stored afterwards will reach the queue, so
+        callers can replay older events from the database without gaps.
+        """
+        async with self._starting:
+            if self._relay is None or self._relay.done():
+                result = await LessonEvent.objects.aaggregate(last_id=Max('id'))
+                self._last_id = result['last_id'] or 0
+                self._relay = asyncio.create_task(self._run_relay())
+
+            events = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            self._subscribers[job_id].add(events)
+            return events
+
+    def unsubscribe(self, job_id, events):
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(events)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def publish(self, event):
+        for events in self._subscribers.get(event.job_id, ()):
+            try:
+                events.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    async def _run_relay(self):
+        while self._subscribers:
+            rows = LessonEvent.objects.filter(id__gt=self._last_id).order_by('id')[:RELAY_BATCH_SIZE]
+            try:
+                batch = [event async for event in rows]
+            except Exception:
+                logger.exception('Lesson event relay query failed')
+                batch = []
+            for event in batch:
+                self._last_id = event.id
+                self.publish(event)
+            if len(batch) < RELAY_BATCH_SIZE:
+                await asyncio.sleep(self.poll_interval)
+
+
+# asyncio queues and tasks belong to one event loop, so keep a broker per loop
+# (an ASGI server runs one loop per process).
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = EventBroker(settings.LESSON_EVENTS_POLL_SECONDS)
+    return broker
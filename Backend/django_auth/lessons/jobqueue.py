@@ -0,0 +1,156 @@
+"""
+Database-backed lesson job queue.
+
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL,
+so concurrent workers never block on or double-claim the same row and no
+external broker is needed. Backends without SKIP LOCKED (e.g. SQLite in
+local development) fall back to an atomic compare-and-set UPDATE.
+
+A claimed job belongs to its worker while it is RUNNING with that
+worker's id: the worker's updates are filtered on both, so once a job
+has been requeued the old worker can no longer change it. Workers bump
+heartbeat_at while they run a job; the supervisor requeues the jobs of
+workers that exited and of those whose heartbeat stopped.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import LessonEvent, LessonJob
+
+
+def enqueue(user, topic):
+    return LessonJob.objects.create(user=user, topic=topic)
+
+
+def claim_next_job(worker_id):
+    """Mark the oldest queued job as running for `worker_id` and return it (or None)."""
+    queued = LessonJob.objects.filter(status=LessonJob.Status.QUEUED).order_by('created_at')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = queued.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = LessonJob.Status.RUNNING
+            job.worker_id = worker_id
+            job.started_at = job.heartbeat_at = timezone.now()
+            job.attempts += 1
+            job.save(update_fields=['status', 'worker_id', 'started_at', 'heartbeat_at', 'attempts'])
+            return job
+
+    # Local stand-in: whoever flips the status first owns the job
+    for job_id in queued.values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        claimed = LessonJob.objects.filter(pk=job_id, status=LessonJob.Status.QUEUED).update(
+            status=LessonJob.Status.RUNNING,
+            worker_id=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return LessonJob.objects.get(pk=job_id)
+    return None
+
+
+def _owned(job_id, worker_id):
+    """The job, if `worker_id` still holds it."""
+    return LessonJob.objects.filter(pk=job_id, worker_id=worker_id, status=LessonJob.Status.RUNNING)
+
+
+def set_stage(job_id, worker_id, stage):
+    return _owned(job_id, worker_id).update(stage=stage, heartbeat_at=timezone.now())
+
+
+def heartbeat(job_id, worker_id):
+    """Show the job is still being worked on; False once `worker_id` no longer holds it."""
+    return bool(_owned(job_id, worker_id).update(heartbeat_at=timezone.now()))
+
+
+def mark_succeeded(job_id, worker_id, video_path):
+    updated = _owned(job_id, worker_id).update(
+        status=LessonJob.Status.SUCCEEDED,
+        stage='done',
+        video_path=video_path or '',
+        finished_at=timezone.now(),
+    )
+    if updated:
+        LessonEvent.objects.create(job_id=job_id, kind=LessonJob.Status.SUCCEEDED, data={'video_path': video_path or ''})
+    return bool(updated)
+
+
+def _fail(jobs, error):
+    job_ids = list(jobs.values_list('pk', flat=True))
+    LessonJob.objects.filter(pk__in=job_ids).update(
+        status=LessonJob.Status.FAILED,
+        error=str(error)[:10000],
+        finished_at=timezone.now(),
+    )
+    LessonEvent.objects.bulk_create([LessonEvent(job_id=job_id, kind=LessonJob.Status.FAILED) for job_id in job_ids])
+    return len(job_ids)
+
+
+def mark_failed(job_id, worker_id, error):
+    return bool(_fail(_owned(job_id, worker_id), error))
+
+
+def record_events(job_id, worker_id, events):
+    """
+    Store pipeline progress events, given as (kind, segment, data) tuples,
+    in one INSERT, and bump the job's heartbeat. "stage" events also update
+    the job's stage column. Events of a job `worker_id` no longer holds
+    are dropped.
+    """
+    rows = [LessonEvent(job_id=job_id, kind=kind, segment=segment, data=data) for kind, segment, data in events]
+    stages = [row.data['stage'] for row in rows if row.kind == 'stage' and 'stage' in row.data]
+    updates = {'stage': stages[-1]} if stages else {}
+    if not _owned(job_id, worker_id).update(heartbeat_at=timezone.now(), **updates):
+        return False
+    LessonEvent.objects.bulk_create(rows)
+    return True
+
+
+def prune_events(retention_seconds):
+    """Delete progress events of lessons that finished more than `retention_seconds` ago."""
+    cutoff = timezone.now() - timedelta(seconds=retention_seconds)
+    deleted, _ = LessonEvent.objects.filter(job__finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def _requeue(jobs, max_attempts, reason):
+    exhausted = _fail(jobs.filter(attempts__gte=max_attempts), reason)
+    requeued = jobs.filter(attempts__lt=max_attempts).update(status=LessonJob.Status.QUEUED, worker_id='')
+    return requeued, exhausted
+
+
+def requeue_stale_jobs(timeout_seconds, max_attempts=3):
+    """
+    Put running jobs whose worker has not sent a heartbeat for
+    `timeout_seconds` back on the queue, or fail them once they've used
+    up their attempts. Returns the number of jobs requeued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    stale = LessonJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=LessonJob.Status.RUNNING,
+    )
+    requeued, _ = _requeue(stale, max_attempts, 'Worker stopped responding.')
+    return requeued
+
+
+def requeue_worker_jobs(worker_id, max_attempts=3):
+    """
+    Put the running jobs of a worker that exited back on the queue (or
+    fail them once they've used up their attempts). Returns the number of
+    jobs requeued.
+    """
+    running = LessonJob.objects.filter(status=LessonJob.Status.RUNNING, worker_id=worker_id)
+    requeued, _ = _requeue(running, max_attempts, f'Worker {worker_id} exited while running the job.')
+    return requeued
+
+
+def queue_depth():
+    return LessonJob.objects.filter(status=LessonJob.Status.QUEUED).count()
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from lessons.models import LessonJob
+from lessons.worker import worker_main
+
+User = get_user_model()
+
+SIMULATED_EXECUTOR = 'lessons.worker.simulate_lesson'
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the lessons API: measure POST/GET latency with the queue idle, '
+        'then again while worker processes are busy running jobs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per phase')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--job-seconds', type=float, default=2.0, help='simulated job duration')
+        parser.add_argument('--force', action='store_true',
+                            help='run even though LESSON_WORKER_EXECUTOR is not the simulated one')
+
+    def handle(self, *args, **options):
+        # The jobs it enqueues go to the shared queue: any real worker on this
+        # database would claim some and run the AI pipeline for them.
+        if settings.LESSON_WORKER_EXECUTOR != SIMULATED_EXECUTOR and not options['force']:
+            raise CommandError(
+                f'LESSON_WORKER_EXECUTOR is {settings.LESSON_WORKER_EXECUTOR}; run against a database whose '
+                f'workers use {SIMULATED_EXECUTOR} (or none), or pass --force.'
+            )
+
+        user, created_user = User.objects.get_or_create(username='loadtest', defaults={'email': 'loadtest@example.com'})
+        token = str(RefreshToken.for_user(user).access_token)
+        probe = LessonJob.objects.create(user=user, topic='status probe', status=LessonJob.Status.SUCCEEDED)
+        job_ids = [probe.pk]
+
+        try:
+            idle = self._phase(token, probe.pk, options, job_ids)
+
+            workers = self._start_workers(options)
+            try:
+                busy = self._phase(token, probe.pk, options, job_ids)
+                done = LessonJob.objects.filter(pk__in=job_ids, status=LessonJob.Status.SUCCEEDED).count() - 1
+            finally:
+                for process in workers:
+                    process.terminate()
+                for process in workers:
+                    process.join()
+        finally:
+            # Only what this run created; an existing 'loadtest' user and its jobs are kept
+            LessonJob.objects.filter(pk__in=job_ids).delete()
+            if created_user:
+                user.delete()
+
+        self.stdout.write(f"\n{'phase':<14} {'reqs':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for name, latencies in (('queue idle', idle), ('workers busy', busy)):
+            ms = [t * 1000 for t in latencies]
+            self.stdout.write(
+                f'{name:<14} {len(ms):>5} {statistics.median(ms):>8.1f} {_percentile(ms, 95):>8.1f} '
+                f'{_percentile(ms, 99):>8.1f} {max(ms):>8.1f}'
+            )
+        self.stdout.write(f'\nJobs completed by {options["workers"]} workers during the busy phase: {done}')
+
+    def _start_workers(self, options):
+        os.environ['LESSON_SIMULATED_SECONDS'] = str(options['job_seconds'])
+        connections.close_all()
+        ctx = multiprocessing.get_context('spawn')
+        workers = []
+        for n in range(options['workers']):
+            process = ctx.Process(
+                target=worker_main,
+                args=(f'loadtest-{n}', SIMULATED_EXECUTOR, False, 0.1),
+                daemon=True,
+            )
+            process.start()
+            workers.append(process)
+        time.sleep(1)
+        return workers
+
+    def _phase(self, token, probe_id, options, job_ids):
+        """
+        Alternate enqueue (POST) and status (GET) requests; return each
+        request's latency. The ids of enqueued jobs are added to job_ids.
+        """
+        def request(n):
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            start = time.perf_counter()
+            if n % 2 == 0:
+                response = client.post('/api/lessons/', {'topic': f'load test {n}'}, content_type='application/json')
+                expected = 202
+            else:
+                response = client.get(f'/api/lessons/{probe_id}/')
+                expected = 200
+            elapsed = time.perf_counter() - start
+            if response.status_code != expected:
+                raise RuntimeError(f'unexpected status {response.status_code}')
+            if n % 2 == 0:
+                job_ids.append(response.json()['id'])
+            return elapsed
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            return list(pool.map(request, range(options['requests'])))
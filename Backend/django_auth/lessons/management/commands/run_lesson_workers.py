@@ -0,0 +1,71 @@
+import itertools
+import multiprocessing
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from lessons import jobqueue
+from lessons.metrics import prune_worker_metrics
+from lessons.worker import worker_main
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of long-lived lesson worker processes that consume the job queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.LESSON_WORKERS)
+        parser.add_argument('--executor', default=settings.LESSON_WORKER_EXECUTOR)
+        parser.add_argument('--no-warmup', action='store_true', help='skip loading the AI models at start-up')
+        parser.add_argument('--poll-interval', type=float, default=settings.LESSON_WORKER_POLL_SECONDS)
+
+    def handle(self, *args, **options):
+        ctx = multiprocessing.get_context('spawn')
+        warmup = settings.LESSON_WORKER_WARMUP and not options['no_warmup']
+        host = socket.gethostname()
+
+        # Children open their own connections
+        connections.close_all()
+        # Restarted workers get a new id, so they never own their predecessor's jobs
+        spawned = itertools.count()
+
+        def start():
+            worker_id = f'{host}-{os.getpid()}-{next(spawned)}'
+            process = ctx.Process(
+                target=worker_main,
+                args=(worker_id, options['executor'], warmup, options['poll_interval']),
+                name=worker_id,
+                daemon=True,
+            )
+            process.start()
+            return process
+
+        workers = [start() for _ in range(options['processes'])]
+        self.stdout.write(f'Started {len(workers)} lesson workers.')
+
+        try:
+            while True:
+                time.sleep(5)
+                for n, process in enumerate(workers):
+                    if not process.is_alive():
+                        self.stderr.write(f'Worker {process.name} exited ({process.exitcode}), restarting.')
+                        requeued = jobqueue.requeue_worker_jobs(process.name)
+                        if requeued:
+                            self.stderr.write(f'Requeued {requeued} jobs of {process.name}.')
+                        workers[n] = start()
+
+                requeued = jobqueue.requeue_stale_jobs(settings.LESSON_JOB_TIMEOUT_SECONDS)
+                if requeued:
+                    self.stderr.write(f'Requeued {requeued} stale jobs.')
+                jobqueue.prune_events(settings.LESSON_EVENTS_RETENTION_SECONDS)
+                prune_worker_metrics()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in workers:
+                process.terminate()
+            for process in workers:
+                process.join()
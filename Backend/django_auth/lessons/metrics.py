@@ -0,0 +1,52 @@
+"""
+Prometheus metrics for the lesson service.
+
+Lesson workers record the AI pipeline's metrics (ai/metrics.py) and write
+one snapshot per process to METRICS_DIR. render_metrics() merges those
+snapshots and adds queue gauges that are read from the database at
+scrape time.
+"""
+from django.conf import settings
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import LessonJob
+from .worker import _use_ai_modules
+
+
+def _ai_metrics():
+    _use_ai_modules()
+    import metrics
+
+    metrics.describe('lesson_jobs', 'gauge', 'Lesson jobs in the database, by status.')
+    metrics.describe('lesson_queue_oldest_seconds', 'gauge', 'Age of the oldest queued lesson job.')
+    return metrics
+
+
+def queue_snapshot():
+    """Job counts per status and the oldest queued job's age, as a metrics snapshot."""
+    counts = dict(LessonJob.objects.order_by().values_list('status').annotate(n=Count('pk')))
+    oldest = LessonJob.objects.filter(status=LessonJob.Status.QUEUED).aggregate(oldest=Min('created_at'))['oldest']
+
+    gauges = [['lesson_jobs', {'status': status}, counts.get(status, 0)] for status in LessonJob.Status.values]
+    gauges.append(['lesson_queue_oldest_seconds', {}, (timezone.now() - oldest).total_seconds() if oldest else 0])
+    return {'counters': [], 'gauges': gauges, 'histograms': []}
+
+
+def render_metrics():
+    """Every worker's metrics plus the queue gauges, in the Prometheus text format."""
+    metrics = _ai_metrics()
+    snapshots = metrics.load_snapshots(settings.METRICS_DIR)
+    snapshots.append(queue_snapshot())
+    return metrics.render_prometheus(metrics.merge(snapshots, stale_seconds=settings.METRICS_STALE_SECONDS))
+
+
+def configure_worker_metrics(worker_id):
+    """Have this worker process write its metrics snapshot for the endpoint."""
+    metrics = _ai_metrics()
+    metrics.configure(directory=settings.METRICS_DIR, process_name=worker_id,
+                      flush_seconds=settings.METRICS_FLUSH_SECONDS)
+
+
+def prune_worker_metrics():
+    return _ai_metrics().prune_snapshots(settings.METRICS_DIR, settings.METRICS_RETENTION_SECONDS)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+
+
+class LessonJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='lesson_jobs')
+    topic = models.CharField(max_length=500)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    stage = models.CharField(max_length=32, blank=True)
+    video_path = models.CharField(max_length=1024, blank=True)
+    error = models.TextField(blank=True)
+    worker_id = models.CharField(max_length=64, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = [
+            # Workers scan for the oldest queued job
+            models.Index(fields=('status', 'created_at'), name='lessonjob_status_created'),
+        ]
+
+    def __str__(self):
+        return f'{self.topic} ({self.status})'
+
+
+class LessonEvent(models.Model):
+    """
+    A progress event written by a lesson worker ("prompted", "rendered",
+    ...). The ASGI process relays new rows to the lesson's SSE streams.
+    """
+    job = models.ForeignKey(LessonJob, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=16)
+    segment = models.PositiveIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.job_id}: {self.kind}'
+
+    def as_payload(self):
+        return {'job': self.job_id, 'kind': self.kind, 'segment': self.segment, **self.data}
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from .models import LessonJob
+
+
+class LessonJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LessonJob
+        fields = ('id', 'topic', 'status', 'stage', 'video_path', 'error', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = ('id', 'status', 'stage', 'video_path', 'error', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import LessonJobDetailView, LessonJobListCreateView, lesson_events_view
+
+urlpatterns = [
+    path('', LessonJobListCreateView.as_view(), name='lesson_list'),
+    path('<int:pk>/', LessonJobDetailView.as_view(), name='lesson_detail'),
+    path('<int:pk>/events/', lesson_events_view, name='lesson_events'),
+]
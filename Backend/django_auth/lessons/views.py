@@ -0,0 +1,158 @@
+import asyncio
+import hmac
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import jobqueue
+from .events import get_broker
+from .metrics import render_metrics
+from .models import LessonEvent, LessonJob
+from .serializers import LessonJobSerializer
+
+TERMINAL_EVENTS = (LessonJob.Status.SUCCEEDED, LessonJob.Status.FAILED)
+
+
+class LessonJobListCreateView(generics.ListCreateAPIView):
+    """
+    POST enqueues a lesson and returns 202 right away; the video is
+    produced by the lesson workers. GET lists the caller's lessons.
+    """
+    serializer_class = LessonJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return LessonJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = jobqueue.enqueue(request.user, serializer.validated_data['topic'])
+        data = self.get_serializer(job).data
+        headers = {'Location': request.build_absolute_uri(f'{job.pk}/')}
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers=headers)
+
+
+class LessonJobDetailView(generics.RetrieveAPIView):
+    serializer_class = LessonJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return LessonJob.objects.filter(user=self.request.user)
+
+
+# ----------------------------
+# PROGRESS STREAM (SSE)
+# ----------------------------
+def _authenticate(request):
+    """
+    Run the REST_FRAMEWORK authentication classes on a plain Django request.
+    Browsers' EventSource can't send headers, so `?token=<access token>` is
+    accepted as the Authorization header's stand-in.
+    """
+    token = request.GET.get('token')
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    user = drf_request.user
+    return user if user.is_authenticated else None
+
+
+def _sse(event):
+    payload = json.dumps(event.as_payload())
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {payload}\n\n'
+
+
+async def _progress_stream(job, after_id):
+    broker = get_broker()
+    events = await broker.subscribe(job.pk)
+    try:
+        yield f'retry: 3000\nevent: status\ndata: {json.dumps({"job": job.pk, "status": job.status, "stage": job.stage})}\n\n'
+
+        # Replay what the client missed; anything newer arrives via the broker
+        last_id = after_id
+        async for event in LessonEvent.objects.filter(job=job, id__gt=after_id).order_by('id'):
+            last_id = event.id
+            yield _sse(event)
+            if event.kind in TERMINAL_EVENTS:
+                return
+        if job.status in TERMINAL_EVENTS:
+            return
+
+        deadline = time.monotonic() + settings.LESSON_EVENTS_MAX_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                event = await asyncio.wait_for(events.get(), settings.LESSON_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event.id <= last_id:
+                continue
+            last_id = event.id
+            yield _sse(event)
+            if event.kind in TERMINAL_EVENTS:
+                return
+    finally:
+        broker.unsubscribe(job.pk, events)
+
+
+async def lesson_events_view(request, pk):
+    """
+    Server-sent events for one lesson: a "status" snapshot, then "stage",
+    "narrated", "prompted", "rendered", "voiced", "encoded" and finally
+    "succeeded" or "failed". Honors Last-Event-ID on reconnect.
+    Each response lasts at most LESSON_EVENTS_MAX_SECONDS: on Django 4.2 a
+    disconnected client is never noticed, so streams are kept short and
+    EventSource reconnects (after the `retry` delay) where it left off.
+    Serve it through config.asgi so the connection doesn't pin a worker.
+    """
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except exceptions.AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+    job = await LessonJob.objects.filter(pk=pk, user=user).afirst()
+    if job is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    after_id = int(last_event_id) if last_event_id.isdigit() else 0
+
+    response = StreamingHttpResponse(_progress_stream(job, after_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ----------------------------
+# METRICS (PROMETHEUS)
+# ----------------------------
+@require_GET
+def metrics_view(request):
+    """
+    Lesson worker and queue metrics in the Prometheus text format.
+    With METRICS_TOKEN set, the scraper must send it as a Bearer token;
+    without one the endpoint only exists when DEBUG is on.
+    """
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()):
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+    elif not settings.DEBUG:
+        # Queue sizes and usage aren't public: production needs a token
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,156 @@
+"""
+Long-lived lesson worker processes.
+
+Each worker loads the AI pipeline once at start-up, so the models stay
+warm across jobs, and then keeps claiming jobs from the database queue.
+Workers are started by the `run_lesson_workers` management command.
+Pipeline progress is written to the database as LessonEvents, which the
+ASGI process streams to clients (see lessons/events.py).
+"""
+import os
+import sys
+import time
+import queue
+import threading
+import traceback
+
+
+def _setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _use_ai_modules():
+    from django.conf import settings
+    if settings.BLINKED_AI_DIR not in sys.path:
+        sys.path.insert(0, settings.BLINKED_AI_DIR)
+
+
+def warm_ai_models():
+    """
+    Configure the Gemini client and load the image pipeline before the first
+    job arrives. The AI modules themselves import without either.
+    """
+    _use_ai_modules()
+    import image_generator
+    from gemini_client import init_gemini
+    from pipeline_pool import get_pipeline
+    init_gemini()
+    get_pipeline(image_generator.MODEL_ID, warmup=True)
+
+
+class ProgressRecorder:
+    """
+    Thread-safe progress callback for the lesson pipeline. Events are queued
+    and written by a background thread in batches, so the pipeline's event
+    loop and render threads never wait on the database. The same thread
+    bumps the job's heartbeat every `heartbeat_seconds` while no events
+    arrive, so long stages don't get the job requeued.
+    """
+
+    def __init__(self, job_id, worker_id, heartbeat_seconds=30):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.heartbeat_seconds = heartbeat_seconds
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, name=f'lesson-{job_id}-events', daemon=True)
+        self._thread.start()
+
+    def __call__(self, event, segment=None, **data):
+        self._queue.put((event, segment, data))
+
+    def _drain(self):
+        from django.db import connection
+        from . import jobqueue
+
+        done = False
+        while not done:
+            try:
+                batch = [self._queue.get(timeout=self.heartbeat_seconds)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in batch
+            events = [item for item in batch if item is not None]
+            try:
+                if events:
+                    jobqueue.record_events(self.job_id, self.worker_id, events)
+                elif not done:
+                    jobqueue.heartbeat(self.job_id, self.worker_id)
+            except Exception:
+                # Progress is best-effort; never take the job down with it
+                traceback.print_exc()
+        connection.close()
+
+    def close(self):
+        """Flush the remaining events and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def run_lesson_pipeline(job, progress):
+    """Default job executor: produce the lesson video, return its published path."""
+    _use_ai_modules()
+    from lesson_pipeline import generate_lesson
+    from workspace import LessonWorkspace
+
+    result = generate_lesson(job.topic, workspace=LessonWorkspace(f'lesson-{job.pk}'), progress=progress)
+    if not result['video']:
+        raise RuntimeError('No video was produced.')
+    return result['video']
+
+
+def simulate_lesson(job, progress, segments=4):
+    """Executor for load tests: holds the worker busy without touching the AI stages."""
+    from django.conf import settings
+    progress('stage', stage='narration')
+    for index in range(1, segments + 1):
+        time.sleep(settings.LESSON_SIMULATED_SECONDS / segments)
+        for event in ('narrated', 'prompted', 'rendered', 'voiced'):
+            progress(event, index)
+    progress('stage', stage='video', total=segments)
+    progress('encoded', ok=True)
+    return ''
+
+
+def worker_main(worker_id, executor_path, warmup, poll_interval):
+    _setup_django()
+
+    from django.conf import settings
+    from django.db import close_old_connections
+    from django.utils.module_loading import import_string
+    from . import jobqueue
+    from .metrics import configure_worker_metrics
+
+    execute = import_string(executor_path)
+    configure_worker_metrics(worker_id)
+    if warmup:
+        warm_ai_models()
+
+    try:
+        while True:
+            close_old_connections()
+            job = jobqueue.claim_next_job(worker_id)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            progress = ProgressRecorder(job.pk, worker_id, settings.LESSON_JOB_HEARTBEAT_SECONDS)
+            try:
+                jobqueue.set_stage(job.pk, worker_id, 'generating')
+                video_path = execute(job, progress)
+            except Exception:
+                progress.close()
+                finished = jobqueue.mark_failed(job.pk, worker_id, traceback.format_exc())
+            else:
+                progress.close()
+                finished = jobqueue.mark_succeeded(job.pk, worker_id, video_path)
+            if not finished:
+                print(f'Lesson job {job.pk} was requeued while {worker_id} ran it; result dropped.', file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
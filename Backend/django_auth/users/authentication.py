@@ -0,0 +1,66 @@
+"""
+JWT authentication that resolves the user without a database query.
+
+The access token is verified as usual (signature, expiry, token type); the
+user it names is then looked up in a cache of a few profile fields
+(the `auth` cache alias) and only read from the database on a miss. The
+cached entry is dropped whenever the user row is saved or deleted (see
+users/signals.py), so password changes, deactivation and profile edits
+take effect on the next request. Use a shared cache (Redis) when several
+processes serve the API, so an invalidation reaches all of them.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# Fields kept in the cache; anything else on the user is loaded lazily on access
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """`user_id` is the USER_ID_FIELD value carried in the tokens."""
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Drop-in replacement for JWTAuthentication with a cached user lookup."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+
+        if entry is None:
+            user = super().get_user(validated_token)
+            entry = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+            if api_settings.CHECK_REVOKE_TOKEN:
+                entry['revoke_hash'] = get_md5_hash_password(user.password)
+            cache.set(key, entry, settings.AUTH_USER_CACHE_SECONDS)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not entry['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry.get('revoke_hash'):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # Built like a queryset row: saved, bound to the default database,
+        # with the uncached fields deferred
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in CACHED_USER_FIELDS]
+        return User.from_db('default', fields, [entry[field] for field in fields])
@@ -0,0 +1,74 @@
+"""
+Bulk user registration (classroom onboarding).
+
+The whole batch is validated first: every row through the same field and
+password validation as RegisterSerializer, plus one query each for
+usernames and emails that are already taken. Passwords are then hashed
+across a process pool (users/hashing.py) and the users are inserted with
+bulk_create in a single transaction.
+"""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from .hashing import hash_passwords
+from .serializers import BulkRegisterRowSerializer
+
+User = get_user_model()
+
+
+def validate_rows(rows):
+    """
+    Validate every row. Returns (valid rows as dicts, errors) where errors
+    is a list of {"row": index, "errors": {field: [messages]}}.
+    """
+    valid, row_errors = [], {}
+    for index, row in enumerate(rows):
+        serializer = BulkRegisterRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            row_errors[index] = dict(serializer.errors)
+
+    # Uniqueness against the database and within the batch, one query per field
+    for field in ('username', 'email'):
+        values = [data[field] for _, data in valid]
+        taken = set(User.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True))
+        seen = set()
+        for index, data in valid:
+            value = data[field]
+            if value in taken:
+                row_errors.setdefault(index, {})[field] = [f'A user with that {field} already exists.']
+            elif value in seen:
+                row_errors.setdefault(index, {})[field] = [f'Duplicate {field} in this batch.']
+            seen.add(value)
+
+    errors = [{'row': index, 'errors': row_errors[index]} for index in sorted(row_errors)]
+    return [data for index, data in valid if index not in row_errors], errors
+
+
+def bulk_register(rows, partial=False):
+    """
+    Register many users at once. Unless `partial` is set, nothing is created
+    when any row is invalid. Returns {"created": [User, ...], "errors": [...]}.
+    """
+    valid, errors = validate_rows(rows)
+    if errors and not partial:
+        return {'created': [], 'errors': errors}
+    if not valid:
+        return {'created': [], 'errors': errors}
+
+    passwords = hash_passwords([data['password'] for data in valid])
+    users = [
+        User(username=data['username'], email=data['email'], password=password)
+        for data, password in zip(valid, passwords)
+    ]
+    try:
+        with transaction.atomic():
+            created = User.objects.bulk_create(users, batch_size=500)
+    except IntegrityError:
+        # Someone registered one of these names between validation and insert
+        return {'created': [], 'errors': errors + [{'row': None, 'errors': {
+            'non_field_errors': ['A username or email was taken while the batch was being created; retry.']
+        }}]}
+
+    return {'created': created, 'errors': errors}
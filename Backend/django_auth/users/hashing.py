@@ -0,0 +1,47 @@
+"""
+Password hashing across a process pool.
+
+PBKDF2 is CPU-bound and holds the GIL, so a batch of passwords is only
+hashed in parallel in separate processes. This module imports nothing
+that needs the app registry, so spawned workers can load it before
+calling django.setup().
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords the pool's start-up cost isn't worth it
+MIN_POOL_BATCH = 8
+
+_pool = None
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def get_hash_pool():
+    """Started on first use and kept for the life of the process."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),),
+        )
+    return _pool
+
+
+def hash_passwords(passwords):
+    """make_password() for every password, in order."""
+    workers = settings.PASSWORD_HASH_WORKERS
+    if len(passwords) < MIN_POOL_BATCH or workers <= 1:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_hash_pool().map(make_password, passwords, chunksize=chunksize))
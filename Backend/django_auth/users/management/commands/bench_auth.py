@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.views import me_view
+
+User = get_user_model()
+
+MODES = (
+    ('db', 'rest_framework_simplejwt.authentication.JWTAuthentication'),
+    ('cached', 'users.authentication.CachedJWTAuthentication'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare GET /api/auth/me/ requests/sec and DB queries per request for each JWT auth mode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench-auth', defaults={'email': 'bench-auth@example.com'})
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        client = Client()
+        view_class = me_view.cls
+        original = view_class.authentication_classes
+
+        results = []
+        try:
+            for mode, class_path in MODES:
+                view_class.authentication_classes = [import_string(class_path)]
+                caches[settings.AUTH_USER_CACHE_ALIAS].clear()
+
+                # Warm-up request (fills the user cache in cached mode)
+                assert client.get('/api/auth/me/', **auth).status_code == 200
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        client.get('/api/auth/me/', **auth)
+                    elapsed = time.perf_counter() - start
+                results.append((mode, options['requests'] / elapsed, len(queries) / options['requests']))
+        finally:
+            view_class.authentication_classes = original
+            user.delete()
+
+        self.stdout.write(f"\n{'mode':<8} {'req/s':>9} {'queries/req':>12}")
+        for mode, rps, qpr in results:
+            self.stdout.write(f'{mode:<8} {rps:>9.0f} {qpr:>12.2f}')
+        self.stdout.write(f'\nspeed-up: {results[1][1] / results[0][1]:.2f}x')
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.hashing import get_hash_pool
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare users/sec registering one user per request against one bulk request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+
+    def handle(self, *args, **options):
+        count = options['users']
+        admin, _ = User.objects.get_or_create(
+            username='bench-register-admin',
+            defaults={'email': 'bench-register-admin@example.com', 'is_staff': True},
+        )
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(admin).access_token}'}
+        client = Client()
+
+        def rows(prefix):
+            return [
+                {'username': f'{prefix}{n}', 'email': f'{prefix}{n}@example.com', 'password': f'Classroom-{n}-pass!'}
+                for n in range(count)
+            ]
+
+        # Start the hashing pool outside the measurement, as a long-running server would have it
+        if settings.PASSWORD_HASH_WORKERS > 1:
+            get_hash_pool().submit(int).result()
+
+        try:
+            start = time.perf_counter()
+            for row in rows('bench-single-'):
+                assert client.post('/api/auth/register/', row).status_code == 201
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = client.post(
+                '/api/auth/register/bulk/', {'users': rows('bench-bulk-')}, content_type='application/json', **auth
+            )
+            bulk = time.perf_counter() - start
+            assert response.status_code == 201 and len(response.json()['created']) == count, response.content
+        finally:
+            User.objects.filter(username__startswith='bench-single-').delete()
+            User.objects.filter(username__startswith='bench-bulk-').delete()
+            admin.delete()
+
+        self.stdout.write(f"\n{'path':<26} {'seconds':>8} {'users/s':>9}")
+        self.stdout.write(f"{'register/ x ' + str(count):<26} {single:>8.2f} {count / single:>9.1f}")
+        self.stdout.write(f"{'register/bulk/ x 1':<26} {bulk:>8.2f} {count / bulk:>9.1f}")
+        self.stdout.write(f'\nspeed-up: {single / bulk:.1f}x')
@@ -0,0 +1,137 @@
+import logging
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from users.token_maintenance import delete_tokens, prune_expired_tokens
+from users.tokens import CachedBlacklistRefreshToken
+
+User = get_user_model()
+
+SERIALIZERS = (
+    ('simplejwt', 'rest_framework_simplejwt.serializers.TokenRefreshSerializer'),
+    ('cached', 'users.serializers.CachedTokenRefreshSerializer'),
+)
+SEED_BATCH = 10000
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed the token blacklist tables with a large number of rows, then measure refresh '
+        'latency, blacklisted-token replay latency and batched pruning.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=1_000_000, help='outstanding tokens to seed')
+        parser.add_argument('--expired', type=float, default=0.5, help='fraction of seeded tokens already expired')
+        parser.add_argument('--blacklisted', type=float, default=0.5, help='fraction of seeded tokens blacklisted')
+        parser.add_argument('--refreshes', type=int, default=300)
+        parser.add_argument('--batch-size', type=int, default=5000, help='prune batch size')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench-refresh', defaults={'email': 'bench-refresh@example.com'})
+        client = Client()
+        original = TokenRefreshView._serializer_class
+        # Replayed tokens are rejected on purpose; don't log every 401
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        try:
+            start = time.perf_counter()
+            self._seed(user, options)
+            self.stdout.write(f"Seeded {options['tokens']} tokens in {time.perf_counter() - start:.1f}s.")
+
+            rows = []
+            for name, serializer in SERIALIZERS:
+                TokenRefreshView._serializer_class = serializer
+                rows.append((f'refresh ({name})', self._refresh_chain(client, user, options['refreshes'])))
+                rows.append((f'replay ({name})', self._replay(client, user, options['refreshes'])))
+
+            start = time.perf_counter()
+            totals = prune_expired_tokens(options['batch_size'])
+            prune_seconds = time.perf_counter() - start
+
+            TokenRefreshView._serializer_class = SERIALIZERS[-1][1]
+            rows.append(('refresh (after prune)', self._refresh_chain(client, user, options['refreshes'])))
+        finally:
+            TokenRefreshView._serializer_class = original
+            self._cleanup(user)
+
+        self.stdout.write(f"\n{'case':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, latencies in rows:
+            ms = [t * 1000 for t in latencies]
+            self.stdout.write(
+                f'{name:<22} {statistics.median(ms):>8.2f} {_percentile(ms, 95):>8.2f} {_percentile(ms, 99):>8.2f}'
+            )
+        self.stdout.write(
+            f"\nPruned {totals['outstanding']} expired tokens ({totals['blacklisted']} blacklisted) "
+            f"in {totals['batches']} batches, {prune_seconds:.1f}s."
+        )
+
+    def _seed(self, user, options):
+        now = aware_utcnow()
+        expired_every = max(1, round(1 / options['expired'])) if options['expired'] else 0
+        blacklisted_every = max(1, round(1 / options['blacklisted'])) if options['blacklisted'] else 0
+
+        for offset in range(0, options['tokens'], SEED_BATCH):
+            count = min(SEED_BATCH, options['tokens'] - offset)
+            tokens = []
+            for n in range(offset, offset + count):
+                expired = expired_every and n % expired_every == 0
+                tokens.append(OutstandingToken(
+                    user=user,
+                    jti=uuid.uuid4().hex,
+                    token='',
+                    created_at=now - timedelta(days=8),
+                    expires_at=now - timedelta(days=1) if expired else now + timedelta(days=7),
+                ))
+            with transaction.atomic():
+                created = OutstandingToken.objects.bulk_create(tokens)
+                if blacklisted_every:
+                    if created[0].pk is None:
+                        created = OutstandingToken.objects.filter(jti__in=[t.jti for t in tokens])
+                    BlacklistedToken.objects.bulk_create([
+                        BlacklistedToken(token=token) for n, token in enumerate(created) if n % blacklisted_every == 0
+                    ])
+
+    def _refresh_chain(self, client, user, count):
+        refresh = str(CachedBlacklistRefreshToken.for_user(user))
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post('/api/auth/refresh/', {'refresh': refresh})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+            refresh = response.json()['refresh']
+        return latencies
+
+    def _replay(self, client, user, count):
+        """Re-present an already rotated (blacklisted) refresh token."""
+        used = str(CachedBlacklistRefreshToken.for_user(user))
+        assert client.post('/api/auth/refresh/', {'refresh': used}).status_code == 200
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post('/api/auth/refresh/', {'refresh': used})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 401, response.content
+        return latencies
+
+    def _cleanup(self, user):
+        ids = list(OutstandingToken.objects.filter(user=user).values_list('id', flat=True))
+        for offset in range(0, len(ids), SEED_BATCH):
+            delete_tokens(ids[offset:offset + SEED_BATCH])
+        user.delete()
@@ -0,0 +1,37 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bulk import bulk_register
+
+
+class Command(BaseCommand):
+    help = 'Register users from a CSV (username,email,password header) or JSON list file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--partial', action='store_true', help='create the valid rows even if some rows fail')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = json.load(f) if path.endswith('.json') else list(csv.DictReader(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        start = time.perf_counter()
+        result = bulk_register(rows, partial=options['partial'])
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors']:
+            row = '-' if error['row'] is None else error['row'] + 1
+            self.stderr.write(f"row {row}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            f"Created {len(result['created'])} of {len(rows)} users in {elapsed:.1f}s; "
+            f"{len(result['errors'])} rows with errors."
+        )
+        if result['errors'] and not result['created']:
+            raise CommandError('No users were created.')
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.token_maintenance import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.TOKEN_PRUNE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+        parser.add_argument('--verbose-batches', action='store_true', help='print a line per batch')
+
+    def handle(self, *args, **options):
+        def report(totals):
+            self.stdout.write(f"  batch {totals['batches']}: {totals['outstanding']} outstanding deleted")
+
+        start = time.perf_counter()
+        totals = prune_expired_tokens(
+            options['batch_size'],
+            pause=options['pause'],
+            progress=report if options['verbose_batches'] else None,
+        )
+        self.stdout.write(
+            f"Pruned {totals['outstanding']} outstanding and {totals['blacklisted']} blacklisted tokens "
+            f"in {totals['batches']} batches ({time.perf_counter() - start:.1f}s)."
+        )
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+INDEX_NAME = 'token_blacklist_outstanding_expires_at'
+
+
+def create_index(apps, schema_editor):
+    table = apps.get_model('token_blacklist', 'OutstandingToken')._meta.db_table
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {table} (expires_at)')
+
+
+def drop_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    """
+    Index OutstandingToken.expires_at (a third-party model) so expired-token
+    pruning doesn't scan the whole table. Built CONCURRENTLY on PostgreSQL,
+    which can't run inside a transaction.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
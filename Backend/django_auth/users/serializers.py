@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
@@ -24,7 +29,32 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+class BulkRegisterRowSerializer(RegisterSerializer):
+    """One row of a bulk registration; uniqueness is checked for the whole batch at once (users/bulk.py)."""
+
+    class Meta(RegisterSerializer.Meta):
+        extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'email': {'validators': []},
+        }
+
+
+class BulkRegisterSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    partial = serializers.BooleanField(default=False)
+
+    def validate_users(self, value):
+        limit = settings.BULK_REGISTER_MAX_ROWS
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} users per request.')
+        return value
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email')
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
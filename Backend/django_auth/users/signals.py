@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import invalidate_cached_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    # Covers password changes, deactivation and profile edits made through
+    # the ORM; bulk QuerySet.update() bypasses signals and relies on the TTL.
+    invalidate_cached_user(getattr(instance, api_settings.USER_ID_FIELD))
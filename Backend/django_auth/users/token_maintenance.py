@@ -0,0 +1,64 @@
+"""
+Batched pruning of expired refresh tokens.
+
+simplejwt's `flushexpiredtokens` deletes every expired OutstandingToken in
+one statement, which holds locks for as long as it takes to remove
+millions of rows (and cascades through the ORM collector). Here expired
+rows are walked in primary-key order and removed batch by batch, each
+batch in its own short transaction, blacklist rows first.
+"""
+import time
+
+from django.db import connection, transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+def _delete_ids(model, column, ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE {column} IN ({placeholders})', ids)
+        return cursor.rowcount
+
+
+def delete_tokens(ids):
+    """
+    Delete the outstanding tokens with these ids and their blacklist rows in
+    one transaction, with plain DELETEs (no ORM cascade collection).
+    Returns (outstanding deleted, blacklisted deleted).
+    """
+    with transaction.atomic():
+        blacklisted = _delete_ids(BlacklistedToken, 'token_id', ids)
+        outstanding = _delete_ids(OutstandingToken, 'id', ids)
+    return outstanding, blacklisted
+
+
+def prune_expired_tokens(batch_size, pause=0.0, now=None, progress=None):
+    """
+    Delete outstanding tokens that expired before `now` (and their blacklist
+    entries). Sleeps `pause` seconds between batches so other writers get
+    the table. Returns {"outstanding": n, "blacklisted": n, "batches": n}.
+    """
+    now = now or aware_utcnow()
+    totals = {'outstanding': 0, 'blacklisted': 0, 'batches': 0}
+    last_id = 0
+
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return totals
+
+        outstanding, blacklisted = delete_tokens(ids)
+        totals['outstanding'] += outstanding
+        totals['blacklisted'] += blacklisted
+        totals['batches'] += 1
+        last_id = ids[-1]
+
+        if progress:
+            progress(totals)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,73 @@
+"""
+Refresh tokens with a cached blacklist check and fewer queries per rotation.
+
+simplejwt's RefreshToken looks the JTI up in BlacklistedToken on every
+refresh and re-reads the user row twice while rotating. Here a JTI known
+to be blacklisted is answered from the `auth` cache until the token
+expires, and rotation writes the outstanding/blacklisted rows by user id
+without fetching the user (only when USER_ID_FIELD is not the primary
+key is the pk looked up from the claim).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+def blacklist_cache_key(jti):
+    return f'auth:blacklisted:{jti}'
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+
+    def _remember_blacklisted(self):
+        seconds_left = int((datetime_from_epoch(self.payload['exp']) - aware_utcnow()).total_seconds())
+        if seconds_left > 0:
+            caches[settings.AUTH_USER_CACHE_ALIAS].set(
+                blacklist_cache_key(self.payload[api_settings.JTI_CLAIM]), True, seconds_left
+            )
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if caches[settings.AUTH_USER_CACHE_ALIAS].get(blacklist_cache_key(jti)):
+            raise TokenError(_('Token is blacklisted'))
+
+        # Indexed: unique jti on OutstandingToken, unique token_id on BlacklistedToken
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            self._remember_blacklisted()
+            raise TokenError(_('Token is blacklisted'))
+
+    def _outstanding_user_id(self):
+        """Primary key of the token's user, read from the claim when USER_ID_FIELD is the pk."""
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        pk = get_user_model()._meta.pk
+        if user_id is None or api_settings.USER_ID_FIELD in ('pk', pk.name, pk.attname):
+            return user_id
+        return get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values_list('pk', flat=True).first()
+
+    def _get_or_create_outstanding(self):
+        return OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                'user_id': self._outstanding_user_id(),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            },
+        )
+
+    def blacklist(self):
+        token, _ = self._get_or_create_outstanding()
+        result = BlacklistedToken.objects.get_or_create(token=token)
+        self._remember_blacklisted()
+        return result
+
+    def outstand(self):
+        return self._get_or_create_outstanding()
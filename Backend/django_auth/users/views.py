@@ -1,8 +1,10 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
-from .serializers import RegisterSerializer, UserSerializer
+from .bulk import bulk_register
+from .serializers import BulkRegisterSerializer, RegisterSerializer, UserSerializer
 
 User = get_user_model()
 
@@ -13,6 +15,26 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
+class BulkRegisterView(APIView):
+    """
+    Register a whole class at once: {"users": [{username, email, password}, ...],
+    "partial": false}. With partial=false nothing is created if any row is
+    invalid; the response lists the per-row errors either way.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkRegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = bulk_register(serializer.validated_data['users'], partial=serializer.validated_data['partial'])
+        data = {
+            'created': UserSerializer(result['created'], many=True).data,
+            'errors': result['errors'],
+        }
+        return Response(data, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def me_view(request):
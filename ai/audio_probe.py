@@ -0,0 +1,143 @@
+import os
+import struct
+
+
+# ----------------------------
+# HEADER-ONLY DURATION PROBING
+# ----------------------------
+# Narration clips are WAV (fakes, older output) or MP3 (edge-tts writes MP3
+# whatever the file is called), so the format is sniffed from the first
+# bytes, not the extension. Only headers are read: a few hundred bytes per
+# file, no decoder and no subprocess.
+
+# MPEG audio layer III tables
+_MP3_BITRATES = {
+    "1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    "1": [44100, 48000, 32000],
+    "2": [22050, 24000, 16000],
+    "2.5": [11025, 12000, 8000],
+}
+_MP3_SYNC_SEARCH = 64 * 1024
+
+
+def header_duration(path: str):
+    """
+    Duration in seconds of a WAV or MP3 file, read from its headers, or
+    None when the format isn't recognised (callers fall back to a decoder).
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(12)
+        f.seek(0)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _wav_duration(f, size)
+        return _mp3_duration(f, size)
+
+
+def _wav_duration(f, size: int):
+    f.seek(12)
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            f.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed writers leave the size unset; the data runs to the end of the file
+            available = size - f.tell()
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            return chunk_size / byte_rate
+        else:
+            f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _mp3_duration(f, size: int):
+    start = 0
+    head = f.read(10)
+    if head[:3] == b"ID3":
+        # ID3v2 tag: synchsafe size, plus a 10-byte footer when flagged
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    f.seek(start)
+    data = f.read(_MP3_SYNC_SEARCH)
+    for i in range(len(data) - 3):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            frame = _parse_mp3_frame(data[i:i + 4])
+            if frame and _next_frame_ok(data, i, frame, size - start):
+                break
+    else:
+        return None
+
+    version, bitrate, sample_rate, mono, _ = frame
+    samples_per_frame = 1152 if version == "1" else 576
+
+    # Xing / Info header (VBR files, and CBR files from LAME) gives the frame count
+    side_info = (17 if mono else 32) if version == "1" else (9 if mono else 17)
+    xing = data[i + 4 + side_info:i + 4 + side_info + 200]
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+        flags, frames = struct.unpack(">II", xing[4:12])
+        samples = frames * samples_per_frame
+        # LAME tag after the optional byte count, TOC and quality fields:
+        # encoder delay and padding (12 bits each) are not part of the audio
+        lame = 8 + 4 * bool(flags & 0x1) + 4 * bool(flags & 0x2) + 100 * bool(flags & 0x4) + 4 * bool(flags & 0x8)
+        gapless = xing[lame + 21:lame + 24]
+        if len(gapless) == 3 and xing[lame:lame + 4] in (b"LAME", b"Lavc", b"Lavf"):
+            delay = (gapless[0] << 4) | (gapless[1] >> 4)
+            padding = ((gapless[1] & 0x0F) << 8) | gapless[2]
+            samples = max(0, samples - delay - padding)
+        return samples / sample_rate
+
+    # Constant bitrate: the audio bytes give the duration
+    audio_bytes = size - start - i
+    if size >= 128:
+        f.seek(-128, os.SEEK_END)
+        if f.read(3) == b"TAG":
+            audio_bytes -= 128
+    return audio_bytes * 8 / (bitrate * 1000)
+
+
+def _next_frame_ok(data: bytes, i: int, frame, available: int) -> bool:
+    """
+    Whether the frame at data[i] is followed by another header of the same
+    stream, which a sync pattern inside the ID3 or audio bytes almost never
+    is. A frame that ends the file (or comes before its ID3v1 tag) needs
+    no successor.
+    """
+    end = i + frame[4]
+    if end >= available:
+        return end == available
+    if data[end:end + 3] == b"TAG" and end + 128 == available:  # ID3v1 tag at the end
+        return True
+    following = _parse_mp3_frame(data[end:end + 4])
+    return following is not None and following[0] == frame[0] and following[2] == frame[2]
+
+
+def _parse_mp3_frame(header: bytes):
+    """(version, kbit/s, sample rate, mono, frame bytes) of a layer III frame header, or None."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = {0b00: "2.5", 0b10: "2", 0b11: "1"}.get((header[1] >> 3) & 0b11)
+    layer = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0b11
+    if version is None or layer != 0b01 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _MP3_BITRATES["1" if version == "1" else "2"][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    mono = header[3] >> 6 == 0b11
+    padding = (header[2] >> 1) & 0b1
+    length = (144000 if version == "1" else 72000) * bitrate // sample_rate + padding
+    return version, bitrate, sample_rate, mono, length
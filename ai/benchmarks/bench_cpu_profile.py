@@ -0,0 +1,85 @@
+"""
+Benchmark: SDXL Turbo on CPU under each cpu_profile profile.
+
+Every profile runs in a fresh process (thread settings and peak RSS are
+per process) and reports
+  - load + tuning time and warm-up time (includes compiling, if enabled)
+  - seconds per 1024x576 frame, rendered one at a time
+  - peak RSS of the process
+so the profile and SDXL_CPU_THREADS can be chosen per worker size.
+The render cache is disabled so every frame is rendered.
+
+Usage:
+    python ai/benchmarks/bench_cpu_profile.py [frames] [profile ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+PROMPTS = [
+    "A cartoon water tank with a small orifice, landscape, smooth lines.",
+    "A friendly cartoon teacher pointing at a whiteboard with a diagram.",
+    "A cartoon river flowing past a water wheel, bright colours.",
+]
+
+
+def run_profile(name: str, frames: int) -> dict:
+    """Child process: load, warm up and render under one profile."""
+    os.environ["SDXL_CPU_PROFILE"] = name
+    os.environ["RENDER_CACHE_DIR"] = ""
+
+    import cpu_profile
+    import image_generator
+    from pipeline_pool import get_pipeline
+
+    start = time.perf_counter()
+    get_pipeline(image_generator.MODEL_ID, device="cpu")
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image_generator.warmup_pipeline(get_pipeline(image_generator.MODEL_ID, device="cpu"))
+    warmup = time.perf_counter() - start
+
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(frames)]
+    start = time.perf_counter()
+    images = image_generator.generate_images(prompts, batch_size=1)
+    render = time.perf_counter() - start
+
+    return {
+        "profile": cpu_profile.describe(cpu_profile.get_profile(name)),
+        "load_s": load,
+        "warmup_s": warmup,
+        "s_per_frame": render / frames,
+        "failed": sum(image is None for image in images),
+        "peak_rss_mb": cpu_profile.peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(run_profile(sys.argv[2], int(sys.argv[3]))))
+        sys.exit(0)
+
+    import cpu_profile
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    names = sys.argv[2:] or list(cpu_profile.PROFILES)
+
+    print(f"bf16 supported: {cpu_profile.bf16_supported()}, cores: {cpu_profile.available_cores()}\n")
+    print(f"{'profile':<60} {'load s':>7} {'warm s':>7} {'s/frame':>8} {'peak RSS MB':>12}")
+    for name in names:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name, str(frames)],
+            capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            print(f"{name:<60} failed:\n{child.stderr.strip()[-2000:]}")
+            continue
+        r = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{r['profile']:<60} {r['load_s']:>7.1f} {r['warmup_s']:>7.1f} {r['s_per_frame']:>8.2f} "
+              f"{r['peak_rss_mb'] or float('nan'):>12.0f}" + (f"  ({r['failed']} failed)" if r["failed"] else ""))
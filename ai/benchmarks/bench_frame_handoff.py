@@ -0,0 +1,109 @@
+"""
+Benchmark: handing rendered frames to the video stage.
+
+Compares, for the same synthetic 1024x576 frames and silent narration:
+  png files   save_image() at the old default compression, ffmpeg decodes
+              and rescales every file
+  png-1 files the same with low-compression PNG
+  in memory   to_video_frame() once, raw frames piped to ffmpeg
+  + ppm/png   in memory, also persisted at the video size
+and reports the time spent handing frames over (encode / convert /
+persist), the ffmpeg assembly time and the bytes written per frame.
+
+Usage:
+    python ai/benchmarks/bench_frame_handoff.py [slides] [seconds_per_slide]
+"""
+import os
+import sys
+import time
+import wave
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import video_generator  # noqa: E402
+
+
+def synthetic_frame(seed: int) -> Image.Image:
+    """Smooth shapes plus a little noise, roughly as compressible as a rendered frame."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:576, 0:1024] / 100.0
+    channels = [np.sin(x * rng.uniform(0.3, 2) + rng.uniform(0, 6)) * np.cos(y * rng.uniform(0.3, 2))
+                for _ in range(3)]
+    image = (np.stack(channels, axis=-1) + 1) * 110 + rng.normal(0, 6, (576, 1024, 3))
+    return Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
+
+
+def silent_wav(path: str, seconds: float, sample_rate: int = 16000):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+
+
+def run(images, audio, narration, seconds, tmp, mode):
+    frames_dir = os.path.join(tmp, mode.replace(" ", "_"))
+    os.makedirs(frames_dir)
+
+    start = time.perf_counter()
+    stills = []
+    for i, image in enumerate(images):
+        if mode == "png files":
+            path = os.path.join(frames_dir, f"frame_{i:02d}.png")
+            image.save(path)
+            stills.append(path)
+        elif mode == "png-1 files":
+            path = os.path.join(frames_dir, f"frame_{i:02d}.png")
+            image.save(path, compress_level=1)
+            stills.append(path)
+        else:
+            frame = video_generator.to_video_frame(image)
+            if mode != "in memory":
+                video_generator.save_frame(frame, os.path.join(frames_dir, f"frame_{i:02d}.{mode[-3:]}"))
+            stills.append(frame)
+    handoff = time.perf_counter() - start
+
+    output = os.path.join(tmp, f"{mode.replace(' ', '_')}.mp4")
+    start = time.perf_counter()
+    with open(os.devnull, "w") as quiet:
+        stdout, sys.stdout = sys.stdout, quiet
+        try:
+            video_generator._render_fast([(s, a, seconds) for s, a in zip(stills, audio)], narration, output)
+        finally:
+            sys.stdout = stdout
+    encode = time.perf_counter() - start
+
+    written = sum(os.path.getsize(os.path.join(frames_dir, f)) for f in os.listdir(frames_dir))
+    return handoff, encode, written / len(images)
+
+
+if __name__ == "__main__":
+    slides = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    modes = ["png files", "png-1 files", "in memory", "in memory + ppm", "in memory + png"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = [synthetic_frame(i) for i in range(slides)]
+        audio = []
+        for i in range(slides):
+            audio.append(os.path.join(tmp, f"audio_{i}.wav"))
+            silent_wav(audio[-1], seconds)
+        # The same for every mode, so mixed once up front
+        narration = video_generator.build_narration_track([(None, a, seconds) for a in audio],
+                                                          os.path.join(tmp, video_generator.NARRATION_TRACK))
+
+        print(f"{slides} slides x {seconds:.1f}s, {video_generator.VIDEO_WIDTH}x{video_generator.VIDEO_HEIGHT}\n")
+        print(f"{'mode':<18} {'handoff s':>10} {'ffmpeg s':>9} {'total s':>8} {'KB/frame':>9}")
+        for mode in modes:
+            try:
+                handoff, encode, per_frame = run(images, audio, narration, seconds, tmp, mode)
+            except subprocess.CalledProcessError as e:
+                print(f"{mode:<18} ffmpeg failed ({e.returncode})")
+                continue
+            print(f"{mode:<18} {handoff:>10.2f} {encode:>9.2f} {handoff + encode:>8.2f} {per_frame / 1024:>9.0f}")
@@ -0,0 +1,120 @@
+"""
+Benchmark: similar-prompt frame reuse (frame_index.FrameIndex).
+
+Uses synthetic image prompts: a subject (object + scene) written in one
+of several phrasings, the way the prompt generator rewords the same idea
+across lessons. No frames are rendered.
+
+Measures
+  - similarity of paraphrases vs. different subjects, and precision /
+    recall of "reuse" at several thresholds (to choose FRAME_REUSE_THRESHOLD)
+  - over a stream of prompts: reuse rate, how often the reused frame had
+    the wrong scene or the wrong objects, and lookup latency as the index
+    grows
+
+Usage:
+    python ai/benchmarks/bench_frame_reuse.py [stream_prompts] [threshold]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+
+import numpy as np
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+from frame_index import FrameIndex, embed  # noqa: E402
+
+OBJECTS = [
+    "water tank with a small orifice", "volcano erupting", "plant cell", "solar system", "electric circuit",
+    "pulley lifting a box", "magnet attracting nails", "rain cloud", "human heart", "honey bee on a flower",
+    "lever and fulcrum", "thermometer in hot water", "prism splitting light", "sound waves from a drum",
+    "seed sprouting", "moon phases", "food chain in a pond", "wind turbine", "caterpillar becoming a butterfly",
+    "ice cube melting", "compass pointing north", "microscope", "rocket launching", "bridge over a river",
+    "dinosaur skeleton", "rainbow over hills", "battery and bulb", "tree roots underground", "beaker of acid",
+    "gear train", "sunflower following the sun", "earthquake cracking a road", "snowflake crystal",
+    "windmill pumping water", "digestive system", "lighthouse at night", "ant colony tunnels",
+    "hot air balloon", "telescope under stars", "river delta",
+]
+SCENES = ["in a classroom", "in a laboratory", "outdoors", "on a whiteboard", "in a textbook diagram"]
+TEMPLATES = [
+    "Cartoon illustration of a {obj} {scene}, bright colours, clean lines.",
+    "A cartoon {obj} {scene}, simple shapes, bright colors.",
+    "Friendly cartoon style: {obj} {scene}, smooth lines, vivid colours.",
+    "Simple cartoon drawing of the {obj} {scene} with clean outlines.",
+    "{obj} {scene}, cartoon illustration, bright and colourful.",
+]
+
+
+def make_prompt(subject, rng):
+    obj, scene = subject
+    return rng.choice(TEMPLATES).format(obj=obj, scene=scene)
+
+
+def calibrate(rng, pairs=2000):
+    subjects = [(o, s) for o in OBJECTS for s in SCENES]
+    same, different = [], []
+    for _ in range(pairs):
+        a = rng.choice(subjects)
+        b = rng.choice([s for s in subjects if s != a])
+        x, y = make_prompt(a, rng), make_prompt(a, rng)
+        same.append(float(embed(x) @ embed(y)))
+        different.append(float(embed(make_prompt(a, rng)) @ embed(make_prompt(b, rng))))
+
+    same, different = np.array(same), np.array(different)
+    print(f"paraphrase similarity : mean {same.mean():.3f}, 5th pct {np.percentile(same, 5):.3f}")
+    print(f"different subject     : mean {different.mean():.3f}, 99th pct {np.percentile(different, 99):.3f}")
+    print(f"\n{'threshold':>9} {'recall':>7} {'false reuse':>12}")
+    for threshold in (0.75, 0.8, 0.85, 0.9, 0.95):
+        print(f"{threshold:>9.2f} {np.mean(same >= threshold):>7.1%} {np.mean(different >= threshold):>12.2%}")
+
+
+def stream(rng, count, threshold):
+    # Two objects per frame gives ~3900 distinct subjects to draw from; the
+    # order the objects are named in does not change the frame.
+    pairs = [(a, b) for i, a in enumerate(OBJECTS) for b in OBJECTS[i + 1:]]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FrameIndex(tmp, threshold)
+        subject_of = {}
+        wrong_scene = wrong_object = 0
+        checkpoints = {count // 10, count // 2, count}
+
+        print(f"\n{'prompts':>8} {'indexed':>8} {'reuse':>7} {'scene':>7} {'object':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for n in range(1, count + 1):
+            a, b = rng.sample(rng.choice(pairs), 2)
+            scene = rng.choice(SCENES)
+            subject = (frozenset((a, b)), scene)
+            prompt = make_prompt((f"{a} beside a {b}", scene), rng)
+
+            match = index.nearest(prompt, "bench")
+            if match is None:
+                key = f"frame-{n}"
+                subject_of[key] = subject
+                index.add(prompt, key, "bench")
+            elif subject_of[match[0]][0] != subject[0]:
+                wrong_object += 1
+            elif subject_of[match[0]][1] != scene:
+                wrong_scene += 1
+
+            if n in checkpoints:
+                stats = index.stats()
+                print(f"{n:>8} {stats['entries']:>8} {stats['reuse_rate']:>7.1%} {wrong_scene / n:>7.2%} "
+                      f"{wrong_object / n:>7.2%} {stats['lookup_ms_p50']:>8.3f} {stats['lookup_ms_p95']:>8.3f}")
+
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"\nscene / object: reused a frame of the right objects in another scene / of other objects")
+        print(f"index on disk: {size / 1024 / 1024:.1f} MB for {len(index)} frames")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else float(os.getenv("FRAME_REUSE_THRESHOLD", "0.95"))
+    rng = random.Random(0)
+
+    calibrate(rng)
+    start = time.perf_counter()
+    stream(rng, count, threshold)
+    print(f"stream of {count} prompts in {time.perf_counter() - start:.1f}s")
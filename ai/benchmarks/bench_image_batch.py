@@ -0,0 +1,43 @@
+"""
+Benchmark: SDXL Turbo throughput (images/sec) against batch size.
+
+Usage:
+    python ai/benchmarks/bench_image_batch.py [num_images] [batch sizes...]
+    python ai/benchmarks/bench_image_batch.py 16 1 2 4 8
+"""
+import os
+import sys
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import image_generator  # noqa: E402
+
+
+def load_prompts(count: int):
+    prompts = image_generator.read_prompts(os.path.join(AI_DIR, "output", "image_prompts.txt"))
+    if not prompts:
+        prompts = ["A cartoon water tank with a small orifice, landscape, smooth lines."]
+    return [prompts[i % len(prompts)] for i in range(count)]
+
+
+def run(num_images: int, batch_sizes):
+    prompts = load_prompts(num_images)
+
+    # Warm-up so the first measured run doesn't pay kernel/allocator setup.
+    image_generator.generate_images(prompts[:1], batch_size=1)
+
+    print(f"\n{'batch':>6} {'images':>7} {'seconds':>9} {'img/s':>7}")
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        images = image_generator.generate_images(prompts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        done = sum(1 for img in images if img is not None)
+        print(f"{batch_size:>6} {done:>7} {elapsed:>9.2f} {done / elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    batch_sizes = [int(b) for b in sys.argv[2:]] or [1, 2, 4, 8]
+    run(num_images, batch_sizes)
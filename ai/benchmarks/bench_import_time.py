@@ -0,0 +1,84 @@
+"""
+Benchmark: import time of every ai/ module, as a startup regression guard.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+and reports
+  - the cumulative import time of the module itself (best of `runs`,
+    so compiling bytecode on the first run is not counted)
+  - any heavy dependency the import pulled in (torch, diffusers, moviepy,
+    google.generativeai, dotenv, edge_tts)
+Heavy dependencies belong behind the first-use initialisers
+(get_pipeline, init_gemini...), so importing one is a failure, and so is
+a module over the time budget. Exits non-zero on any failure, for CI.
+
+Usage:
+    python ai/benchmarks/bench_import_time.py [budget_ms] [runs]
+"""
+import os
+import re
+import sys
+import subprocess
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("torch", "diffusers", "moviepy", "google.generativeai", "dotenv", "edge_tts")
+
+# "import time: self [us] | cumulative | imported package"
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def ai_modules():
+    return sorted(name[:-3] for name in os.listdir(AI_DIR)
+                  if name.endswith(".py") and not name.startswith("_"))
+
+
+def import_profile(module: str):
+    """(cumulative seconds for `module`, names of every module it imported)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=AI_DIR,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [AI_DIR, os.getenv("PYTHONPATH")]))),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative, imported = 0, set()
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module and len(match.group(3)) == 1:  # top level
+            cumulative = int(match.group(2))
+    return cumulative / 1e6, imported
+
+
+def heavy_imports(imported):
+    return sorted(h for h in HEAVY if any(name == h or name.startswith(h + ".") for name in imported))
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.3
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    failures = 0
+    print(f"{'module':<20} {'import ms':>9}  heavy dependencies")
+    for module in ai_modules():
+        try:
+            profiles = [import_profile(module) for _ in range(runs)]
+        except RuntimeError as e:
+            failures += 1
+            print(f"{module:<20} {'error':>9}  {e}")
+            continue
+
+        seconds = min(p[0] for p in profiles)
+        heavy = heavy_imports(profiles[0][1])
+        failed = heavy or seconds > budget
+        failures += bool(failed)
+        print(f"{module:<20} {seconds * 1000:>9.1f}  {', '.join(heavy) or '-'}"
+              f"{'  <- over budget' if seconds > budget else ''}")
+
+    print(f"\nbudget {budget * 1000:.0f} ms per module: {failures} failure(s)")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,102 @@
+"""
+Benchmark: narration durations and the pre-mixed narration track.
+
+Uses edge-tts-like clips (24 kHz mono 48 kbit/s MP3 saved as .wav) and
+reports, for growing slide counts,
+  - probing every clip from its headers vs. running `ffmpeg -i` on it
+    (what each moviepy AudioFileClip starts with), and the largest
+    difference from the decoded duration
+  - building the narration track (one decode pass, one encode pass):
+    time, time per clip, and its length against the video length from
+    slide_offsets()
+
+Usage:
+    python ai/benchmarks/bench_narration_track.py [slide counts...]
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import video_generator  # noqa: E402
+from audio_probe import header_duration  # noqa: E402
+
+CLIP_SECONDS = [3.2, 4.7, 6.1, 7.9, 5.3, 9.4, 4.1, 11.6]
+
+
+def make_clips(tmp, count):
+    """`count` clips, copied round-robin from one encoded clip per length."""
+    ffmpeg = video_generator._ffmpeg_exe()
+    sources = []
+    for i, seconds in enumerate(CLIP_SECONDS):
+        path = os.path.join(tmp, f"source_{i}.mp3")
+        if not os.path.exists(path):
+            subprocess.run([ffmpeg, "-y", "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+                            "-i", f"sine=f={220 + 40 * i}:d={seconds}", "-ar", "24000", "-ac", "1",
+                            "-c:a", "libmp3lame", "-b:a", "48k", "-write_xing", "0", path], check=True)
+        sources.append(path)
+
+    clips_dir = os.path.join(tmp, f"clips_{count}")
+    os.makedirs(clips_dir)
+    clips = []
+    for i in range(count):
+        clips.append(os.path.join(clips_dir, f"audio_{i + 1}.wav"))
+        shutil.copyfile(sources[i % len(sources)], clips[-1])
+    return clips
+
+
+def ffmpeg_duration(path):
+    """Duration as ffmpeg reports it after opening the file (header + stream probe)."""
+    out = subprocess.run([video_generator._ffmpeg_exe(), "-hide_banner", "-i", path],
+                         capture_output=True, text=True).stderr
+    h, m, s = re.search(r"Duration: (\d+):(\d+):([\d.]+)", out).groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def decoded_duration(path):
+    out = subprocess.run([video_generator._ffmpeg_exe(), "-hide_banner", "-i", path, "-f", "null", "-"],
+                         capture_output=True, text=True).stderr
+    h, m, s = re.findall(r"time=(\d+):(\d+):([\d.]+)", out)[-1]
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+if __name__ == "__main__":
+    counts = [int(c) for c in sys.argv[1:]] or [10, 40, 160]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'slides':>6} {'header ms':>10} {'ffmpeg -i ms':>13} {'max err s':>10} "
+              f"{'track s':>8} {'ms/clip':>8} {'track len':>10} {'video len':>10}")
+        for count in counts:
+            clips = make_clips(tmp, count)
+
+            start = time.perf_counter()
+            durations = [header_duration(clip) for clip in clips]
+            header = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for clip in clips:
+                ffmpeg_duration(clip)
+            opened = time.perf_counter() - start
+
+            error = max(abs(durations[i] - decoded_duration(clips[i])) for i in range(len(CLIP_SECONDS)))
+
+            slides = [(None, clip, duration) for clip, duration in zip(clips, durations)]
+            track = os.path.join(tmp, f"narration_{count}.m4a")
+            start = time.perf_counter()
+            with open(os.devnull, "w") as quiet:
+                stdout, sys.stdout = sys.stdout, quiet
+                try:
+                    video_generator.build_narration_track(slides, track)
+                finally:
+                    sys.stdout = stdout
+            mixed = time.perf_counter() - start
+
+            _, video_length = video_generator.slide_offsets(durations)
+            print(f"{count:>6} {header * 1000:>10.1f} {opened * 1000:>13.0f} {error:>10.3f} "
+                  f"{mixed:>8.2f} {mixed / count * 1000:>8.1f} {ffmpeg_duration(track):>10.2f} {video_length:>10.2f}")
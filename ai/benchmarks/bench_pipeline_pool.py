@@ -0,0 +1,67 @@
+"""
+Benchmark: cold-start time and per-job latency of the SDXL pipeline pool.
+
+Measures
+  - import time of image_generator (should not include a model load)
+  - cold get_pipeline() (first load) and warm get_pipeline() (registry hit)
+  - per-job latency of a persistent worker serving jobs from a queue
+
+Usage:
+    python ai/benchmarks/bench_pipeline_pool.py [num_jobs] [prompts_per_job]
+"""
+import os
+import sys
+import tempfile
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+PROMPT = "A cartoon water tank with a small orifice, landscape, smooth lines."
+
+
+def bench_in_process():
+    start = time.perf_counter()
+    import image_generator
+    print(f"import image_generator : {time.perf_counter() - start:8.3f}s")
+
+    from pipeline_pool import get_pipeline
+
+    start = time.perf_counter()
+    get_pipeline(image_generator.MODEL_ID)
+    print(f"cold get_pipeline()    : {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    get_pipeline(image_generator.MODEL_ID)
+    print(f"warm get_pipeline()    : {time.perf_counter() - start:8.6f}s")
+
+
+def bench_worker(num_jobs: int, prompts_per_job: int):
+    import image_generator
+
+    start = time.perf_counter()
+    process, jobs, results = image_generator.start_worker(warmup=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in range(num_jobs):
+            jobs.put({
+                "id": n,
+                "prompts": [PROMPT] * prompts_per_job,
+                "frames_dir": os.path.join(tmp, f"job_{n}"),
+            })
+
+        print(f"\n{'job':>4} {'render s':>9} {'since start s':>14}")
+        for _ in range(num_jobs):
+            result = results.get()
+            print(f"{result['id']:>4} {result['seconds']:>9.2f} {time.perf_counter() - start:>14.2f}")
+
+        jobs.put(None)
+        process.join()
+
+
+if __name__ == "__main__":
+    num_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    prompts_per_job = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    bench_in_process()
+    bench_worker(num_jobs, prompts_per_job)
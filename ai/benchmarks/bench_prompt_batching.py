@@ -0,0 +1,52 @@
+"""
+Benchmark: round trips, token volume and wall-clock time per lesson for
+batched vs per-chunk image-prompt generation, using the local fake model.
+
+Usage:
+    python ai/benchmarks/bench_prompt_batching.py [num_chunks] [latency_s]
+"""
+import os
+import sys
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+import llm_cache  # noqa: E402
+import script_generator  # noqa: E402
+from fakes import FakeGenerativeModel, fake_image_prompt_reply  # noqa: E402
+
+NARRATION = (
+    "When water rushes through an orifice, friction occurs between the fluid and the edges "
+    "of the hole, and the stream shrinks slightly right after it exits the opening."
+)
+
+
+def run(num_chunks: int, latency: float):
+    llm_cache.set_default_cache(None)
+    chunks = [f"Paragraph {i}. {NARRATION}" for i in range(1, num_chunks + 1)]
+
+    modes = [
+        ("per-chunk", lambda m: script_generator.generate_image_prompts(chunks, max_concurrency=1, model=m), 0),
+        ("batched", lambda m: script_generator.generate_image_prompts_batched(chunks, model=m), 0),
+        ("batched, 2 dropped", lambda m: script_generator.generate_image_prompts_batched(chunks, model=m), 2),
+    ]
+
+    print(f"{num_chunks} chunks per lesson, {latency:.2f}s per round trip\n")
+    print(f"{'mode':<20} {'calls':>6} {'in tok':>8} {'out tok':>8} {'seconds':>8}")
+    for name, generate, drop in modes:
+        model = FakeGenerativeModel(latency=latency, reply=lambda p, d=drop: fake_image_prompt_reply(p, drop=d))
+
+        start = time.perf_counter()
+        prompts = generate(model)
+        elapsed = time.perf_counter() - start
+
+        assert len(prompts) == num_chunks and all(prompts)
+        print(f"{name:<20} {model.calls:>6} {model.input_tokens:>8} {model.output_tokens:>8} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    run(num_chunks, latency)
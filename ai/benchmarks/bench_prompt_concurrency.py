@@ -0,0 +1,52 @@
+"""
+Benchmark: wall-clock time of image-prompt generation against concurrency,
+using the local fake Gemini model (no network access needed).
+
+Usage:
+    python ai/benchmarks/bench_prompt_concurrency.py [num_chunks] [latency_s] [quota]
+"""
+import os
+import sys
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+import llm_cache  # noqa: E402
+import script_generator  # noqa: E402
+from fakes import FakeGenerativeModel  # noqa: E402
+
+
+def run(num_chunks: int, latency: float, quota: int):
+    chunks = [f"Paragraph {i}: water leaves a tank." for i in range(num_chunks)]
+
+    # Every run must reach the (fake) model, so bypass the response cache.
+    llm_cache.set_default_cache(None)
+
+    # Keep retries quick so the numbers reflect concurrency, not sleep time.
+    script_generator.BACKOFF_BASE = latency / 2
+
+    print(f"{num_chunks} chunks, {latency:.2f}s per call, fake quota {quota} in flight\n")
+    print(f"{'concurrency':>11} {'seconds':>8} {'calls':>6} {'429s':>5} {'speedup':>8}")
+
+    baseline = None
+    for concurrency in (1, 2, 4, 8, 16):
+        model = FakeGenerativeModel(latency=latency, max_in_flight=quota)
+
+        start = time.perf_counter()
+        prompts = script_generator.generate_image_prompts(chunks, max_concurrency=concurrency, model=model)
+        elapsed = time.perf_counter() - start
+
+        assert len(prompts) == len(chunks)
+        assert all(f"Paragraph {i}:" in p for i, p in enumerate(prompts)), "results out of order"
+
+        baseline = baseline or elapsed
+        print(f"{concurrency:>11} {elapsed:>8.2f} {model.calls:>6} {model.rate_limited:>5} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    quota = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    run(num_chunks, latency, quota)
@@ -0,0 +1,75 @@
+"""
+Benchmark: SDXL Turbo re-renders with and without the prompt embedding cache.
+
+Every prompt is rendered `rounds` times (like re-rendering a frame with
+another seed, size or variant). Reports
+  - the time of one encode_prompt() call (both CLIP text encoders)
+  - seconds per frame with the cache off, and with it warm
+  - the per-frame time saved, measured and as estimated by the cache
+The render cache is bypassed so every frame runs the pipeline.
+
+Usage:
+    python ai/benchmarks/bench_prompt_embeddings.py [rounds] [num_prompts]
+"""
+import os
+import sys
+import time
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import torch  # noqa: E402
+
+import image_generator  # noqa: E402
+from pipeline_pool import get_pipeline  # noqa: E402
+from prompt_embeddings import PromptEmbeddingCache  # noqa: E402
+
+PROMPTS = [
+    "A cartoon water tank with a small orifice, landscape, smooth lines.",
+    "A friendly cartoon teacher pointing at a whiteboard with a diagram.",
+    "A cartoon river flowing past a water wheel, bright colours.",
+    "A cartoon volcano erupting next to a small village, simple shapes.",
+]
+
+
+def per_frame(prompts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for prompt in prompts:
+            image_generator._run_pipe([prompt])
+    return (time.perf_counter() - start) / (rounds * len(prompts))
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else len(PROMPTS)
+    prompts = [PROMPTS[i % len(PROMPTS)] + ("" if i < len(PROMPTS) else f" Variant {i}.") for i in range(count)]
+
+    pipe = get_pipeline(image_generator.MODEL_ID, warmup=True)
+
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for prompt in prompts:
+            pipe.encode_prompt(prompt=[prompt], device=pipe.device, num_images_per_prompt=1,
+                               do_classifier_free_guidance=False)
+    encode = (time.perf_counter() - start) / len(prompts)
+
+    # Cache off: every frame runs the text encoders
+    image_generator.PROMPT_EMBED_CACHE_ENTRIES = 0
+    image_generator._embedding_cache = None
+    off = per_frame(prompts, rounds)
+
+    # Cache on, warmed by one pass so the timed frames are all hits
+    image_generator._embedding_cache = cache = PromptEmbeddingCache(max_entries=len(prompts))
+    per_frame(prompts, 1)
+    on = per_frame(prompts, rounds)
+    stats = cache.stats()
+
+    print(f"\n{len(prompts)} prompts x {rounds} rounds, {image_generator.WIDTH}x{image_generator.HEIGHT}, "
+          f"{image_generator.NUM_STEPS} step(s)")
+    print(f"encode_prompt            {encode * 1000:8.0f} ms")
+    print(f"per frame, cache off     {off * 1000:8.0f} ms")
+    print(f"per frame, cache warm    {on * 1000:8.0f} ms")
+    print(f"saved per frame          {(off - on) * 1000:8.0f} ms ({(off - on) / off:.0%})")
+    print(f"cache estimate           {stats['encode_ms_per_prompt']:8.0f} ms per hit, "
+          f"{stats['hits']} hits / {stats['misses']} misses")
@@ -0,0 +1,81 @@
+"""
+Benchmark: the narration (TTS) cache across lessons, using the local fake
+TTS backend (no network access needed).
+
+Voices the same lesson three times, each in a fresh workspace:
+  cold      empty cache
+  repeat    identical narration (e.g. the same topic requested again)
+  edited    two paragraphs changed, one only in whitespace
+and reports backend calls, seconds and cache hits per run, then how
+eviction keeps the cache under a small size cap.
+
+Usage:
+    python ai/benchmarks/bench_tts_cache.py [num_paragraphs] [latency_s]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import voice_generator  # noqa: E402
+from fakes import FakeTTSBackend  # noqa: E402
+from segments import SegmentManifest  # noqa: E402
+from tts_cache import TTSCache  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+
+
+def narration(count: int, edited: bool = False) -> str:
+    paragraphs = [f"Paragraph {i}. Water flows out of the tank through a small hole at the bottom." for i in range(count)]
+    if edited:
+        paragraphs[1] = paragraphs[1].replace("small hole", "narrow orifice")
+        paragraphs[2] = paragraphs[2].replace(" ", "  ", 3)  # same words, different spacing
+    return "\n\n".join(paragraphs)
+
+
+def voice_lesson(root: str, name: str, text: str, latency: float):
+    workspace = LessonWorkspace(name, root=root).create()
+    manifest = SegmentManifest.for_workspace(workspace)
+    manifest.sync_text(text)
+
+    cache = voice_generator.get_tts_cache()
+    hits = cache.hits
+    backend = FakeTTSBackend(latency=latency)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as quiet:
+        stdout, sys.stdout = sys.stdout, quiet
+        try:
+            asyncio.run(voice_generator.generate_segment_audio(manifest, workspace, backend=backend))
+        finally:
+            sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+
+    assert all(seg.get("duration") for seg in manifest.segments)
+    return backend.calls, elapsed, cache.hits - hits
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        voice_generator._tts_cache = TTSCache(os.path.join(tmp, "cache"), 64 * 1024 * 1024)
+
+        print(f"{count} paragraphs, {latency:.2f}s per synthesis\n")
+        print(f"{'run':<8} {'synthesized':>11} {'cache hits':>10} {'seconds':>8}")
+        for name, text in (("cold", narration(count)), ("repeat", narration(count)),
+                           ("edited", narration(count, edited=True))):
+            calls, elapsed, hits = voice_lesson(os.path.join(tmp, "jobs"), name, text, latency)
+            print(f"{name:<8} {calls:>11} {hits:>10} {elapsed:>8.2f}")
+
+        cache = voice_generator.get_tts_cache()
+        per_clip = cache.stats()["bytes"] / (count + 1)
+        voice_generator._tts_cache = small = TTSCache(os.path.join(tmp, "small"), int(per_clip * count / 2))
+        voice_lesson(os.path.join(tmp, "jobs"), "capped", narration(count), latency=0.0)
+        stats = small.stats()
+        sidecars = sum(name.endswith(TTSCache.SIDECAR) for _, _, files in os.walk(small.directory) for name in files)
+        print(f"\ncap {stats['max_bytes'] / 1024:.0f} KB: {stats['bytes'] / 1024:.0f} KB kept, "
+              f"{stats['evictions']} evicted, {sidecars} sidecars left")
@@ -0,0 +1,44 @@
+"""
+Benchmark: TTS throughput against concurrency, using the local fake TTS
+backend (no network access needed).
+
+Usage:
+    python ai/benchmarks/bench_tts_concurrency.py [num_paragraphs] [latency_s]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+# Every run must synthesize: no cached clips
+os.environ["TTS_CACHE_DIR"] = ""
+
+import voice_generator  # noqa: E402
+from fakes import FakeTTSBackend  # noqa: E402
+
+
+def run(num_paragraphs: int, latency: float):
+    paragraphs = [f"Paragraph {i}. Water flows out of the tank through a small hole." for i in range(num_paragraphs)]
+
+    print(f"\n{'concurrency':>11} {'seconds':>8} {'para/s':>7} {'peak':>5}")
+    for concurrency in (1, 2, 4, 8):
+        backend = FakeTTSBackend(latency=latency)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            paths = asyncio.run(voice_generator.generate_audio(
+                paragraphs, output_dir=tmp, max_concurrency=concurrency, backend=backend
+            ))
+            elapsed = time.perf_counter() - start
+            assert all(os.path.exists(p) for p in paths)
+
+        print(f"{concurrency:>11} {elapsed:>8.2f} {num_paragraphs / elapsed:>7.2f} {backend.max_in_flight:>5}")
+
+
+if __name__ == "__main__":
+    num_paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    run(num_paragraphs, latency)
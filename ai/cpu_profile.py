@@ -0,0 +1,173 @@
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ----------------------------
+# CPU INFERENCE PROFILES
+# ----------------------------
+# How the SDXL pipeline is tuned when it runs on CPU. Pick one with
+# SDXL_CPU_PROFILE; single knobs can be overridden with SDXL_CPU_THREADS,
+# SDXL_CPU_COMPILE=1/0 and SDXL_TINY_VAE=1/0.
+# torch is imported by the functions that need it, not at import.
+#
+#   baseline    float32, no tuning (the old behaviour)
+#   balanced    bf16 where the CPU supports it, channels-last, sliced VAE decode
+#   low-memory  balanced + attention slicing and tiled VAE decode
+#   fast        balanced + tiny VAE decoder + torch.compile
+PROFILES = {
+    "baseline": {
+        "bf16": False, "channels_last": False, "attention_slicing": False,
+        "vae_slicing": False, "vae_tiling": False, "tiny_vae": False, "compile": False,
+    },
+    "balanced": {
+        "bf16": True, "channels_last": True, "attention_slicing": False,
+        "vae_slicing": True, "vae_tiling": False, "tiny_vae": False, "compile": False,
+    },
+    "low-memory": {
+        "bf16": True, "channels_last": True, "attention_slicing": True,
+        "vae_slicing": True, "vae_tiling": True, "tiny_vae": False, "compile": False,
+    },
+    "fast": {
+        "bf16": True, "channels_last": True, "attention_slicing": False,
+        "vae_slicing": False, "vae_tiling": False, "tiny_vae": True, "compile": True,
+    },
+}
+DEFAULT_PROFILE = os.getenv("SDXL_CPU_PROFILE", "balanced")
+
+TINY_VAE_ID = os.getenv("SDXL_TINY_VAE_ID", "madebyollin/taesdxl")
+
+# Compiled kernels are cached on disk, so only the first worker on a host
+# pays the full compile during warm-up.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILE_CACHE_DIR = os.getenv("TORCHINDUCTOR_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "inductor"))
+
+
+def _env_flag(name: str):
+    value = os.getenv(name)
+    return None if value is None else value == "1"
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (respects affinity / container limits)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def bf16_supported() -> bool:
+    """True when the CPU has native bfloat16 matmuls (AVX512-BF16 or AMX)."""
+    import torch
+    check = getattr(getattr(torch, "cpu", None), "_is_avx512_bf16_supported", None)
+    try:
+        return bool(check and check())
+    except Exception:
+        return False
+
+
+def get_profile(name: str = None) -> dict:
+    """The named profile (default: SDXL_CPU_PROFILE) with env overrides applied."""
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown CPU profile {name!r}; choose one of {', '.join(PROFILES)}")
+
+    profile = dict(PROFILES[name], name=name)
+    profile["threads"] = int(os.getenv("SDXL_CPU_THREADS", "0")) or available_cores()
+    for key, env in (("compile", "SDXL_CPU_COMPILE"), ("tiny_vae", "SDXL_TINY_VAE")):
+        override = _env_flag(env)
+        if override is not None:
+            profile[key] = override
+    profile["bf16"] = profile["bf16"] and bf16_supported()
+    return profile
+
+
+def profile_dtype(profile: dict):
+    import torch
+    return torch.bfloat16 if profile["bf16"] else torch.float32
+
+
+def output_variant(profile: dict) -> str:
+    """
+    The part of a profile that changes rendered pixels, for cache keys
+    ("" for the untuned float32 output).
+    """
+    return "+".join(part for part in (
+        "bf16" if profile["bf16"] else "",
+        "tiny-vae" if profile["tiny_vae"] else "",
+    ) if part)
+
+
+def describe(profile: dict) -> str:
+    knobs = [k for k in ("bf16", "channels_last", "attention_slicing", "vae_slicing",
+                         "vae_tiling", "tiny_vae", "compile") if profile[k]]
+    return f"{profile['name']} ({profile['threads']} threads; {', '.join(knobs) or 'no tuning'})"
+
+
+# ----------------------------
+# APPLY TO A PIPELINE
+# ----------------------------
+def apply_threads(profile: dict):
+    import torch
+    torch.set_num_threads(profile["threads"])
+    try:
+        # Only allowed before any inter-op parallel work has started
+        torch.set_num_interop_threads(max(1, min(4, profile["threads"] // 4)))
+    except RuntimeError:
+        pass
+
+
+def pipeline_components(profile: dict, dtype) -> dict:
+    """
+    Components to pass to from_pretrained() in place of the defaults, so a
+    replaced module (the full VAE, with the tiny decoder) is never loaded.
+    """
+    if not profile["tiny_vae"]:
+        return {}
+    from diffusers import AutoencoderTiny
+    return {"vae": AutoencoderTiny.from_pretrained(TINY_VAE_ID, torch_dtype=dtype)}
+
+
+def apply_profile(pipe, profile: dict):
+    """Tune a loaded CPU pipeline in place according to `profile`; returns it."""
+    import torch
+
+    apply_threads(profile)
+
+    if profile["channels_last"]:
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+
+    if profile["attention_slicing"]:
+        pipe.enable_attention_slicing()
+    if profile["vae_slicing"]:
+        pipe.vae.enable_slicing()
+    if profile["vae_tiling"]:
+        pipe.vae.enable_tiling()
+
+    if profile["compile"]:
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", COMPILE_CACHE_DIR)
+        try:
+            import torch._inductor.config as inductor_config
+            inductor_config.fx_graph_cache = True
+        except (ImportError, AttributeError):
+            pass
+        # Compiled lazily on the first call; get_pipeline(warmup=True) pays it up front
+        pipe.unet = torch.compile(pipe.unet)
+        pipe.vae.decode = torch.compile(pipe.vae.decode)
+
+    return pipe
+
+
+# ----------------------------
+# REPORTING
+# ----------------------------
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 / 1024 if os.uname().sysname == "Darwin" else peak / 1024
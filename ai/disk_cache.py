@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import threading
+
+import metrics
+
+
+# ----------------------------
+# CACHE KEYS
+# ----------------------------
+def make_key(**fields) -> str:
+    """Stable content hash of the given fields (order independent)."""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ----------------------------
+# ON-DISK LRU CACHE
+# ----------------------------
+class DiskLRUCache:
+    """
+    Content-addressed file cache with a total size cap.
+
+    Entries live at <directory>/<key[:2]>/<key><suffix>. A file's mtime is
+    its last-use time: hits touch it, and when the cache grows past
+    `max_bytes` the least recently used files are deleted until it is back
+    under `low_water` of the cap, so the directory isn't rescanned on every
+    store once the cache is full. Companion
+    files of an entry (see _companions()) count towards its size and are
+    deleted with it.
+    Lookups are counted in metrics as cache_lookups{cache=<name>}.
+    """
+
+    name = "disk"
+    low_water = 0.9
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def lookup(self, key: str):
+        """Return the cached file path for `key` (and mark it used), or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            metrics.inc("cache_lookups", cache=self.name, result="miss")
+            return None
+
+        with self._lock:
+            self.hits += 1
+        metrics.inc("cache_lookups", cache=self.name, result="hit")
+        return path
+
+    def store(self, key: str, write):
+        """
+        Add an entry. `write(tmp_path)` must write the file; it is then
+        moved into place atomically so readers never see partial files.
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            size = self._entry_bytes(path, os.path.getsize(tmp_path))
+            old_size = self._entry_bytes(path, os.path.getsize(path)) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self._total_bytes += size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+        return path
+
+    def _entries(self):
+        """Yield (path, size with companions, mtime) for every cached entry."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix) or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, self._entry_bytes(path, st.st_size), st.st_mtime
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * self.low_water)
+
+        for path, size, _ in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                self._remove(path)
+            except FileNotFoundError:
+                pass
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def _companions(self, path: str):
+        """Paths of the files stored alongside the entry at `path` (sidecars)."""
+        return ()
+
+    def _entry_bytes(self, path: str, size: int) -> int:
+        for companion in self._companions(path):
+            try:
+                size += os.path.getsize(companion)
+            except FileNotFoundError:
+                pass
+        return size
+
+    def _remove(self, path: str):
+        """Delete one evicted entry and its companion files."""
+        os.remove(path)
+        for companion in self._companions(path):
+            try:
+                os.remove(companion)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
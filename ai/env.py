@@ -0,0 +1,19 @@
+# ----------------------------
+# .ENV FOR SCRIPTS
+# ----------------------------
+# Modules read their settings from the environment when they are
+# imported, so a script must load .env before it imports them: each
+# stage's __main__ guard calls load_env() ahead of its other ai/ imports.
+# Processes that import ai/ as a library (the lesson workers) get their
+# environment from their own configuration.
+_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ, once; variables already set win."""
+    global _loaded
+    if not _loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _loaded = True
@@ -0,0 +1,176 @@
+"""
+Local stand-ins for the external services used by the ai/ pipeline, so
+stages can be exercised and benchmarked offline.
+"""
+import re
+import json
+import threading
+import time
+
+
+# ----------------------------
+# FAKE GEMINI
+# ----------------------------
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def fake_image_prompt_reply(prompt: str, drop: int = 0) -> str:
+    """
+    Answer both prompt-request formats of script_generator: a JSON array
+    for the batched request (leaving out the last `drop` entries) and a
+    single line for the per-chunk request.
+    """
+    batch = re.findall(r'^\[(\d+)\] "(.*)"$', prompt, flags=re.MULTILINE)
+    if batch:
+        items = [{"index": int(i), "prompt": f"Cartoon illustration of: {text[:60]}"} for i, text in batch]
+        return json.dumps(items[:len(items) - drop] if drop else items)
+
+    narration = re.search(r'Narration:\s*"(.*)"', prompt, flags=re.DOTALL)
+    text = narration.group(1) if narration else prompt.strip()
+    return f"Cartoon illustration of: {text[:60]}"
+
+
+class ResourceExhausted(Exception):
+    """Mimics google.api_core.exceptions.ResourceExhausted (HTTP 429)."""
+    code = 429
+
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Content:
+    def __init__(self, text):
+        self.parts = [_Part(text)]
+
+
+class _Candidate:
+    def __init__(self, text):
+        self.content = _Content(text)
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0, output_tokens: int = 0):
+        self.text = text
+        self.candidates = [_Candidate(text)]
+        self.usage_metadata = _UsageMetadata(prompt_tokens, output_tokens)
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel.generate_content().
+
+    - `latency`: seconds each call takes (simulated network round trip)
+    - `max_in_flight`: calls beyond this many concurrent requests raise
+      ResourceExhausted, like a per-key rate limit
+    - `reply`: callable(prompt) -> text; defaults to an echo of the prompt tail
+    - `model_name`: what it reports as GenerativeModel.model_name (keeps
+      its replies apart from the real model's in the LLM cache)
+
+    `calls`, `input_tokens` and `output_tokens` count the traffic a real
+    model would have been sent; responses report the same counts in
+    usage_metadata. With `stream=True` the reply is returned as an iterator
+    of small chunks spread over `latency`, each with the usage so far.
+    """
+
+    def __init__(self, latency: float = 0.3, max_in_flight: int = None, reply=None,
+                 model_name: str = "models/fake-gemini"):
+        self.model_name = model_name
+        self.latency = latency
+        self.max_in_flight = max_in_flight
+        self.reply = reply or (lambda prompt: "Cartoon illustration of: " + prompt.strip()[-60:])
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        if stream:
+            return self._stream(prompt)
+        return self._generate(prompt)
+
+    def _stream(self, prompt, chunk_chars: int = 40):
+        text = self._generate(prompt, latency=0.0).text
+        pieces = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+        sent = ""
+        for piece in pieces:
+            time.sleep(self.latency / len(pieces))
+            sent += piece
+            yield FakeResponse(piece, estimate_tokens(prompt), estimate_tokens(sent))
+
+    def _generate(self, prompt, latency=None):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += estimate_tokens(prompt)
+            if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+                self.rate_limited += 1
+                raise ResourceExhausted("429 Resource has been exhausted (fake quota)")
+            self._in_flight += 1
+
+        try:
+            time.sleep(self.latency if latency is None else latency)
+            text = self.reply(prompt)
+            with self._lock:
+                self.output_tokens += estimate_tokens(text)
+            return FakeResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+# ----------------------------
+# FAKE TTS
+# ----------------------------
+class FakeTTSBackend:
+    """
+    Stand-in for voice_generator.EdgeTTSBackend. Each call sleeps for
+    `latency` seconds and writes a silent 16-bit mono WAV whose length
+    follows the word count (~2.5 words/sec, like real narration).
+    Every `fail_every`-th call raises, once per text, to exercise retries.
+    """
+
+    def __init__(self, latency: float = 0.5, fail_every: int = None, sample_rate: int = 8000):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._failed = set()
+
+    def settings(self) -> dict:
+        return {"backend": "fake", "sample_rate": self.sample_rate}
+
+    async def synthesize(self, text: str, voice: str, path: str):
+        import asyncio
+        import wave
+
+        self.calls += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail_every and self.calls % self.fail_every == 0 and text not in self._failed:
+                self._failed.add(text)
+                raise ConnectionError("fake transient TTS failure")
+
+            seconds = max(0.5, len(text.split()) / 2.5)
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(self.sample_rate)
+                w.writeframes(b"\x00\x00" * int(seconds * self.sample_rate))
+        finally:
+            self._in_flight -= 1
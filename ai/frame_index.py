@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from collections import deque
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialised
+    fcntl = None
+
+
+# ----------------------------
+# PROMPT EMBEDDINGS
+# ----------------------------
+# Prompts repeat across lessons with small wording changes, so a cheap
+# lexical embedding is enough to spot them: hashed word, word-pair and
+# character-trigram features (signed feature hashing) in DIM dimensions,
+# L2-normalised so a dot product is the cosine similarity.
+DIM = int(os.getenv("FRAME_INDEX_DIM", "256"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "the", "of", "with", "and", "in", "on", "to", "for", "at", "by", "is", "its"}
+
+# Feature weights: whole words carry most of the meaning, trigrams absorb
+# plurals and small spelling changes, word pairs keep some word order.
+WORD_WEIGHT = 1.0
+PAIR_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.25
+
+
+def _add_feature(vec: np.ndarray, feature: str, weight: float):
+    h = zlib.crc32(feature.encode("utf-8"))
+    vec[h % len(vec)] += weight if h & 0x80000000 else -weight
+
+
+def embed(text: str, dim: int = DIM) -> np.ndarray:
+    words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+    vec = np.zeros(dim, dtype=np.float32)
+
+    for word in words:
+        _add_feature(vec, "w:" + word, WORD_WEIGHT)
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            _add_feature(vec, "c:" + padded[i:i + 3], TRIGRAM_WEIGHT)
+    for first, second in zip(words, words[1:]):
+        _add_feature(vec, f"p:{first} {second}", PAIR_WEIGHT)
+
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# ----------------------------
+# FRAME INDEX
+# ----------------------------
+class FrameIndex:
+    """
+    Nearest-neighbour index over the prompts of frames already rendered.
+
+        <directory>/vectors.f16    float16 matrix (rows x dim), memory-mapped
+        <directory>/entries.jsonl  one {"key", "scope", "prompt"} line per row,
+                                   or {"key", "removed": true} to drop a key
+
+    `key` is the frame's render cache key; `scope` groups frames that are
+    interchangeable (same size, model, steps, variant...), and only rows
+    in the query's scope are considered. Appends are serialised with a
+    file lock so several worker processes can share one index; each
+    process picks up the others' rows on its next lookup.
+
+    The file stays float16; each process keeps a float32 copy per scope
+    in memory so a lookup is one BLAS matrix-vector product.
+    """
+
+    VECTORS = "vectors.f16"
+    ENTRIES = "entries.jsonl"
+    INITIAL_ROWS = 1024
+    # Latency percentiles in stats() cover this many recent lookups
+    LATENCY_WINDOW = 1024
+
+    def __init__(self, directory: str, threshold: float, dim: int = DIM):
+        self.directory = directory
+        self.threshold = threshold
+        self.dim = dim
+
+        self.lookups = 0
+        self.reused = 0
+        self.lookup_seconds = deque(maxlen=self.LATENCY_WINDOW)
+
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._keys = []
+        self._prompts = []
+        self._scopes = {}   # scope -> {"rows": [row, ...], "matrix": float32 (capacity x dim)}
+        self._entries_offset = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, self.VECTORS)
+        self._entries_path = os.path.join(directory, self.ENTRIES)
+        self._lock_path = os.path.join(directory, "index.lock")
+        with self._lock:
+            self._refresh()
+
+    def __len__(self):
+        """Rows that can still be matched (discarded keys excluded)."""
+        return sum(len(group["rows"]) for group in self._scopes.values())
+
+    # ----------------------------
+    # STORAGE
+    # ----------------------------
+    def _capacity(self) -> int:
+        try:
+            return os.path.getsize(self._vectors_path) // (self.dim * 2)
+        except FileNotFoundError:
+            return 0
+
+    def _map(self):
+        rows = self._capacity()
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+", shape=(rows, self.dim)) \
+            if rows else None
+
+    def _refresh(self):
+        """Load rows appended (by any process) since the last refresh."""
+        try:
+            size = os.path.getsize(self._entries_path)
+        except FileNotFoundError:
+            return
+        if size == self._entries_offset:
+            return
+
+        with open(self._entries_path, "rb") as f:
+            f.seek(self._entries_offset)
+            chunk = f.read()
+        # A line still being written by another process is picked up next time
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._entries_offset += len(complete)
+
+        entries = [json.loads(line) for line in complete.decode("utf-8").splitlines()]
+        if self._vectors is None or len(self._vectors) < len(self._keys) + len(entries):
+            self._map()
+
+        for entry in entries:
+            if entry.get("removed"):
+                self._drop(entry["key"])
+                continue
+            row = len(self._keys)
+            self._keys.append(entry["key"])
+            self._prompts.append(entry["prompt"])
+            self._add_to_scope(entry["scope"], row)
+
+    def _add_to_scope(self, scope: str, row: int):
+        group = self._scopes.setdefault(scope, {"rows": [], "matrix": np.zeros((0, self.dim), dtype=np.float32)})
+        count = len(group["rows"])
+        if count == len(group["matrix"]):
+            grown = np.zeros((max(64, count * 2), self.dim), dtype=np.float32)
+            grown[:count] = group["matrix"]
+            group["matrix"] = grown
+        group["matrix"][count] = self._vectors[row]
+        group["rows"].append(row)
+
+    def _drop(self, key: str):
+        """Stop matching `key`'s rows; their vectors stay in the file, unused."""
+        for group in self._scopes.values():
+            keep = [i for i, row in enumerate(group["rows"]) if self._keys[row] != key]
+            if len(keep) < len(group["rows"]):
+                group["matrix"][:len(keep)] = group["matrix"][keep]
+                group["rows"] = [group["rows"][i] for i in keep]
+
+    def _grow(self, rows_needed: int):
+        capacity = self._capacity()
+        if capacity >= rows_needed:
+            return
+        new_capacity = max(self.INITIAL_ROWS, capacity * 2, rows_needed)
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 2)
+        self._map()
+
+    # ----------------------------
+    # LOOKUP / ADD
+    # ----------------------------
+    def nearest(self, prompt: str, scope: str):
+        """
+        (render key, similarity, indexed prompt) of the most similar indexed
+        prompt in `scope`, or None when nothing reaches the threshold.
+        """
+        start = time.perf_counter()
+        # Rounded through float16 like the stored rows, so an identical prompt scores ~1.0
+        query = embed(prompt, self.dim).astype(np.float16).astype(np.float32)
+
+        with self._lock:
+            self._refresh()
+            match = None
+            group = self._scopes.get(scope)
+            if group and group["rows"]:
+                similarity = group["matrix"][:len(group["rows"])] @ query
+                best = int(np.argmax(similarity))
+                score = float(similarity[best])
+                if score >= self.threshold:
+                    row = group["rows"][best]
+                    match = (self._keys[row], score, self._prompts[row])
+
+            self.lookups += 1
+            self.lookup_seconds.append(time.perf_counter() - start)
+        return match
+
+    def record_reuse(self):
+        """Count a match whose frame was actually read from the render cache."""
+        with self._lock:
+            self.reused += 1
+
+    def add(self, prompt: str, key: str, scope: str):
+        vector = embed(prompt, self.dim).astype(np.float16)
+        line = json.dumps({"key": key, "scope": scope, "prompt": prompt}, ensure_ascii=False) + "\n"
+
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                row = len(self._keys)
+                self._grow(row + 1)
+                self._vectors[row] = vector
+                self._vectors.flush()
+                # The entry line is what publishes the row to other processes
+                with open(self._entries_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self._refresh()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def discard(self, key: str):
+        """
+        Forget `key` (its frame was evicted from the render cache), in
+        every process sharing the index. Adding it again later works.
+        """
+        line = json.dumps({"key": key, "removed": True}) + "\n"
+
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self._entries_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self._refresh()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.lookup_seconds)
+
+        def percentile_ms(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {
+            "entries": len(self),
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "reuse_rate": self.reused / self.lookups if self.lookups else 0.0,
+            "lookup_ms_p50": percentile_ms(0.50),
+            "lookup_ms_p95": percentile_ms(0.95),
+        }
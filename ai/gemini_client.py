@@ -0,0 +1,65 @@
+import os
+import threading
+
+import metrics
+from env import load_env
+
+# ----------------------------
+# GEMINI CLIENT (LAZY)
+# ----------------------------
+# google.generativeai and dotenv are imported, and the API key checked,
+# on the first request rather than at import, so modules that only
+# read or save files (and the processes that import them) start fast.
+_genai = None
+_lock = threading.Lock()
+
+
+def init_gemini():
+    """
+    Load .env, check GEMINI_API_KEY and configure the Gemini client, once
+    per process; returns the configured google.generativeai module.
+    Raises ValueError when the key is missing.
+    """
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                load_env()
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not found.")
+
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+def new_model(model_name: str):
+    """A GenerativeModel for `model_name`, initialising the client on first use."""
+    return init_gemini().GenerativeModel(model_name)
+
+
+def model_name(model, default: str) -> str:
+    """
+    Name of the model `model` talks to (GenerativeModel.model_name, without
+    the "models/" prefix), or `default` for None or a model that doesn't
+    say. Cache keys use it, so a response is only reused for the same model.
+    """
+    name = getattr(model, "model_name", None)
+    if not isinstance(name, str) or not name:
+        return default
+    return name.removeprefix("models/")
+
+
+def record_usage(response, caller: str):
+    """Count a finished request and its tokens (from usage_metadata, when the response has it)."""
+    metrics.inc("gemini_requests", caller=caller)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+        count = getattr(usage, field, 0) or 0
+        if count:
+            metrics.inc("gemini_tokens", count, caller=caller, kind=kind)
@@ -1,25 +1,31 @@
 import os
-from diffusers import StableDiffusionXLPipeline
-import torch
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
 
-# ----------------------------
-# LOAD SDXL TURBO MODEL
-# ----------------------------
-print("🔄 Loading SDXL Turbo model... (first time slow, then cached)")
-
-pipe = StableDiffusionXLPipeline.from_pretrained(
-    "stabilityai/sdxl-turbo",
-    torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-    variant="fp16"
-)
+import cpu_profile  # noqa: E402
+import metrics  # noqa: E402
+from pipeline_pool import DEFAULT_MODEL_ID, default_device, get_pipeline, register_warmup_hook  # noqa: E402
+from render_cache import RenderCache  # noqa: E402
+from frame_index import FrameIndex  # noqa: E402
+from prompt_embeddings import EmbeddingSpill, PromptEmbeddingCache  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+from segments import SegmentManifest  # noqa: E402
 
-# Determine device
-device = "cuda" if torch.cuda.is_available() else "cpu"
-pipe = pipe.to(device)
 
-print(f"✅ Using device: {device}")
+# ----------------------------
+# SDXL TURBO MODEL
+# ----------------------------
+# The pipeline is loaded lazily by get_pipeline() on the first render,
+# and torch is imported with it, so importing this module (e.g. for
+# read_prompts) stays cheap.
+MODEL_ID = os.getenv("SDXL_MODEL_ID", DEFAULT_MODEL_ID)
 
 
 # ----------------------------
@@ -46,58 +52,431 @@ def read_prompts(path):
     return prompts
 
 
+# ----------------------------
+# GENERATION SETTINGS
+# ----------------------------
+WIDTH = 1024
+HEIGHT = 576
+NUM_STEPS = 1          # SDXL Turbo uses only 1 step — super fast
+GUIDANCE_SCALE = 0.0
+BATCH_SIZE = int(os.getenv("SDXL_BATCH_SIZE", "4"))
+SEED = int(os.getenv("SDXL_SEED", "0"))  # fixed per-prompt seed → reproducible, cacheable frames
+
+
+# ----------------------------
+# PROMPT EMBEDDING CACHE
+# ----------------------------
+# Text-encoder outputs are reused for prompts seen before, so a re-render
+# (other seed, size or variant) only runs the UNet and VAE.
+# PROMPT_EMBED_CACHE_ENTRIES=0 disables it; PROMPT_EMBED_CACHE_DIR also
+# spills entries to disk (off by default).
+PROMPT_EMBED_CACHE_ENTRIES = int(os.getenv("PROMPT_EMBED_CACHE_ENTRIES", "128"))
+PROMPT_EMBED_CACHE_DIR = os.getenv("PROMPT_EMBED_CACHE_DIR", "")
+PROMPT_EMBED_CACHE_MAX_MB = int(os.getenv("PROMPT_EMBED_CACHE_MAX_MB", "1024"))
+
+_embedding_cache = None
+
+
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None and PROMPT_EMBED_CACHE_ENTRIES > 0:
+        spill = EmbeddingSpill(PROMPT_EMBED_CACHE_DIR, PROMPT_EMBED_CACHE_MAX_MB * 1024 * 1024) \
+            if PROMPT_EMBED_CACHE_DIR else None
+        _embedding_cache = PromptEmbeddingCache(PROMPT_EMBED_CACHE_ENTRIES, spill)
+    return _embedding_cache
+
+
+def _run_pipe(prompts):
+    """Run one forward pass of the pipeline for a list of prompts."""
+    import torch
+
+    pipe = get_pipeline(MODEL_ID)
+    embeddings = get_embedding_cache()
+
+    with metrics.span("sdxl.batch", batch=len(prompts)):
+        if embeddings:
+            prompt_embeds, pooled_prompt_embeds = embeddings.embed(pipe, MODEL_ID, prompts)
+            text_inputs = dict(prompt_embeds=prompt_embeds, pooled_prompt_embeds=pooled_prompt_embeds)
+        else:
+            text_inputs = dict(prompt=list(prompts))
+
+        images = pipe(
+            **text_inputs,
+            width=WIDTH,
+            height=HEIGHT,
+            num_inference_steps=NUM_STEPS,
+            guidance_scale=GUIDANCE_SCALE,
+            generator=[torch.Generator("cpu").manual_seed(SEED) for _ in prompts]
+        ).images
+
+    metrics.inc("frames", len(images), source="rendered")
+    return images
+
+
+def warmup_pipeline(pipe):
+    """
+    Warm up at the real frame size: compiled (torch.compile) and oneDNN
+    kernels are specialised for the shapes they first see.
+    """
+    pipe(
+        prompt="warm-up",
+        width=WIDTH,
+        height=HEIGHT,
+        num_inference_steps=NUM_STEPS,
+        guidance_scale=GUIDANCE_SCALE
+    )
+
+
+register_warmup_hook(warmup_pipeline)
+
+
+def _is_out_of_memory(error: Exception) -> bool:
+    import torch
+
+    oom_type = getattr(torch.cuda, "OutOfMemoryError", None)
+    if oom_type is not None and isinstance(error, oom_type):
+        return True
+    return isinstance(error, MemoryError) or "out of memory" in str(error).lower()
+
+
+# ----------------------------
+# RENDER CACHE
+# ----------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "frames"))
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+
+_render_cache = None
+
+
+def get_render_cache():
+    """Shared frame cache, or None when RENDER_CACHE_DIR is set to an empty string."""
+    global _render_cache
+    if _render_cache is None and RENDER_CACHE_DIR:
+        _render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB * 1024 * 1024)
+    return _render_cache
+
+
+# PNG-encoding a rendered frame into the cache is done by a background
+# writer, so the render lane moves on to the next prompt right away. The
+# writer thread is started by the first render, not at import.
+_cache_writer = None
+_cache_writer_lock = threading.Lock()
+_pending_writes = set()
+
+
+def _get_cache_writer():
+    global _cache_writer
+    with _cache_writer_lock:
+        if _cache_writer is None:
+            _cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render-cache")
+    return _cache_writer
+
+
+def _store_frame(prompt: str, key: str, variant: str, image: Image.Image):
+    def write():
+        # Nobody waits on this future before it is dropped, so failures are
+        # reported here: the frame is just left out of the cache and index
+        try:
+            get_render_cache().put(key, image)
+            # Indexed only once written, so a match always has a cache entry to read
+            _index_frame(prompt, key, variant)
+        except Exception as e:
+            metrics.inc("span_errors", span="render_cache.write", caller="render")
+            print(f"⚠ Could not cache frame: {e!r}")
+
+    future = _get_cache_writer().submit(write)
+    _pending_writes.add(future)
+    future.add_done_callback(_pending_writes.discard)
+
+
+def wait_for_cache_writes():
+    """Block until every frame handed to the background writer is in the render cache."""
+    for future in list(_pending_writes):
+        future.result()
+
+
+def cached_frame_path(prompt: str):
+    """
+    Where the render cache keeps (or will keep, once written) the frame for
+    `prompt`, or None without a render cache. Lets a manifest point at the
+    frame when it isn't also written to the workspace.
+    """
+    cache = get_render_cache()
+    return cache.path_for(_cache_key(prompt)) if cache else None
+
+
+def _output_variant() -> str:
+    if default_device() != "cpu":
+        return ""
+    return cpu_profile.output_variant(cpu_profile.get_profile())
+
+
+def _cache_key(prompt: str, variant: str = None) -> str:
+    if variant is None:
+        variant = _output_variant()
+    return RenderCache.key(prompt, WIDTH, HEIGHT, NUM_STEPS, GUIDANCE_SCALE, MODEL_ID, SEED, variant)
+
+
+# ----------------------------
+# SIMILAR-FRAME REUSE
+# ----------------------------
+# A prompt that is a near-paraphrase of one already rendered (same size,
+# model and settings) reuses that frame from the render cache instead of
+# being rendered. Needs the render cache; FRAME_INDEX_DIR="" disables it.
+FRAME_INDEX_DIR = os.getenv("FRAME_INDEX_DIR", os.path.join(BASE_DIR, ".cache", "frame_index"))
+FRAME_REUSE_THRESHOLD = float(os.getenv("FRAME_REUSE_THRESHOLD", "0.95"))
+
+_frame_index = None
+
+
+def get_frame_index():
+    global _frame_index
+    if _frame_index is None and FRAME_INDEX_DIR and get_render_cache():
+        _frame_index = FrameIndex(FRAME_INDEX_DIR, FRAME_REUSE_THRESHOLD)
+    return _frame_index
+
+
+def _reuse_scope(variant: str) -> str:
+    # Every render setting except the prompt
+    return _cache_key("", variant)
+
+
+def _reuse_similar_frame(prompt: str, variant: str):
+    index = get_frame_index()
+    if index is None:
+        return None
+
+    with metrics.span("frame_index.nearest"):
+        match = index.nearest(prompt, _reuse_scope(variant))
+    if match is None:
+        return None
+
+    key, score, similar_prompt = match
+    image = get_render_cache().get(key)
+    if image is None:
+        # Evicted since it was indexed: don't match it again
+        index.discard(key)
+        return None
+
+    index.record_reuse()
+    metrics.inc("frames", source="reused")
+    print(f"♻ Reusing frame of a similar prompt ({score:.2f}): {similar_prompt[:60]}")
+    return image
+
+
+def _index_frame(prompt: str, key: str, variant: str):
+    index = get_frame_index()
+    if index is not None:
+        index.add(prompt, key, _reuse_scope(variant))
+
+
 # ----------------------------
 # GENERATE IMAGE LOCALLY
 # ----------------------------
 def generate_image(prompt: str):
-    try:
-        # SDXL Turbo uses only 1 step — super fast
-        image = pipe(
-            prompt,
-            width=1024,
-            height=576,
-            num_inference_steps=1,
-            guidance_scale=0.0
-        ).images[0]
+    cache = get_render_cache()
+    variant = _output_variant()
+    key = _cache_key(prompt, variant)
+
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc("frames", source="cached")
+            return cached
+        reused = _reuse_similar_frame(prompt, variant)
+        if reused is not None:
+            return reused
 
-        return image
+    try:
+        image = _run_pipe([prompt])[0]
 
     except Exception as e:
+        metrics.inc("frames", source="failed")
         print("❌ Error generating image:", e)
         return None
 
+    if cache:
+        _store_frame(prompt, key, variant, image)
+    return image
+
+
+# ----------------------------
+# GENERATE IMAGES IN BATCHES
+# ----------------------------
+def generate_images(prompts, batch_size: int = BATCH_SIZE):
+    """
+    Render many prompts, one pipe() call per batch.
+    Frames already in the render cache, or reusable from a similar prompt,
+    are returned without rendering.
+    Returns one image per prompt, in the same order (None on failure).
+    """
+    prompts = list(prompts)
+    cache = get_render_cache()
+    if not cache:
+        return _render_batches(prompts, batch_size)
+
+    variant = _output_variant()
+    keys = [_cache_key(p, variant) for p in prompts]
+    images = [cache.get(k) for k in keys]
+    metrics.inc("frames", sum(img is not None for img in images), source="cached")
+    for i, img in enumerate(images):
+        if img is None:
+            images[i] = _reuse_similar_frame(prompts[i], variant)
+
+    missing = [i for i, img in enumerate(images) if img is None]
+    rendered = _render_batches([prompts[i] for i in missing], batch_size)
+
+    for i, img in zip(missing, rendered):
+        if img is not None:
+            _store_frame(prompts[i], keys[i], variant, img)
+        images[i] = img
+
+    return images
+
+
+def _render_batches(prompts, batch_size: int):
+    """
+    If a batch runs out of memory the batch size is halved and the same
+    prompts are retried, so the rest of the run uses a size that fits.
+    """
+    images = []
+    size = max(1, batch_size)
+    start = 0
+
+    while start < len(prompts):
+        batch = prompts[start:start + size]
+        try:
+            images.extend(_run_pipe(batch))
+        except Exception as e:
+            if size > 1 and _is_out_of_memory(e):
+                size = max(1, size // 2)
+                metrics.inc("sdxl_oom_retries")
+                import torch  # already loaded by the pipeline
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                print(f"⚠ Out of memory, retrying with batch size {size}…")
+                continue
+
+            metrics.inc("frames", len(batch), source="failed")
+            print("❌ Error generating batch:", e)
+            images.extend([None] * len(batch))
+
+        start += len(batch)
+
+    return images
+
 
 # ----------------------------
 # SAVE IMAGE
 # ----------------------------
 def save_image(image: Image.Image, path: str):
-    image.save(path)
+    # Frames are intermediates read back once by the video stage: favour encode speed over size
+    image.save(path, compress_level=1)
+
+
+# ----------------------------
+# PERSISTENT WORKER MODE
+# ----------------------------
+def run_worker(jobs, results, warmup: bool = True):
+    """
+    Serve render jobs from `jobs` with one pipeline loaded for the whole
+    lifetime of the worker. Each job is a dict with "id", "prompts" and
+    "frames_dir"; a `None` job stops the worker.
+    Every finished job puts {"id", "paths", "seconds"} on `results`.
+    """
+    get_pipeline(MODEL_ID, warmup=warmup)
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        start = time.perf_counter()
+        os.makedirs(job["frames_dir"], exist_ok=True)
+
+        paths = []
+        images = generate_images(job["prompts"], batch_size=job.get("batch_size", BATCH_SIZE))
+        for i, img in enumerate(images, start=1):
+            if img is None:
+                paths.append(None)
+                continue
+            path = os.path.join(job["frames_dir"], f"frame_{i:02d}.png")
+            save_image(img, path)
+            paths.append(path)
+
+        results.put({"id": job["id"], "paths": paths, "seconds": time.perf_counter() - start})
+
+
+def start_worker(warmup: bool = True):
+    """
+    Start run_worker() in a separate process.
+    Returns (process, jobs, results); put `None` on jobs to shut it down.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    jobs = ctx.Queue()
+    results = ctx.Queue()
+    process = ctx.Process(target=run_worker, args=(jobs, results, warmup), daemon=True)
+    process.start()
+    return process, jobs, results
 
 
 # ----------------------------
 # MAIN EXECUTION
 # ----------------------------
 if __name__ == "__main__":
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    prompts_path = os.path.join(BASE_DIR, "output", "image_prompts.txt")
-    frames_dir = os.path.join(BASE_DIR, "output", "frames")
+    workspace = LessonWorkspace.legacy()
+    prompts_path = workspace.prompts_path
+    frames_dir = workspace.frames_dir
 
     os.makedirs(frames_dir, exist_ok=True)
 
-    print("📘 Reading prompts...")
-    prompts = read_prompts(prompts_path)
-
-    print(f"📌 Total prompts: {len(prompts)}")
+    manifest = SegmentManifest.for_workspace(workspace)
+    if manifest.segments:
+        # Only segments whose prompt changed since their frame was rendered
+        pending = [seg for seg in manifest.pending("image") if not manifest.needs_prompt(seg)]
+        prompts = [seg["prompt"] for seg in pending]
+        indices = [seg["index"] for seg in pending]
+        paths = [workspace.segment_frame_path(seg["id"]) for seg in pending]
+        print(f"📌 Segments: {len(manifest.segments)}, frames to render: {len(prompts)}")
+    else:
+        print("📘 Reading prompts...")
+        prompts = read_prompts(prompts_path)
+        indices = list(range(1, len(prompts) + 1))
+        paths = [workspace.frame_path(i) for i in indices]
+        print(f"📌 Total prompts: {len(prompts)}")
 
-    for i, prompt in enumerate(prompts, start=1):
-        print(f"\n🎨 Generating image {i}/{len(prompts)}…")
-        img = generate_image(prompt)
+    print(f"\n🎨 Generating {len(prompts)} images (batch size {BATCH_SIZE})…")
+    images = generate_images(prompts, batch_size=BATCH_SIZE)
 
+    for i, save_path, img in zip(indices, paths, images):
         if img:
-            save_path = os.path.join(frames_dir, f"frame_{i:02d}.png")
             save_image(img, save_path)
+            if manifest.segments:
+                manifest.set_image(i, save_path)
             print(f"✔ Saved: {save_path}")
         else:
-            print("⚠ Skipped due to error.")
+            print(f"⚠ Image {i} skipped due to error.")
+
+    wait_for_cache_writes()
+    cache = get_render_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"\n🗂 Render cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} reused)")
+
+    embeddings = get_embedding_cache()
+    if embeddings:
+        stats = embeddings.stats()
+        print(f"🧠 Prompt embeddings: {stats['hits']} reused ({stats['disk_hits']} from disk), "
+              f"{stats['misses']} encoded, saved {stats['saved_seconds']:.2f}s "
+              f"({stats['saved_ms_per_frame']:.0f} ms per frame)")
+
+    index = get_frame_index()
+    if index is not None:
+        stats = index.stats()
+        print(f"♻ Similar-frame reuse: {stats['reused']}/{stats['lookups']} ({stats['reuse_rate']:.0%}), "
+              f"lookup p50 {stats['lookup_ms_p50']:.2f} ms, p95 {stats['lookup_ms_p95']:.2f} ms, "
+              f"{stats['entries']} frames indexed")
 
     print("\n🎉 ALL DONE! Images saved!")
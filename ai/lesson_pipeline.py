@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
+
+import metrics  # noqa: E402
+import text_generator  # noqa: E402
+import script_generator  # noqa: E402
+import image_generator  # noqa: E402
+import voice_generator  # noqa: E402
+import video_generator  # noqa: E402
+from gemini_client import init_gemini  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+from segments import SegmentManifest, speakable  # noqa: E402
+
+
+# ----------------------------
+# STAGE TIMINGS
+# ----------------------------
+class StageTimings:
+    """
+    Collects how long each stage took (per call, summed per stage), and
+    feeds every call into the stage_seconds histogram of metrics.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float):
+        metrics.observe("stage_seconds", seconds, stage=stage)
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def summary(self) -> dict:
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("\n⏱ Stage timings")
+        for name, entry in summary["stages"].items():
+            print(f"   {name:<16} {entry['count']:>3}x  total {entry['total_seconds']:7.2f}s  "
+                  f"max {entry['max_seconds']:6.2f}s")
+        print(f"   {'wall':<16}       total {summary['wall_seconds']:7.2f}s")
+
+
+# ----------------------------
+# FRAME HANDOFF
+# ----------------------------
+# Rendered frames go to the video stage in memory, already at the video
+# size. LESSON_FRAME_FORMAT also writes them to the workspace: "ppm"
+# (uncompressed, fastest) or "png" (low compression); "none" keeps them in
+# memory only, so a resumed lesson takes its frames from the render cache.
+FRAME_FORMATS = ("none", "ppm", "png")
+FRAME_FORMAT = os.getenv("LESSON_FRAME_FORMAT", "none")
+
+
+# ----------------------------
+# LESSON DAG
+# ----------------------------
+# explanation ─┬─ paragraph 1: prompt → render ─┐
+#              │               tts ────────────┤
+#              ├─ paragraph 2: prompt → render ─┼─ video
+#              │               tts ────────────┤
+#              └─ ...                           ┘
+def _no_progress(event: str, segment: int = None, **data):
+    pass
+
+
+async def _produce_lesson(topic: str, workspace: LessonWorkspace, timings: StageTimings, render_mode: str,
+                          tts_backend=None, stream: bool = True, progress=_no_progress,
+                          frame_format: str = FRAME_FORMAT):
+    # The manifest is the single source of truth for segments; stages only
+    # do the work for segments that are new or changed.
+    manifest = SegmentManifest.for_workspace(workspace)
+
+    prompt_slots = asyncio.Semaphore(script_generator.MAX_CONCURRENCY)
+    tts_slots = asyncio.Semaphore(voice_generator.MAX_CONCURRENCY)
+    tts_backend = tts_backend or voice_generator.EdgeTTSBackend()
+
+    # One render lane: the SDXL pipeline runs a single forward pass at a time.
+    render_lane = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+    frames = {}
+
+    def render(index, seg_id, prompt):
+        with timings.span("render"):
+            image = image_generator.generate_image(prompt)
+            if image is None:
+                return
+            frames[index] = video_generator.to_video_frame(image)
+            if frame_format != "none":
+                path = workspace.segment_frame_path(seg_id, frame_format)
+                video_generator.save_frame(frames[index], path)
+            else:
+                # Not in the workspace: point at the render cache's copy, so a
+                # resumed job only re-renders the frame if it was evicted
+                path = image_generator.cached_frame_path(prompt)
+            if path:
+                manifest.set_image(index, path)
+        progress("rendered", index)
+
+    async def slide(seg):
+        index = seg["index"]
+        if manifest.needs_prompt(seg):
+            async with prompt_slots:
+                with timings.span("prompt"):
+                    prompt = await asyncio.to_thread(script_generator.generate_image_prompt, seg["text"])
+            manifest.set_prompt(index, prompt)
+            print(f"🖋 Prompted slide {index}")
+        progress("prompted", index)
+
+        if manifest.needs_image(seg):
+            await loop.run_in_executor(render_lane, render, index, seg["id"], seg["prompt"])
+            print(f"🎨 Rendered slide {index}")
+        else:
+            progress("rendered", index)
+
+    async def voice(seg):
+        if not manifest.needs_audio(seg):
+            progress("voiced", seg["index"])
+            return
+        async with tts_slots:
+            with timings.span("tts"):
+                path, duration = await voice_generator.synthesize_clip(
+                    tts_backend,
+                    speakable(seg["text"]),
+                    voice_generator.VOICE,
+                    workspace.segment_audio_path(seg["id"]),
+                    label=f"{seg['index']}"
+                )
+        # Known now (or cached), so the video stage doesn't have to probe it
+        manifest.set_audio(seg["index"], path, duration=duration)
+        progress("voiced", seg["index"])
+
+    progress("stage", stage="narration")
+    try:
+        async with asyncio.TaskGroup() as tg:
+            if stream:
+                # Paragraph 1 is prompted, rendered and voiced while the
+                # rest of the narration is still being generated.
+                count = 0
+                started = time.perf_counter()
+                with timings.span("explanation"):
+                    async for paragraph in text_generator.astream_explanation(topic):
+                        count += 1
+                        if count == 1:
+                            timings.record("first_paragraph", time.perf_counter() - started)
+                        seg = manifest.put_segment(count, paragraph)
+                        progress("narrated", count)
+                        tg.create_task(slide(seg))
+                        tg.create_task(voice(seg))
+                manifest.truncate(count)
+            else:
+                with timings.span("explanation"):
+                    narration = await asyncio.to_thread(text_generator.generate_explanation, topic)
+                for seg in manifest.sync_text(narration):
+                    progress("narrated", seg["index"])
+                    tg.create_task(slide(seg))
+                    tg.create_task(voice(seg))
+    finally:
+        # After a failure, drop the queued renders and let the one in
+        # progress finish, so nothing touches the shared pipeline or the
+        # workspace once this lesson is over
+        await asyncio.to_thread(render_lane.shutdown, True, cancel_futures=True)
+
+    print(f"📌 {len(manifest.segments)} paragraphs")
+    text_generator.save_explanation("\n\n".join(manifest.texts()), workspace.explanation_path)
+
+    script_generator.save_prompts([seg.get("prompt", "") for seg in manifest.segments], workspace.prompts_path)
+
+    progress("stage", stage="video", total=len(manifest.segments))
+    with timings.span("video"):
+        video_path = await asyncio.to_thread(video_generator.create_video, workspace, render_mode, frames)
+    progress("encoded", ok=bool(video_path))
+    return video_path
+
+
+def generate_lesson(topic: str, workspace: LessonWorkspace = None, render_mode: str = video_generator.RENDER_MODE,
+                    tts_backend=None, keep_intermediates: bool = False, stream: bool = True, progress=None,
+                    frame_format: str = FRAME_FORMAT):
+    """
+    Produce a full lesson video for `topic` inside its own workspace
+    (a fresh LessonWorkspace by default), then publish the final artifacts
+    and remove the intermediates. With `stream=True` the narration is
+    consumed paragraph by paragraph, so slide work starts before the whole
+    explanation has arrived.
+    `progress(event, segment=None, **data)` is called as the lesson moves
+    along: "stage" (narration, video), then "narrated", "prompted",
+    "rendered" and "voiced" per segment, and "encoded" at the end. It may
+    be called from worker threads, so it must be thread-safe.
+    `frame_format` is how rendered frames are also written to the
+    workspace (see FRAME_FORMATS); the video is assembled from memory.
+    Segment reuse across runs (only new or edited paragraphs are redone)
+    relies on the workspace's manifest.json and intermediates, which
+    cleanup removes: rerun with `keep_intermediates=True` and the same
+    workspace (`--keep-intermediates --job-id <id>` on the CLI).
+    Returns {"job_id", "video": published path or None, "timings": {...}};
+    the timings are also published as timings.json, with what the run
+    recorded in metrics (tokens, cache hits, frames/sec...) under "metrics".
+    """
+    workspace = (workspace or LessonWorkspace()).create()
+    timings = StageTimings()
+    before = metrics.snapshot()
+    metrics.add_gauge("lessons_in_progress", 1)
+    result = "failed"
+
+    try:
+        video_path = asyncio.run(_produce_lesson(topic, workspace, timings, render_mode, tts_backend, stream,
+                                                 progress or _no_progress, frame_format))
+        result = "ok" if video_path else "no_video"
+
+        summary = timings.summary()
+        summary["metrics"] = metrics.run_summary(before)
+        with open(workspace.timings_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        timings.print_summary()
+
+        workspace.publish()
+    finally:
+        metrics.add_gauge("lessons_in_progress", -1)
+        metrics.inc("lessons", result=result)
+        metrics.flush()
+        if not keep_intermediates:
+            workspace.cleanup()
+
+    return {
+        "job_id": workspace.job_id,
+        "video": workspace.published_path("video", "final_video.mp4") if video_path else None,
+        "timings": summary,
+    }
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a lesson video for a topic.")
+    parser.add_argument("topic")
+    parser.add_argument("--job-id", default=None, help="workspace name (default: random); "
+                        "reuse it with --keep-intermediates to redo only changed segments")
+    parser.add_argument("--render-mode", choices=["fast", "compose"], default=video_generator.RENDER_MODE)
+    parser.add_argument("--keep-intermediates", action="store_true", help="keep frames, audio and the segment manifest after publishing")
+    parser.add_argument("--no-stream", action="store_true", help="wait for the full narration before starting slides")
+    parser.add_argument("--save-frames", choices=FRAME_FORMATS, default=FRAME_FORMAT,
+                        help="also write rendered frames to the workspace in this format")
+    args = parser.parse_args()
+    init_gemini()  # fail on a missing key before any work starts
+
+    result = generate_lesson(
+        args.topic,
+        workspace=LessonWorkspace(args.job_id),
+        render_mode=args.render_mode,
+        keep_intermediates=args.keep_intermediates,
+        stream=not args.no_stream,
+        frame_format=args.save_frames
+    )
+    print(f"\n🎉 Lesson ready: {result['video']}")
@@ -0,0 +1,189 @@
+import os
+import abc
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import metrics
+from disk_cache import make_key
+
+
+# ----------------------------
+# LLM RESPONSE CACHE
+# ----------------------------
+# Shared by text_generator and script_generator. Responses are keyed on
+# (model, prompt, generation_config) so a repeated request is answered
+# locally without spending API quota.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LLM_CACHE = os.getenv("LLM_CACHE", "sqlite")          # sqlite | memory | off
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "llm_responses.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ResponseCache(abc.ABC):
+    """
+    Base class for response caches. Backends implement _load(key) returning
+    (value, expires_at) or None, _save(key, value, expires_at) and _delete(key).
+    `model` in key() is the model that actually answers (see
+    gemini_client.model_name()), so responses of different models never mix.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt: str, generation_config=None) -> str:
+        return make_key(model=model, prompt=prompt, generation_config=generation_config or {})
+
+    def get(self, key: str):
+        entry = self._load(key)
+
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            self._delete(key)
+            with self._stats_lock:
+                self.expired += 1
+            entry = None
+
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.inc("cache_lookups", cache="llm", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._save(key, value, time.time() + ttl if ttl else None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @abc.abstractmethod
+    def _load(self, key):
+        ...
+
+    @abc.abstractmethod
+    def _save(self, key, value, expires_at):
+        ...
+
+    @abc.abstractmethod
+    def _delete(self, key):
+        ...
+
+
+class MemoryLRUCache(ResponseCache):
+    """In-process cache holding at most `max_entries` responses."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = None):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _save(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteCache(ResponseCache):
+    """Persistent cache in a single SQLite file, shared across processes."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = None):
+        super().__init__(ttl)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " created_at REAL NOT NULL)"
+            )
+
+    def _load(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _save(self, key, value, expires_at):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+
+    def _delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+            return cur.rowcount
+
+
+# ----------------------------
+# DEFAULT (PROCESS-WIDE) CACHE
+# ----------------------------
+_UNSET = object()
+_default_cache = _UNSET
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Cache selected by LLM_CACHE, created on first use (None when "off")."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is _UNSET:
+            if LLM_CACHE == "sqlite":
+                _default_cache = SQLiteCache(LLM_CACHE_PATH, ttl=LLM_CACHE_TTL)
+            elif LLM_CACHE == "memory":
+                _default_cache = MemoryLRUCache(LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL)
+            else:
+                _default_cache = None
+        return _default_cache
+
+
+def set_default_cache(cache):
+    """Plug in a different backend (or None to disable caching)."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
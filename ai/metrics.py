@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import atexit
+import socket
+import bisect
+import threading
+from contextlib import nullcontext
+
+# ----------------------------
+# METRICS
+# ----------------------------
+# Counters, gauges and histograms shared by every ai/ module, plus timing
+# spans (histogram observations of how long a block took). Values live in
+# this process; configure(directory=...) also writes them as a JSON
+# snapshot every few seconds, which the Django /metrics endpoint merges
+# across processes. METRICS_ENABLED=0 turns every call into a no-op.
+#
+#   with metrics.span("sdxl.batch", batch=len(prompts)):
+#       ...
+#   metrics.inc("cache_lookups", cache="render", result="hit")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR", "")  # empty: no snapshot files
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+
+PREFIX = "blinked_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "span_seconds": ("histogram", "Time spent in an instrumented span.", LATENCY_BUCKETS),
+    "span_errors": ("counter", "Spans left with an exception.", None),
+    "stage_seconds": ("histogram", "Lesson pipeline stage durations.", LATENCY_BUCKETS),
+    "lessons": ("counter", "Lessons finished, by result.", None),
+    "lessons_in_progress": ("gauge", "Lessons being produced right now.", None),
+    "gemini_requests": ("counter", "Gemini generate_content calls, by caller.", None),
+    "gemini_retries": ("counter", "Rate-limited Gemini calls that were retried.", None),
+    "gemini_tokens": ("counter", "Gemini tokens, by caller and kind (prompt or output).", None),
+    "cache_lookups": ("counter", "Cache lookups, by cache and result (hit or miss).", None),
+    "frames": ("counter", "Frames from the image stage, by source (rendered, cached, reused, failed).", None),
+    "sdxl_oom_retries": ("counter", "SDXL batches retried at half size after running out of memory.", None),
+    "tts_clips": ("counter", "Narration clips, by source (synthesized or cached).", None),
+    "tts_retries": ("counter", "TTS syntheses retried after an error.", None),
+    "video_slides": ("counter", "Slides encoded into lesson videos, by render mode.", None),
+}
+
+
+def describe(name: str, kind: str, help_text: str, buckets: tuple = None):
+    """Declare a metric recorded outside ai/ (type, HELP text, buckets)."""
+    METRICS[name] = (kind, help_text, buckets)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+class Registry:
+    """The metric values of one process. Thread-safe."""
+
+    def __init__(self):
+        self.counters = {}     # (name, labels) -> value
+        self.gauges = {}       # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float, labels: tuple):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: tuple, add: bool = False):
+        key = (name, labels)
+        with self._lock:
+            self.gauges[key] = (self.gauges.get(key, 0) if add else 0) + value
+
+    def observe(self, name: str, value: float, labels: tuple):
+        buckets = buckets_for(name)
+        key = (name, labels)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            entry[bisect.bisect_left(buckets, value)] += 1
+            entry[-1] += value
+
+    def snapshot(self) -> dict:
+        """Every value as plain JSON-serialisable data."""
+        with self._lock:
+            return {
+                "counters": [[n, dict(l), v] for (n, l), v in self.counters.items()],
+                "gauges": [[n, dict(l), v] for (n, l), v in self.gauges.items()],
+                "histograms": [[n, dict(l), list(buckets_for(n)), e[:-1], e[-1]]
+                               for (n, l), e in self.histograms.items()],
+            }
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+def buckets_for(name: str) -> tuple:
+    spec = METRICS.get(name)
+    return spec[2] if spec and spec[2] else LATENCY_BUCKETS
+
+
+_registry = Registry()
+_enabled = METRICS_ENABLED
+
+
+# ----------------------------
+# RECORDING
+# ----------------------------
+def enabled() -> bool:
+    return _enabled
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add `value` to a counter."""
+    if _enabled:
+        _registry.inc(name, value, _labels(labels))
+
+
+def set_gauge(name: str, value: float, **labels):
+    if _enabled:
+        _registry.set_gauge(name, value, _labels(labels))
+
+
+def add_gauge(name: str, delta: float, **labels):
+    if _enabled:
+        _registry.set_gauge(name, delta, _labels(labels), add=True)
+
+
+def observe(name: str, value: float, **labels):
+    """Record one observation in a histogram."""
+    if _enabled:
+        _registry.observe(name, value, _labels(labels))
+
+
+class _Span:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, labels: tuple):
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _registry.observe("span_seconds", time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            _registry.inc("span_errors", 1, self.labels)
+        return False
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name: str, **labels):
+    """Context manager timing its block into span_seconds{span=name, ...}."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(_labels(dict(labels, span=name)))
+
+
+def snapshot() -> dict:
+    return _registry.snapshot()
+
+
+def reset():
+    """Forget every value recorded in this process."""
+    _registry.clear()
+
+
+# ----------------------------
+# RUN SUMMARIES (JSON)
+# ----------------------------
+def _label_text(labels: dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+
+
+def run_summary(before: dict, after: dict = None) -> dict:
+    """
+    What was recorded between two snapshot()s (default: until now), as a
+    readable dict: counter increments per label set, span and stage counts
+    and total seconds, and frames_per_second for the SDXL renders.
+    Only meaningful when the process ran one job in between.
+    """
+    after = after or snapshot()
+    counters_before = {(n, _labels(l)): v for n, l, v in before["counters"]}
+    histograms_before = {(n, _labels(l)): (sum(c), s) for n, l, _, c, s in before["histograms"]}
+
+    counters = {}     # (name, labels) -> increment
+    histograms = {}   # (name, labels) -> (count, seconds)
+    for name, labels, value in after["counters"]:
+        key = (name, _labels(labels))
+        delta = value - counters_before.get(key, 0)
+        if delta:
+            counters[key] = delta
+    for name, labels, _, counts, total in after["histograms"]:
+        key = (name, _labels(labels))
+        count_before, total_before = histograms_before.get(key, (0, 0.0))
+        if sum(counts) > count_before:
+            histograms[key] = (sum(counts) - count_before, total - total_before)
+
+    summary = {}
+    for (name, labels), delta in counters.items():
+        summary.setdefault(name, {})[_label_text(dict(labels)) or "total"] = delta
+    for (name, labels), (count, seconds) in histograms.items():
+        summary.setdefault(name, {})[_label_text(dict(labels)) or "total"] = {
+            "count": count,
+            "total_seconds": round(seconds, 6),
+        }
+
+    rendered = sum(delta for (name, labels), delta in counters.items()
+                   if name == "frames" and ("source", "rendered") in labels)
+    render_seconds = sum(seconds for (name, labels), (_, seconds) in histograms.items()
+                         if name == "span_seconds" and ("span", "sdxl.batch") in labels)
+    if rendered and render_seconds:
+        summary["frames_per_second"] = round(rendered / render_seconds, 3)
+    return summary
+
+
+# ----------------------------
+# SNAPSHOT FILES (MULTI-PROCESS)
+# ----------------------------
+_directory = METRICS_DIR
+_process_name = None
+_flusher = None
+
+
+def configure(directory: str = None, process_name: str = None, flush_seconds: float = METRICS_FLUSH_SECONDS,
+              enabled: bool = None):
+    """
+    Write this process's values to <directory>/<process_name>.json every
+    `flush_seconds` (and at exit). A process restarted under the same
+    name overwrites its old snapshot, so its counters reset.
+    """
+    global _directory, _process_name, _flusher, _enabled
+    if enabled is not None:
+        _enabled = enabled
+    if directory is not None:
+        _directory = directory
+    if process_name:
+        _process_name = process_name
+
+    if _directory and _enabled and flush_seconds > 0 and _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, args=(flush_seconds,), name="metrics-flush", daemon=True)
+        _flusher.start()
+        atexit.register(flush)
+
+
+def _flush_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def flush():
+    """
+    Write the snapshot file now; returns its path (None without a metrics
+    directory). A failed write is reported, never raised.
+    """
+    if not _directory or not _enabled:
+        return None
+
+    name = _process_name or f"{socket.gethostname()}-{os.getpid()}"
+    path = os.path.join(_directory, f"{name}.json")
+    data = dict(snapshot(), process=name, pid=os.getpid(), written_at=time.time())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(_directory, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠ Could not write metrics snapshot: {e}")
+        return None
+    return path
+
+
+def prune_snapshots(directory: str, max_age: float) -> int:
+    """Delete snapshots not rewritten for `max_age` seconds (processes long gone)."""
+    removed = 0
+    if not directory or not os.path.isdir(directory):
+        return removed
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def load_snapshots(directory: str):
+    """Every process snapshot in `directory` (unreadable files are skipped)."""
+    snapshots = []
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge(snapshots, stale_seconds: float = None) -> dict:
+    """
+    One snapshot summing every process's counters, gauges and histograms.
+    Gauges of snapshots older than `stale_seconds` (a process that has
+    exited) are left out; their counters and histograms still count.
+    """
+    now = time.time()
+    counters, gauges, histograms = {}, {}, {}
+
+    for snap in snapshots:
+        stale = stale_seconds is not None and now - snap.get("written_at", now) > stale_seconds
+        for name, labels, value in snap.get("counters", []):
+            key = (name, _labels(labels))
+            counters[key] = counters.get(key, 0) + value
+        if not stale:
+            for name, labels, value in snap.get("gauges", []):
+                key = (name, _labels(labels))
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, buckets, counts, total in snap.get("histograms", []):
+            key = (name, _labels(labels))
+            entry = histograms.get(key)
+            if entry is None:
+                histograms[key] = [list(buckets), list(counts), total]
+            elif entry[0] == list(buckets):
+                entry[1] = [a + b for a, b in zip(entry[1], counts)]
+                entry[2] += total
+
+    return {
+        "counters": [[n, dict(l), v] for (n, l), v in counters.items()],
+        "gauges": [[n, dict(l), v] for (n, l), v in gauges.items()],
+        "histograms": [[n, dict(l), b, c, s] for (n, l), (b, c, s) in histograms.items()],
+    }
+
+
+# ----------------------------
+# PROMETHEUS TEXT FORMAT
+# ----------------------------
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name: str, labels: dict, value, extra: tuple = ()) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())] + [f'{k}="{v}"' for k, v in extra]
+    return f"{name}{{{','.join(pairs)}}} {value}" if pairs else f"{name} {value}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snap: dict) -> str:
+    """A snapshot (or merge()d snapshots) in the Prometheus text exposition format."""
+    families = {}
+    for kind in ("counters", "gauges", "histograms"):
+        for entry in snap.get(kind, []):
+            families.setdefault((entry[0], kind), []).append(entry)
+
+    lines = []
+    for (name, kind), entries in sorted(families.items()):
+        metric_type = {"counters": "counter", "gauges": "gauge", "histograms": "histogram"}[kind]
+        full = PREFIX + name + ("_total" if kind == "counters" else "")
+        spec = METRICS.get(name)
+        lines.append(f"# HELP {full} {spec[1] if spec else name}")
+        lines.append(f"# TYPE {full} {metric_type}")
+
+        for entry in sorted(entries, key=lambda e: _label_text(e[1])):
+            labels = entry[1]
+            if kind != "histograms":
+                lines.append(_series(full, labels, _number(entry[2])))
+                continue
+            _, _, buckets, counts, total = entry
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(_series(full + "_bucket", labels, cumulative, (("le", le),)))
+            lines.append(_series(full + "_sum", labels, _number(float(total))))
+            lines.append(_series(full + "_count", labels, cumulative))
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import cpu_profile
+
+# ----------------------------
+# PROCESS-WIDE PIPELINE REGISTRY
+# ----------------------------
+# Pipelines are loaded on first use and then shared by everything in the
+# process, keyed by (model id, dtype, device, CPU profile). Nothing is
+# loaded at import, and torch and diffusers are only imported with the
+# first pipeline. On CPU the pipeline is tuned by a cpu_profile profile.
+DEFAULT_MODEL_ID = "stabilityai/sdxl-turbo"
+
+_pipelines = {}
+_lock = threading.Lock()
+_warmup_hooks = []
+
+
+def default_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_dtype(device: str, profile: dict = None):
+    import torch
+    if device.startswith("cuda"):
+        return torch.float16
+    return cpu_profile.profile_dtype(profile or cpu_profile.get_profile())
+
+
+def register_warmup_hook(hook):
+    """
+    Register a callable `hook(pipe)` that runs once after a pipeline loads
+    with `warmup=True`. Without hooks a single tiny render is used.
+    """
+    _warmup_hooks.append(hook)
+
+
+def _default_warmup(pipe):
+    pipe(
+        prompt="warm-up",
+        width=512,
+        height=512,
+        num_inference_steps=1,
+        guidance_scale=0.0
+    )
+
+
+def _load_pipeline(model_id: str, dtype, device: str, profile: dict = None):
+    from diffusers import StableDiffusionXLPipeline
+
+    print(f"🔄 Loading {model_id} on {device}... (first time slow, then cached)")
+    start = time.perf_counter()
+
+    components = cpu_profile.pipeline_components(profile, dtype) if profile is not None else {}
+    pipe = StableDiffusionXLPipeline.from_pretrained(
+        model_id,
+        torch_dtype=dtype,
+        variant="fp16",
+        **components
+    )
+    pipe = pipe.to(device)
+    if profile is not None:
+        pipe = cpu_profile.apply_profile(pipe, profile)
+        print(f"⚙ CPU profile: {cpu_profile.describe(profile)}")
+
+    print(f"✅ Pipeline ready on {device} in {time.perf_counter() - start:.1f}s")
+    return pipe
+
+
+def get_pipeline(model_id: str = DEFAULT_MODEL_ID, dtype=None, device: str = None, warmup: bool = False,
+                 profile: str = None):
+    """
+    Return the shared pipeline for (model_id, dtype, device), loading it
+    on the first call. On CPU it is tuned with the cpu_profile `profile`
+    (default: SDXL_CPU_PROFILE). With `warmup=True` the warm-up hooks run
+    once, right after loading (and compiling, for profiles that compile).
+    """
+    device = device or default_device()
+    settings = cpu_profile.get_profile(profile) if device == "cpu" else None
+    dtype = dtype or default_dtype(device, settings)
+    key = (model_id, str(dtype), device, settings["name"] if settings else None)
+
+    pipe = _pipelines.get(key)
+    if pipe is not None:
+        return pipe
+
+    with _lock:
+        pipe = _pipelines.get(key)
+        if pipe is None:
+            pipe = _load_pipeline(model_id, dtype, device, settings)
+            if warmup:
+                for hook in _warmup_hooks or [_default_warmup]:
+                    hook(pipe)
+            _pipelines[key] = pipe
+
+    return pipe
+
+
+def loaded_pipelines():
+    return list(_pipelines.keys())
+
+
+def clear_pipelines():
+    """Drop every loaded pipeline (frees memory once nothing else holds it)."""
+    import torch
+
+    with _lock:
+        _pipelines.clear()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
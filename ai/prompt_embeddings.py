@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from disk_cache import DiskLRUCache, make_key
+
+
+# ----------------------------
+# SPILLED EMBEDDINGS (DISK)
+# ----------------------------
+class EmbeddingSpill(DiskLRUCache):
+    """
+    prompt_embeds as <key>.embeds.npy, with pooled_prompt_embeds in a
+    <key>.pooled.npy sidecar. Both are read back memory-mapped, so a hit
+    only pages in what is copied to the device. Arrays are float16 or
+    float32 (bfloat16 embeddings are widened, which is exact).
+    """
+
+    name = "prompt_embeds_disk"
+    POOLED = ".pooled.npy"
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__(directory, max_bytes, suffix=".embeds.npy")
+
+    def get(self, key: str):
+        """(prompt_embeds, pooled_prompt_embeds) as arrays, or None."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            # Copy-on-write maps: writable for torch.from_numpy, never written back
+            pooled_path = path[:-len(self.suffix)] + self.POOLED
+            return np.load(path, mmap_mode="c"), np.load(pooled_path, mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, embeds: np.ndarray, pooled: np.ndarray):
+        # Sidecar first: a visible entry always has both arrays
+        pooled_path = self.path_for(key)[:-len(self.suffix)] + self.POOLED
+        os.makedirs(os.path.dirname(pooled_path), exist_ok=True)
+        tmp_path = f"{pooled_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, pooled)
+        os.replace(tmp_path, pooled_path)
+
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                np.save(f, embeds)
+
+        return self.store(key, write)
+
+    def _companions(self, path: str):
+        return (path[:-len(self.suffix)] + self.POOLED,)
+
+
+# ----------------------------
+# PROMPT EMBEDDING CACHE
+# ----------------------------
+# torch is imported on first use: only a loaded pipeline ever calls these.
+def _to_numpy(tensor) -> np.ndarray:
+    import torch
+
+    if tensor.dtype == torch.bfloat16:
+        tensor = tensor.float()
+    return tensor.detach().cpu().numpy()
+
+
+class PromptEmbeddingCache:
+    """
+    SDXL text-encoder outputs per (model, prompt, dtype), so a prompt seen
+    before (another seed, size or variant of the same frame) skips both
+    CLIP text encoders and only the UNet and VAE run.
+
+    The most recent `max_entries` are kept in memory, on the pipeline's
+    device; with `spill` (an EmbeddingSpill) every entry is also written to
+    disk and found there after it leaves memory or in a new process.
+    """
+
+    def __init__(self, max_entries: int, spill: EmbeddingSpill = None):
+        self.max_entries = max_entries
+        self.spill = spill
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_id: str, prompt: str, dtype) -> str:
+        return make_key(model_id=model_id, prompt=prompt, dtype=str(dtype))
+
+    def _remember(self, key: str, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str, device, dtype):
+        import torch
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        spilled = self.spill.get(key) if self.spill else None
+        if spilled is None:
+            return None
+
+        entry = tuple(torch.from_numpy(array).to(device=device, dtype=dtype) for array in spilled)
+        self._remember(key, entry)
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+        return entry
+
+    def embed(self, pipe, model_id: str, prompts):
+        """
+        (prompt_embeds, pooled_prompt_embeds) for `prompts`, batched in
+        order, for pipe(prompt_embeds=..., pooled_prompt_embeds=...).
+        Prompts not cached are encoded together in one encode_prompt() call,
+        each distinct prompt once.
+        """
+        import torch
+
+        prompts = list(prompts)
+        device = pipe.device
+        dtype = pipe.text_encoder_2.dtype
+        keys = [self.key(model_id, p, dtype) for p in prompts]
+        entries = [self._lookup(k, device, dtype) for k in keys]
+
+        missing = {}  # key -> indices of the prompts that need it
+        for i, entry in enumerate(entries):
+            if entry is None:
+                missing.setdefault(keys[i], []).append(i)
+
+        if missing:
+            start = time.perf_counter()
+            with torch.inference_mode():
+                embeds, _, pooled, _ = pipe.encode_prompt(
+                    prompt=[prompts[indices[0]] for indices in missing.values()],
+                    device=device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=False
+                )
+            elapsed = time.perf_counter() - start
+            metrics.observe("span_seconds", elapsed, span="sdxl.encode_prompt")
+
+            for j, (key, indices) in enumerate(missing.items()):
+                entry = (embeds[j:j + 1], pooled[j:j + 1])
+                for i in indices:
+                    entries[i] = entry
+                self._remember(key, entry)
+                if self.spill:
+                    self.spill.put(key, _to_numpy(entry[0]), _to_numpy(entry[1]))
+
+            with self._lock:
+                self.misses += len(missing)
+                # Repeats within the batch were not encoded either
+                self.hits += sum(len(indices) - 1 for indices in missing.values())
+                self.encode_seconds += elapsed
+
+        if len(prompts) > len(missing):
+            metrics.inc("cache_lookups", len(prompts) - len(missing), cache="prompt_embeds", result="hit")
+        if missing:
+            metrics.inc("cache_lookups", len(missing), cache="prompt_embeds", result="miss")
+        return torch.cat([e[0] for e in entries]), torch.cat([e[1] for e in entries])
+
+    def stats(self) -> dict:
+        """Hit counts and the text-encoder time hits saved (estimated from the misses)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            per_prompt = self.encode_seconds / self.misses if self.misses else 0.0
+            saved = self.hits * per_prompt
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_memory": len(self._entries),
+                "encode_ms_per_prompt": per_prompt * 1000,
+                "saved_seconds": saved,
+                "saved_ms_per_frame": saved / lookups * 1000 if lookups else 0.0,
+            }
@@ -0,0 +1,49 @@
+from PIL import Image
+
+from disk_cache import DiskLRUCache, make_key
+from video_generator import PNG_COMPRESS_LEVEL
+
+
+# ----------------------------
+# RENDER CACHE (GENERATED FRAMES)
+# ----------------------------
+class RenderCache(DiskLRUCache):
+    """
+    PNG cache for generated frames, keyed by everything that affects
+    the rendered pixels.
+    """
+
+    name = "render"
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__(directory, max_bytes, suffix=".png")
+
+    @staticmethod
+    def key(prompt: str, width: int, height: int, steps: int, guidance: float, model_id: str, seed: int,
+            variant: str = "") -> str:
+        fields = dict(
+            prompt=prompt,
+            width=width,
+            height=height,
+            steps=steps,
+            guidance=guidance,
+            model_id=model_id,
+            seed=seed
+        )
+        # e.g. "bf16+tiny-vae" from a CPU profile; omitted for the default output
+        if variant:
+            fields["variant"] = variant
+        return make_key(**fields)
+
+    def get(self, key: str):
+        path = self.lookup(key)
+        if path is None:
+            return None
+
+        with Image.open(path) as img:
+            img.load()
+            return img
+
+    def put(self, key: str, image: Image.Image):
+        # Cached frames are re-read far more often than written: fast compression, as for workspace frames
+        return self.store(key, lambda tmp_path: image.save(tmp_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL))
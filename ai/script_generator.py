@@ -1,20 +1,44 @@
 import os
 import re
-import google.generativeai as genai
-from dotenv import load_dotenv
+import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
+
+import metrics  # noqa: E402
+from gemini_client import model_name, new_model, record_usage  # noqa: E402
+from llm_cache import ResponseCache, get_default_cache  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+from segments import SegmentManifest, segment_text  # noqa: E402
 
 # ----------------------------
 # INIT
 # ----------------------------
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
+# The Gemini client is configured by the first get_model() call, not at import.
+TEXT_MODEL = "gemini-flash-latest"
+GENERATION_CONFIG = {"temperature": 0.4, "max_output_tokens": 1024}
 
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found.")
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0   # seconds, doubled on every rate-limited retry
+BACKOFF_MAX = 30.0
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
 
-genai.configure(api_key=api_key)
+# "batched": one request per narration, "per-chunk": one request per paragraph
+PROMPT_MODE = os.getenv("GEMINI_PROMPT_MODE", "batched")
 
-TEXT_MODEL = "gemini-flash-latest"
+_model = None
+
+
+def get_model():
+    """One shared Gemini client for every prompt request in this process."""
+    global _model
+    if _model is None:
+        _model = new_model(TEXT_MODEL)
+    return _model
 
 
 # ----------------------------
@@ -31,28 +55,17 @@ def read_explanation(path: str) -> str:
 # ----------------------------
 def chunk_text(text: str):
     """
-    Split narration into chunks based on paragraph breaks (blank lines or newlines).
+    Split narration into chunks based on paragraph breaks (blank lines).
     Each paragraph will be turned into ONE image prompt.
+    Uses the canonical segmenter shared with the audio stage.
     """
-    raw_chunks = re.split(r'\n\s*\n', text.strip())
-    chunks = [c.strip() for c in raw_chunks if c.strip()]
-    return chunks
+    return segment_text(text)
 
 
 # ----------------------------
 # GENERATE EDUCATIONAL IMAGE PROMPT
 # ----------------------------
-def generate_image_prompt(narration_chunk: str) -> str:
-    """
-    Convert narration chunk into a clean educational image prompt.
-    Includes robust fallback extraction (never crashes).
-    """
-    model = genai.GenerativeModel(TEXT_MODEL)
-
-    prompt = f"""
-Convert the narration into a clear 1-line educational image prompt, possibly under 70 tokens.
-
-Rules:
+PROMPT_RULES = """Rules:
 - The illustration must be in landscape orientation (wide, horizontal).
 - The visual style must match the narration content closely and be a bit realistic and engaging.
 - Try to make it casual and natural and a little text-book style.
@@ -63,33 +76,94 @@ Rules:
 - Avoid hyperrealism; keep it cartoonish, fun, and very clear.
 - You can use text ONLY if it is clear and readable.
 - Keep everything simple and easy to understand.
-- Do NOT create complex flowcharts or hard diagrams.
+- Do NOT create complex flowcharts or hard diagrams."""
+
+
+def build_prompt_request(narration_chunk: str) -> str:
+    return f"""
+Convert the narration into a clear 1-line educational image prompt, possibly under 70 tokens.
+
+{PROMPT_RULES}
 
 Narration:
 "{narration_chunk}"
 """
 
-    try:
-        response = model.generate_content(
-            prompt,
-            generation_config={"temperature": 0.4, "max_output_tokens": 1024}
-        )
 
-        # 1. Try response.text
+def _is_rate_limited(error: Exception) -> bool:
+    """
+    Gemini quota errors (ResourceExhausted / HTTP 429), without importing
+    api_core: by the error's HTTP status, else by its class. The message is
+    not searched; "429" can appear in any error text.
+    """
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    return any(cls.__name__ in ("ResourceExhausted", "TooManyRequests") for cls in type(error).__mro__)
+
+
+def generate_with_backoff(model, prompt: str, generation_config=GENERATION_CONFIG, caller: str = "image_prompt"):
+    """
+    Call model.generate_content(), retrying rate-limited requests with
+    exponential backoff plus jitter. Other errors are raised immediately.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with metrics.span("gemini.generate", caller=caller):
+                response = model.generate_content(prompt, generation_config=generation_config)
+            record_usage(response, caller)
+            return response
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            metrics.inc("gemini_retries", caller=caller)
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def extract_text(response) -> str:
+    # 1. Try response.text
+    try:
         if hasattr(response, "text") and response.text:
             return response.text.strip()
+    except ValueError:
+        # .text raises when the candidate has no text parts
+        pass
+
+    # 2. Extract manually
+    extracted = ""
+    if hasattr(response, "candidates"):
+        for cand in response.candidates:
+            if hasattr(cand, "content") and cand.content:
+                for part in cand.content.parts:
+                    if hasattr(part, "text") and part.text:
+                        extracted += part.text
+
+    return extracted.strip()
+
+
+def generate_image_prompt(narration_chunk: str, model=None) -> str:
+    """
+    Convert narration chunk into a clean educational image prompt.
+    Includes robust fallback extraction (never crashes).
+    """
+    model = model or get_model()
+    prompt = build_prompt_request(narration_chunk)
+
+    cache = get_default_cache()
+    key = ResponseCache.key(model_name(model, TEXT_MODEL), prompt, GENERATION_CONFIG)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-        # 2. Extract manually
-        extracted = ""
-        if hasattr(response, "candidates"):
-            for cand in response.candidates:
-                if hasattr(cand, "content") and cand.content:
-                    for part in cand.content.parts:
-                        if hasattr(part, "text") and part.text:
-                            extracted += part.text
+    try:
+        response = generate_with_backoff(model, prompt)
 
-        if extracted.strip():
-            return extracted.strip()
+        text = extract_text(response)
+        if text:
+            if cache:
+                cache.set(key, text)
+            return text
 
         # 3. Fallback
         return "Simple educational diagram explaining the concept."
@@ -98,6 +172,123 @@ Narration:
         return f"Error generating prompt: {e}"
 
 
+# ----------------------------
+# GENERATE ALL PROMPTS CONCURRENTLY
+# ----------------------------
+def generate_image_prompts(chunks, max_concurrency: int = MAX_CONCURRENCY, model=None):
+    """
+    Generate one image prompt per chunk with up to `max_concurrency`
+    requests in flight, sharing one model client.
+    Results are returned in the same order as `chunks`.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return []
+
+    model = model or get_model()
+    workers = max(1, min(max_concurrency, len(chunks)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda ch: generate_image_prompt(ch, model=model), chunks))
+
+
+# ----------------------------
+# ONE REQUEST FOR THE WHOLE NARRATION
+# ----------------------------
+def build_batch_prompt_request(chunks) -> str:
+    narrations = "\n".join(f'[{i}] "{chunk}"' for i, chunk in enumerate(chunks, start=1))
+    return f"""
+Convert EACH numbered narration below into a clear 1-line educational image prompt, possibly under 70 tokens each.
+
+{PROMPT_RULES}
+
+Return ONLY a JSON array with exactly {len(chunks)} objects, one per narration, in order:
+[{{"index": 1, "prompt": "..."}}, ...]
+
+Narrations:
+{narrations}
+"""
+
+
+def batch_generation_config(count: int) -> dict:
+    return {
+        "temperature": GENERATION_CONFIG["temperature"],
+        "max_output_tokens": min(8192, 256 * max(1, count)),
+        "response_mime_type": "application/json",
+    }
+
+
+def parse_prompt_list(text: str, count: int):
+    """
+    Parse the batched reply into a list of `count` prompts (None where an
+    entry is missing or unusable). Returns None if the reply isn't JSON.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, list):
+        return None
+
+    prompts = [None] * count
+    for pos, item in enumerate(data):
+        if isinstance(item, dict):
+            index, prompt = item.get("index"), item.get("prompt")
+        elif len(data) == count:
+            # Bare strings can only be trusted positionally when the count matches
+            index, prompt = pos + 1, item
+        else:
+            continue
+
+        if isinstance(index, int) and 1 <= index <= count and isinstance(prompt, str) and prompt.strip():
+            prompts[index - 1] = prompt.strip()
+
+    return prompts
+
+
+def generate_image_prompts_batched(chunks, model=None, max_concurrency: int = MAX_CONCURRENCY):
+    """
+    Generate every image prompt with a single structured request, so the
+    rules preamble is sent once per narration instead of once per chunk.
+    Entries that come back missing or malformed are filled in with
+    per-chunk calls for just those chunks.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return []
+
+    model = model or get_model()
+    prompt = build_batch_prompt_request(chunks)
+    config = batch_generation_config(len(chunks))
+
+    cache = get_default_cache()
+    key = ResponseCache.key(model_name(model, TEXT_MODEL), prompt, config)
+    text = cache.get(key) if cache else None
+
+    if text is None:
+        try:
+            text = extract_text(generate_with_backoff(model, prompt, config, caller="image_prompts_batched"))
+        except Exception as e:
+            print(f"⚠ Batched prompt request failed ({e}), falling back to per-chunk calls")
+            text = ""
+
+    prompts = parse_prompt_list(text, len(chunks)) if text else None
+    if prompts is None:
+        prompts = [None] * len(chunks)
+    elif cache and all(prompts):
+        cache.set(key, text)
+
+    missing = [i for i, p in enumerate(prompts) if p is None]
+    if missing:
+        print(f"⚠ {len(missing)} of {len(chunks)} prompts missing from batched reply, requesting them one by one")
+        retried = generate_image_prompts([chunks[i] for i in missing], max_concurrency=max_concurrency, model=model)
+        for i, p in zip(missing, retried):
+            prompts[i] = p
+
+    return prompts
+
+
 # ----------------------------
 # SAVE PROMPTS
 # ----------------------------
@@ -112,23 +303,29 @@ def save_prompts(prompts, output_path: str):
 # MAIN
 # ----------------------------
 if __name__ == "__main__":
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(BASE_DIR, "output", "explanation.txt")
-    output_path = os.path.join(BASE_DIR, "output", "image_prompts.txt")
+    workspace = LessonWorkspace.legacy()
+    input_path = workspace.explanation_path
+    output_path = workspace.prompts_path
 
     print("Reading narration text...")
     narration = read_explanation(input_path)
 
     print("Splitting into paragraph-based chunks...")
-    chunks = chunk_text(narration)
+    manifest = SegmentManifest.for_workspace(workspace)
+    manifest.sync_text(narration)
 
-    print(f"Total image chunks: {len(chunks)}\n")
+    pending = manifest.pending("prompt")
+    print(f"Total image chunks: {len(manifest.segments)} ({len(pending)} changed)\n")
 
-    prompts = []
-    for i, ch in enumerate(chunks, start=1):
-        print(f"Generating image prompt {i}/{len(chunks)}...")
-        prompts.append(generate_image_prompt(ch))
+    if PROMPT_MODE == "batched":
+        print("Generating image prompts (one batched request)...")
+        prompts = generate_image_prompts_batched([seg["text"] for seg in pending])
+    else:
+        print(f"Generating image prompts ({MAX_CONCURRENCY} at a time)...")
+        prompts = generate_image_prompts([seg["text"] for seg in pending], max_concurrency=MAX_CONCURRENCY)
+    for seg, prompt in zip(pending, prompts):
+        manifest.set_prompt(seg["index"], prompt)
 
-    save_prompts(prompts, output_path)
+    save_prompts([seg["prompt"] for seg in manifest.segments], output_path)
 
     print(f"\nDone! Image prompts saved at:\n{output_path}")
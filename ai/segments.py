@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+
+# ----------------------------
+# CANONICAL SEGMENTER
+# ----------------------------
+def segment_text(text: str):
+    """
+    Split narration into segments on paragraph breaks (blank lines).
+    Every stage uses this, so there is exactly one image and one audio
+    clip per segment.
+    """
+    raw_chunks = re.split(r'\n\s*\n', text.strip())
+    return [c.strip() for c in raw_chunks if c.strip()]
+
+
+def speakable(text: str) -> str:
+    """Segment text as it should be read aloud (markdown emphasis removed)."""
+    return text.replace("*", "")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ----------------------------
+# SEGMENT MANIFEST
+# ----------------------------
+class SegmentManifest:
+    """
+    JSON manifest of a lesson's segments, stored in the workspace:
+
+        {"segments": [{"id", "index", "text", "text_hash",
+                       "prompt", "prompt_text_hash",
+                       "image", "image_prompt_hash",
+                       "audio", "audio_text_hash", "duration"}, ...]}
+
+    Each artifact records the hash of the input it was produced from, so a
+    stage can tell which segments are stale and redo only those. Every
+    update is written to disk immediately (atomic replace).
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, path: str, segments=None):
+        self.path = path
+        self.segments = segments or []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_workspace(cls, workspace):
+        return cls.load(workspace.path(cls.FILENAME))
+
+    @classmethod
+    def load(cls, path: str):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(path, json.load(f).get("segments", []))
+
+    def save(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory != "":
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"segments": self.segments}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    # ----------------------------
+    # SEGMENTS
+    # ----------------------------
+    def sync_text(self, text: str):
+        """
+        Re-segment the narration. Segments whose text is unchanged keep
+        their artifacts, even if they moved (a paragraph was inserted or
+        removed before them); new or edited segments start empty.
+        """
+        with self._lock:
+            chunks = segment_text(text)
+            for index, chunk in enumerate(chunks, start=1):
+                self.put_segment(index, chunk)
+            self.truncate(len(chunks))
+            return self.segments
+
+    def put_segment(self, index: int, text: str):
+        """
+        Set the text of segment `index`, keeping the artifacts of an
+        existing segment with the same text: the one already at `index`,
+        else one further down (moved up into place). Otherwise a new
+        segment is inserted at `index`, pushing the old one down where a
+        later paragraph can still claim it; truncate() drops what's left.
+        Segments before `index` are never touched, so this is also used
+        directly when paragraphs arrive one at a time from a stream.
+        """
+        with self._lock:
+            text_hash = content_hash(text)
+            position = next((i for i in range(index - 1, len(self.segments))
+                             if self.segments[i]["text_hash"] == text_hash), None)
+
+            if position == index - 1:
+                return self.segments[position]
+            if position is not None:
+                seg = self.segments.pop(position)
+            else:
+                seg = {"id": self._new_id(), "text": text, "text_hash": text_hash}
+            self.segments.insert(index - 1, seg)
+            self._renumber()
+            self.save()
+            return seg
+
+    def _new_id(self) -> str:
+        # Unique among the current segments, so a new one can't take over the
+        # artifact files of one that moved (the workspace names
+        # segment artifacts by id, see LessonWorkspace.segment_audio_path).
+        used = [int(seg["id"].rsplit("-", 1)[1]) for seg in self.segments]
+        return f"seg-{max(used, default=0) + 1:02d}"
+
+    def _renumber(self):
+        for index, seg in enumerate(self.segments, start=1):
+            seg["index"] = index
+
+    def truncate(self, count: int):
+        """Drop segments past `count` (the narration got shorter)."""
+        with self._lock:
+            if len(self.segments) > count:
+                del self.segments[count:]
+            self.save()
+
+    def get(self, index: int):
+        return self.segments[index - 1]
+
+    def update(self, index: int, **fields):
+        with self._lock:
+            self.segments[index - 1].update(fields)
+            self.save()
+
+    def texts(self):
+        return [seg["text"] for seg in self.segments]
+
+    # ----------------------------
+    # STALENESS
+    # ----------------------------
+    @staticmethod
+    def _file_ok(path) -> bool:
+        return bool(path) and os.path.exists(path)
+
+    def needs_prompt(self, seg) -> bool:
+        return seg.get("prompt_text_hash") != seg["text_hash"]
+
+    def needs_image(self, seg) -> bool:
+        if self.needs_prompt(seg):
+            return True
+        return seg.get("image_prompt_hash") != content_hash(seg["prompt"]) or not self._file_ok(seg.get("image"))
+
+    def needs_audio(self, seg) -> bool:
+        return seg.get("audio_text_hash") != seg["text_hash"] or not self._file_ok(seg.get("audio"))
+
+    def pending(self, stage: str):
+        check = {"prompt": self.needs_prompt, "image": self.needs_image, "audio": self.needs_audio}[stage]
+        return [seg for seg in self.segments if check(seg)]
+
+    # ----------------------------
+    # STAGE RESULTS
+    # ----------------------------
+    def set_prompt(self, index: int, prompt: str):
+        seg = self.get(index)
+        self.update(index, prompt=prompt, prompt_text_hash=seg["text_hash"])
+
+    def set_image(self, index: int, path: str):
+        seg = self.get(index)
+        self.update(index, image=path, image_prompt_hash=content_hash(seg["prompt"]))
+
+    def set_audio(self, index: int, path: str, duration: float = None):
+        seg = self.get(index)
+        self.update(index, audio=path, audio_text_hash=seg["text_hash"], duration=duration)
+
+    def slides(self, frames=None):
+        """
+        (image, audio, duration) for every segment with both artifacts.
+        `frames` maps segment index to an in-memory frame that is used in
+        place of the image file (which then need not exist).
+        """
+        frames = frames or {}
+        return [
+            (frames.get(seg["index"], seg.get("image")), seg["audio"], seg.get("duration"))
+            for seg in self.segments
+            if (seg["index"] in frames or self._file_ok(seg.get("image"))) and self._file_ok(seg.get("audio"))
+        ]
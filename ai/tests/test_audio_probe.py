@@ -0,0 +1,136 @@
+"""
+Header-only duration probing (audio_probe): WAV chunks, MP3 frame sync,
+Xing frame counts and the second-header check that rejects false syncs.
+
+Usage:
+    python -m unittest discover ai/tests
+"""
+import os
+import sys
+import wave
+import struct
+import tempfile
+import unittest
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import audio_probe  # noqa: E402
+
+# MPEG-1 layer III, 128 kbit/s, 44.1 kHz, stereo: 417-byte frames
+MPEG1_HEADER = b"\xff\xfb\x90\x00"
+MPEG1_FRAME = 417
+# MPEG-2 layer III, 48 kbit/s, 24 kHz, mono (what edge-tts writes): 144-byte frames
+MPEG2_HEADER = b"\xff\xf3\x64\xc0"
+MPEG2_FRAME = 144
+
+
+def frames(header: bytes, length: int, count: int) -> bytes:
+    return (header + bytes(length - 4)) * count
+
+
+def id3v2(body: bytes) -> bytes:
+    size = len(body)
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + synchsafe + body
+
+
+class AudioProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, data: bytes, name="clip.mp3") -> str:
+        path = os.path.join(self.dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    # ----------------------------
+    # FRAME HEADERS
+    # ----------------------------
+    def test_parse_mpeg1_header(self):
+        self.assertEqual(audio_probe._parse_mp3_frame(MPEG1_HEADER), ("1", 128, 44100, False, MPEG1_FRAME))
+
+    def test_parse_mpeg2_mono_header(self):
+        self.assertEqual(audio_probe._parse_mp3_frame(MPEG2_HEADER), ("2", 48, 24000, True, MPEG2_FRAME))
+
+    def test_padding_bit_adds_a_byte(self):
+        padded = MPEG1_HEADER[:2] + bytes([MPEG1_HEADER[2] | 0b10]) + MPEG1_HEADER[3:]
+        self.assertEqual(audio_probe._parse_mp3_frame(padded)[4], MPEG1_FRAME + 1)
+
+    def test_rejects_invalid_headers(self):
+        for header in (
+            b"\xff\xfb\xf0\x00",  # bitrate index 15
+            b"\xff\xfb\x00\x00",  # free format
+            b"\xff\xfb\x9c\x00",  # reserved sample rate
+            b"\xff\xfd\x90\x00",  # layer II
+            b"\xff\xeb\x90\x00",  # reserved version
+            b"\x00\xfb\x90\x00",  # no sync
+            b"\xff\xfb",          # truncated
+        ):
+            self.assertIsNone(audio_probe._parse_mp3_frame(header), header)
+
+    # ----------------------------
+    # MP3 DURATION
+    # ----------------------------
+    def test_cbr_duration_from_audio_bytes(self):
+        path = self.write(frames(MPEG1_HEADER, MPEG1_FRAME, 100))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 100 * MPEG1_FRAME * 8 / 128000)
+
+    def test_mpeg2_duration(self):
+        path = self.write(frames(MPEG2_HEADER, MPEG2_FRAME, 50))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 50 * MPEG2_FRAME * 8 / 48000)
+
+    def test_false_sync_before_first_frame_is_skipped(self):
+        # A sync pattern that isn't followed by a second header one frame later
+        junk = MPEG1_HEADER + bytes(60)
+        path = self.write(junk + frames(MPEG1_HEADER, MPEG1_FRAME, 20))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 20 * MPEG1_FRAME * 8 / 128000)
+
+    def test_id3v2_tag_is_skipped(self):
+        tag = id3v2(b"TIT2" + MPEG2_HEADER + bytes(40))
+        path = self.write(tag + frames(MPEG2_HEADER, MPEG2_FRAME, 10))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 10 * MPEG2_FRAME * 8 / 48000)
+
+    def test_id3v1_tag_is_not_audio(self):
+        path = self.write(frames(MPEG1_HEADER, MPEG1_FRAME, 10) + b"TAG" + bytes(125))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 10 * MPEG1_FRAME * 8 / 128000)
+
+    def test_single_frame_file(self):
+        path = self.write(frames(MPEG1_HEADER, MPEG1_FRAME, 1))
+        self.assertAlmostEqual(audio_probe.header_duration(path), MPEG1_FRAME * 8 / 128000)
+
+    def test_xing_frame_count(self):
+        # Side info is 32 bytes for MPEG-1 stereo; frame count flag only
+        xing = b"Xing" + struct.pack(">II", 0x1, 250)
+        first = MPEG1_HEADER + bytes(32) + xing
+        first += bytes(MPEG1_FRAME - len(first))
+        path = self.write(first + frames(MPEG1_HEADER, MPEG1_FRAME, 3))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 250 * 1152 / 44100)
+
+    def test_unrecognised_data(self):
+        self.assertIsNone(audio_probe.header_duration(self.write(b"not audio at all" * 10)))
+
+    # ----------------------------
+    # WAV DURATION
+    # ----------------------------
+    def test_wav_duration(self):
+        path = os.path.join(self.dir.name, "clip.wav")
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(bytes(2 * 8000))
+        self.assertAlmostEqual(audio_probe.header_duration(path), 0.5)
+
+    def test_streamed_wav_without_data_size(self):
+        fmt = struct.pack("<HHIIHH", 1, 1, 16000, 32000, 2, 16)
+        data = bytes(32000)
+        body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", 0xFFFFFFFF) + data
+        path = self.write(b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + body, "clip.wav")
+        self.assertAlmostEqual(audio_probe.header_duration(path), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
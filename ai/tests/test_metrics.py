@@ -0,0 +1,165 @@
+"""
+Metrics snapshots (metrics): merging the snapshots of several processes,
+the Prometheus text rendering and per-run summaries.
+
+Usage:
+    python -m unittest discover ai/tests
+"""
+import os
+import sys
+import time
+import unittest
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_DIR)
+
+import metrics  # noqa: E402
+
+BUCKETS = [0.1, 1.0]
+
+
+def process(counters=(), gauges=(), histograms=(), written_at=None):
+    """A snapshot as flush() writes it."""
+    return {
+        "counters": [list(c) for c in counters],
+        "gauges": [list(g) for g in gauges],
+        "histograms": [list(h) for h in histograms],
+        "written_at": time.time() if written_at is None else written_at,
+    }
+
+
+def entries(snap: dict, kind: str) -> dict:
+    return {(e[0], metrics._labels(e[1])): e[2:] if kind == "histograms" else e[2] for e in snap[kind]}
+
+
+class MergeTest(unittest.TestCase):
+    def test_counters_are_summed_per_label_set(self):
+        merged = metrics.merge([
+            process(counters=[("frames", {"source": "rendered"}, 3), ("frames", {"source": "cached"}, 1)]),
+            process(counters=[("frames", {"source": "rendered"}, 2)]),
+        ])
+        self.assertEqual(entries(merged, "counters"), {
+            ("frames", (("source", "rendered"),)): 5,
+            ("frames", (("source", "cached"),)): 1,
+        })
+
+    def test_histograms_are_summed_bucket_by_bucket(self):
+        merged = metrics.merge([
+            process(histograms=[("span_seconds", {"span": "tts"}, BUCKETS, [1, 0, 2], 7.05)]),
+            process(histograms=[("span_seconds", {"span": "tts"}, BUCKETS, [0, 3, 1], 4.5)]),
+        ])
+        buckets, counts, total = entries(merged, "histograms")[("span_seconds", (("span", "tts"),))]
+        self.assertEqual(buckets, BUCKETS)
+        self.assertEqual(counts, [1, 3, 3])
+        self.assertAlmostEqual(total, 11.55)
+
+    def test_histograms_with_other_buckets_are_not_mixed(self):
+        merged = metrics.merge([
+            process(histograms=[("span_seconds", {}, BUCKETS, [1, 0, 0], 0.05)]),
+            process(histograms=[("span_seconds", {}, [0.5], [4, 0], 1.0)]),
+        ])
+        self.assertEqual(entries(merged, "histograms")[("span_seconds", ())], [BUCKETS, [1, 0, 0], 0.05])
+
+    def test_stale_gauges_are_dropped_but_counters_kept(self):
+        old = time.time() - 600
+        merged = metrics.merge([
+            process(counters=[("lessons", {"result": "ok"}, 4)], gauges=[("lessons_in_progress", {}, 1)],
+                    written_at=old),
+            process(gauges=[("lessons_in_progress", {}, 2)]),
+        ], stale_seconds=60)
+        self.assertEqual(entries(merged, "gauges"), {("lessons_in_progress", ()): 2})
+        self.assertEqual(entries(merged, "counters"), {("lessons", (("result", "ok"),)): 4})
+
+    def test_without_stale_seconds_every_gauge_counts(self):
+        merged = metrics.merge([
+            process(gauges=[("lessons_in_progress", {}, 1)], written_at=0),
+            process(gauges=[("lessons_in_progress", {}, 2)]),
+        ])
+        self.assertEqual(entries(merged, "gauges"), {("lessons_in_progress", ()): 3})
+
+    def test_label_order_does_not_matter(self):
+        merged = metrics.merge([
+            process(counters=[("cache_lookups", {"cache": "tts", "result": "hit"}, 1)]),
+            process(counters=[("cache_lookups", {"result": "hit", "cache": "tts"}, 1)]),
+        ])
+        self.assertEqual(len(merged["counters"]), 1)
+        self.assertEqual(merged["counters"][0][2], 2)
+
+
+class RenderPrometheusTest(unittest.TestCase):
+    def test_counter_family(self):
+        text = metrics.render_prometheus(process(counters=[
+            ("frames", {"source": "rendered"}, 5),
+            ("frames", {"source": "cached"}, 1),
+        ]))
+        self.assertEqual(text.splitlines(), [
+            f"# HELP blinked_frames_total {metrics.METRICS['frames'][1]}",
+            "# TYPE blinked_frames_total counter",
+            'blinked_frames_total{source="cached"} 1',
+            'blinked_frames_total{source="rendered"} 5',
+        ])
+
+    def test_gauge_without_labels(self):
+        text = metrics.render_prometheus(process(gauges=[("lessons_in_progress", {}, 2)]))
+        self.assertIn("# TYPE blinked_lessons_in_progress gauge", text)
+        self.assertIn("blinked_lessons_in_progress 2\n", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        text = metrics.render_prometheus(process(histograms=[
+            ("span_seconds", {"span": "tts"}, BUCKETS, [1, 3, 2], 9.5),
+        ]))
+        self.assertEqual(text.splitlines()[2:], [
+            'blinked_span_seconds_bucket{span="tts",le="0.1"} 1',
+            'blinked_span_seconds_bucket{span="tts",le="1.0"} 4',
+            'blinked_span_seconds_bucket{span="tts",le="+Inf"} 6',
+            'blinked_span_seconds_sum{span="tts"} 9.5',
+            'blinked_span_seconds_count{span="tts"} 6',
+        ])
+
+    def test_label_values_are_escaped(self):
+        text = metrics.render_prometheus(process(counters=[("lessons", {"result": 'a "b"\\c\nd'}, 1)]))
+        self.assertIn('blinked_lessons_total{result="a \\"b\\"\\\\c\\nd"} 1', text)
+
+    def test_undeclared_metric_uses_its_name_as_help(self):
+        text = metrics.render_prometheus(process(counters=[("custom_thing", {}, 1)]))
+        self.assertIn("# HELP blinked_custom_thing_total custom_thing", text)
+
+    def test_renders_merged_snapshots(self):
+        merged = metrics.merge([
+            process(counters=[("lessons", {"result": "ok"}, 1)]),
+            process(counters=[("lessons", {"result": "ok"}, 2)]),
+        ])
+        self.assertIn('blinked_lessons_total{result="ok"} 3', metrics.render_prometheus(merged))
+
+
+class RunSummaryTest(unittest.TestCase):
+    def test_deltas_and_frames_per_second(self):
+        before = process(
+            counters=[("frames", {"source": "rendered"}, 2)],
+            histograms=[("span_seconds", {"span": "sdxl.batch"}, BUCKETS, [0, 1, 0], 0.5)],
+        )
+        after = process(
+            counters=[("frames", {"source": "rendered"}, 6), ("frames", {"source": "cached"}, 1)],
+            histograms=[("span_seconds", {"span": "sdxl.batch"}, BUCKETS, [0, 3, 0], 2.5)],
+        )
+        summary = metrics.run_summary(before, after)
+        self.assertEqual(summary["frames"], {"source=rendered": 4, "source=cached": 1})
+        self.assertEqual(summary["span_seconds"]["span=sdxl.batch"], {"count": 2, "total_seconds": 2.0})
+        self.assertEqual(summary["frames_per_second"], 2.0)
+
+    def test_frames_per_second_matches_labels_exactly(self):
+        # Label values that merely contain the matched text don't count
+        after = process(
+            counters=[("frames", {"source": "rendered"}, 4), ("frames", {"source": "source=rendered"}, 100)],
+            histograms=[("span_seconds", {"span": "sdxl.batch"}, BUCKETS, [0, 2, 0], 2.0),
+                        ("span_seconds", {"span": "sdxl.batch_warmup"}, BUCKETS, [0, 1, 0], 30.0)],
+        )
+        self.assertEqual(metrics.run_summary(process(), after)["frames_per_second"], 2.0)
+
+    def test_no_renders_no_rate(self):
+        after = process(counters=[("frames", {"source": "cached"}, 3)])
+        self.assertNotIn("frames_per_second", metrics.run_summary(process(), after))
+
+
+if __name__ == "__main__":
+    unittest.main()
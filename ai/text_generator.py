@@ -1,42 +1,63 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import re
+import time
+import asyncio
+import threading
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found.")
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
 
-genai.configure(api_key=api_key)
+import metrics  # noqa: E402
+from gemini_client import model_name, new_model, record_usage  # noqa: E402
+from llm_cache import ResponseCache, get_default_cache  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
 
 TEXT_MODEL = "gemini-flash-latest"
+GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "max_output_tokens": 1024
+}
 
 
-def generate_explanation(topic: str):
-    model = genai.GenerativeModel(TEXT_MODEL)
-
-    prompt = f"""Explain the following topic in a simple and clear way, like you are explaining it to students.
+def build_explanation_prompt(topic: str) -> str:
+    return f"""Explain the following topic in a simple and clear way, like you are explaining it to students.
 Write 250 to 320 words. DONT INCLUDE ANY MATHEMATICAL FORMULAS.
 Use short sentences.
 Beginner friendly.
 Topic: {topic}"""
 
+
+def generate_explanation(topic: str):
+    prompt = build_explanation_prompt(topic)
+
+    # Popular topics are asked for again and again — answer those locally.
+    cache = get_default_cache()
+    key = ResponseCache.key(TEXT_MODEL, prompt, GENERATION_CONFIG)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    model = new_model(TEXT_MODEL)
+
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.4,
-                "max_output_tokens": 1024
-            }
-        )
+        with metrics.span("gemini.generate", caller="explanation"):
+            response = model.generate_content(
+                prompt,
+                generation_config=GENERATION_CONFIG
+            )
+        record_usage(response, "explanation")
         # print("DEBUG:", response)
 
 
         # BEST way to extract text safely
         text = response.text  # ← Works in Flash
         if text:
-            return text.strip()
+            text = text.strip()
+            if cache:
+                cache.set(key, text)
+            return text
 
         # If .text fails, fallback:
         all_text = ""
@@ -51,6 +72,112 @@ Topic: {topic}"""
         return f"Error generating content: {e}"
     
 
+# ----------------------------
+# STREAMING NARRATION
+# ----------------------------
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def stream_explanation(topic: str, model=None):
+    """
+    Like generate_explanation(), but yields each paragraph as soon as it
+    is complete, while the rest of the response is still streaming in.
+    Raises RuntimeError if the stream fails, even after some paragraphs
+    were yielded, so the caller never mistakes a partial narration for
+    a complete one.
+    """
+    prompt = build_explanation_prompt(topic)
+
+    cache = get_default_cache()
+    key = ResponseCache.key(model_name(model, TEXT_MODEL), prompt, GENERATION_CONFIG)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield from (p.strip() for p in PARAGRAPH_BREAK.split(cached) if p.strip())
+            return
+
+    model = model or new_model(TEXT_MODEL)
+    paragraphs = []
+    buffer = ""
+    chunk = None
+    started = time.perf_counter()
+    waiting = True
+
+    try:
+        response = model.generate_content(prompt, generation_config=GENERATION_CONFIG, stream=True)
+
+        for chunk in response:
+            if waiting:
+                waiting = False
+                metrics.observe("span_seconds", time.perf_counter() - started,
+                                span="gemini.first_chunk", caller="explanation")
+            try:
+                buffer += chunk.text or ""
+            except ValueError:
+                # chunk without text parts (e.g. safety metadata only)
+                continue
+
+            while True:
+                match = PARAGRAPH_BREAK.search(buffer)
+                if not match:
+                    break
+                paragraph, buffer = buffer[:match.start()].strip(), buffer[match.end():]
+                if paragraph:
+                    paragraphs.append(paragraph)
+                    yield paragraph
+
+        if buffer.strip():
+            paragraphs.append(buffer.strip())
+            yield buffer.strip()
+
+    except Exception as e:
+        # A partial narration must not become a (short) lesson, nor be cached
+        metrics.inc("span_errors", span="gemini.stream", caller="explanation")
+        raise RuntimeError(f"Narration stream failed after {len(paragraphs)} paragraph(s): {e}") from e
+
+    # The last chunk carries the usage of the whole response
+    metrics.observe("span_seconds", time.perf_counter() - started, span="gemini.stream", caller="explanation")
+    record_usage(chunk, "explanation")
+
+    # Only a stream that completed is cached
+    if paragraphs and cache:
+        cache.set(key, "\n\n".join(paragraphs))
+
+
+async def astream_explanation(topic: str, model=None):
+    """
+    Async version of stream_explanation(); the blocking stream runs in a thread.
+    If the consumer stops early, the thread stops pulling the stream at the
+    next paragraph instead of reading the response to the end.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        paragraphs = stream_explanation(topic, model)
+        try:
+            for paragraph in paragraphs:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, paragraph)
+        finally:
+            paragraphs.close()
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+    await producer
+
+
 def save_explanation(text: str, output_path: str):
     """Save explanation text to a file."""
     directory = os.path.dirname(output_path)
@@ -68,8 +195,7 @@ if __name__ == "__main__":
     print("Generated Explanation:\n")
     print(result)
 
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    save_path = os.path.join(BASE_DIR, "output", "explanation.txt")
+    save_path = LessonWorkspace.legacy().explanation_path
 
     save_explanation(result, save_path)
 
@@ -0,0 +1,66 @@
+import os
+import re
+import json
+import shutil
+import threading
+import unicodedata
+
+from disk_cache import DiskLRUCache, make_key
+
+
+# ----------------------------
+# TTS CACHE (NARRATION CLIPS)
+# ----------------------------
+class TTSCache(DiskLRUCache):
+    """
+    Cache of synthesized narration clips, keyed by the normalised text,
+    the voice and the backend's settings (rate, pitch...).
+
+    Clips are stored as the backend wrote them (MP3 from edge-tts), with a
+    <key>.tts.json sidecar holding the duration so a cached clip never
+    needs probing. Sidecars count towards the size cap and are removed
+    together with their clip.
+    """
+
+    name = "tts"
+    SIDECAR = ".json"
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__(directory, max_bytes, suffix=".tts")
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        """Text as far as the voice is concerned: NFC, whitespace collapsed."""
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+    @classmethod
+    def key(cls, text: str, voice: str, settings: dict = None) -> str:
+        return make_key(text=cls.normalise(text), voice=voice, settings=settings or {})
+
+    def get(self, key: str):
+        """(clip path, duration or None) for `key`, or None on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+
+        try:
+            with open(path + self.SIDECAR, "r", encoding="utf-8") as f:
+                duration = json.load(f)["duration"]
+        except (OSError, ValueError, KeyError):
+            duration = None
+        return path, duration
+
+    def put(self, key: str, clip_path: str, duration: float = None):
+        """Copy the clip at clip_path into the cache; returns the cached path."""
+        # Sidecar first: a clip that is visible always has its duration
+        sidecar = self.path_for(key) + self.SIDECAR
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        tmp_path = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"duration": duration}, f)
+        os.replace(tmp_path, sidecar)
+
+        return self.store(key, lambda tmp: shutil.copyfile(clip_path, tmp))
+
+    def _companions(self, path: str):
+        return (path + self.SIDECAR,)
@@ -1,73 +1,471 @@
 import os
-from moviepy.editor import *
+import subprocess
 
-def create_video():
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    image_dir = os.path.join(BASE_DIR, "output", "frames")
-    audio_dir = os.path.join(BASE_DIR, "output", "audio")
-    output_path = os.path.join(BASE_DIR, "output", "video", "final_video.mp4")
+import numpy as np
+from PIL import Image
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
+
+import metrics  # noqa: E402
+from audio_probe import header_duration  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+from segments import SegmentManifest  # noqa: E402
+
+# ----------------------------
+# RENDER SETTINGS
+# ----------------------------
+FPS = 30
+VIDEO_WIDTH = 1280
+VIDEO_HEIGHT = 720
+CROSSFADE = 0.4   # overlap between consecutive slides
+FADE_IN = 0.6
+
+# "fast": encode each still once in a single streamed ffmpeg pass
+# "compose": original moviepy compositing path
+RENDER_MODE = os.getenv("VIDEO_RENDER_MODE", "fast")
+
+# Persisted frames are intermediates: trade file size for encode speed
+PNG_COMPRESS_LEVEL = 1
+
+# The fast render encodes at most this many slides per ffmpeg process
+# (one filtergraph holds every input of its group), then joins the parts
+VIDEO_GROUP_SIZE = int(os.getenv("VIDEO_GROUP_SIZE", 8))
+
+# All narration, pre-mixed into one track next to the video
+NARRATION_TRACK = "narration.m4a"
+NARRATION_SAMPLE_RATE = 44100
+
+
+# ----------------------------
+# VIDEO FRAMES
+# ----------------------------
+def to_video_frame(image) -> np.ndarray:
+    """
+    `image` (PIL image, array or file path) as an RGB uint8 array of exactly
+    VIDEO_WIDTH x VIDEO_HEIGHT, scaled to fit and letterboxed like the
+    ffmpeg scale/pad filters. Frames in this form go to the encoder as-is.
+    """
+    if isinstance(image, np.ndarray):
+        if image.shape == (VIDEO_HEIGHT, VIDEO_WIDTH, 3) and image.dtype == np.uint8:
+            return image
+        image = Image.fromarray(image)
+    elif isinstance(image, str):
+        with Image.open(image) as img:
+            image = img.convert("RGB")
+
+    image = image.convert("RGB")
+    if image.size != (VIDEO_WIDTH, VIDEO_HEIGHT):
+        scale = min(VIDEO_WIDTH / image.width, VIDEO_HEIGHT / image.height)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.BICUBIC)
+        if size != (VIDEO_WIDTH, VIDEO_HEIGHT):
+            canvas = Image.new("RGB", (VIDEO_WIDTH, VIDEO_HEIGHT))
+            canvas.paste(image, ((VIDEO_WIDTH - size[0]) // 2, (VIDEO_HEIGHT - size[1]) // 2))
+            image = canvas
+    return np.asarray(image)
+
+
+def save_frame(frame: np.ndarray, path: str):
+    """Write a video frame; .ppm is uncompressed, .png uses PNG_COMPRESS_LEVEL."""
+    Image.fromarray(frame).save(path, compress_level=PNG_COMPRESS_LEVEL)
+
+
+def create_video(workspace=None, render_mode=RENDER_MODE, frames=None):
+    """
+    Assemble the workspace's slides into its video. `frames` maps segment
+    index to an in-memory frame (to_video_frame()), used instead of the
+    segment's image file.
+    """
+    workspace = workspace or LessonWorkspace.legacy()
+    output_path = workspace.video_path
+
+    manifest = SegmentManifest.for_workspace(workspace)
+    if manifest.segments:
+        # Slides come straight from the manifest: no directory listing, and
+        # durations probed once are remembered for the next render.
+        for seg in manifest.segments:
+            if seg.get("audio") and seg.get("duration") is None and os.path.exists(seg["audio"]):
+                try:
+                    manifest.update(seg["index"], duration=probe_duration(seg["audio"]))
+                except Exception as e:
+                    print(f"❌ ERROR reading audio {seg['audio']}: {e}")
+
+        slides = manifest.slides(frames)
+        print(f"🔍 {len(slides)} of {len(manifest.segments)} segments have an image and audio.")
+        return assemble_video(slides, output_path, render_mode)
+
+    # No manifest (older output folders): pair files by sorted name
+    image_dir = workspace.frames_dir
+    audio_dir = workspace.audio_dir
 
     # Load assets
-    image_files = sorted([os.path.join(image_dir, f) for f in os.listdir(image_dir) if f.endswith(".png")])
+    image_files = sorted([os.path.join(image_dir, f) for f in os.listdir(image_dir) if f.endswith((".png", ".ppm"))])
     audio_files = sorted([os.path.join(audio_dir, f) for f in os.listdir(audio_dir) if f.endswith(".wav")])
 
     print(f"🔍 Found {len(image_files)} images.")
     print(f"🔍 Found {len(audio_files)} audio clips.")
 
-    clips = []
+    return assemble_video(list(zip(image_files, audio_files)), output_path, render_mode)
+
+
+def probe_duration(path: str) -> float:
+    """Duration from the file headers; decoded with moviepy only for unknown formats."""
+    duration = header_duration(path)
+    if duration is not None:
+        return duration
 
-    for i, (img, aud) in enumerate(zip(image_files, audio_files)):
+    from moviepy.editor import AudioFileClip
+
+    audio_clip = AudioFileClip(path)
+    try:
+        return audio_clip.duration
+    finally:
+        audio_clip.close()
+
+
+def assemble_video(slides, output_path, render_mode=RENDER_MODE):
+    """
+    Build the final video from (image, audio_path[, duration]) tuples,
+    one slide each, shown for the length of its audio. The image is a file
+    path or an in-memory frame. The duration is probed only when it isn't
+    given.
+    Returns output_path, or None when no slide was usable.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    valid = []
+
+    for i, (img, aud, *known) in enumerate(slides):
         print(f"🎨 Processing slide {i+1}...")
 
-        try:
-            audio_clip = AudioFileClip(aud)
-            audio_duration = audio_clip.duration
-        except Exception as e:
-            print(f"❌ ERROR reading audio {aud}: {e}")
-            continue
+        audio_duration = known[0] if known else None
+        if audio_duration is None:
+            try:
+                audio_duration = probe_duration(aud)
+            except Exception as e:
+                print(f"❌ ERROR reading audio {aud}: {e}")
+                continue
 
         if audio_duration is None or audio_duration <= 0:
             print(f"⚠ Skipping invalid audio (duration={audio_duration}) → {aud}")
             continue
 
+        valid.append((img, aud, audio_duration))
+
+    slides = valid
+
+    if not slides:
+        print("❌ No valid clips generated. Cannot create video.")
+        return None
+
+    with metrics.span("video.narration_track"):
+        narration = build_narration_track(slides, os.path.join(os.path.dirname(output_path), NARRATION_TRACK))
+
+    with metrics.span("video.encode", mode=render_mode):
+        if render_mode == "compose":
+            if not _render_compose(slides, narration, output_path):
+                return None
+        else:
+            _render_fast(slides, narration, output_path)
+    metrics.inc("video_slides", len(slides), mode=render_mode)
+
+    print(f"🎉 Video saved at:\n{output_path}")
+    return output_path
+
+
+# ----------------------------
+# NARRATION TRACK
+# ----------------------------
+def slide_offsets(durations):
+    """
+    Start time of every slide in the video: each one begins CROSSFADE
+    seconds before the previous one ends. Returns (offsets, total length).
+    """
+    offsets, length = [], 0.0
+    for i, duration in enumerate(durations):
+        offset = max(0.0, length - CROSSFADE) if i else 0.0
+        offsets.append(offset)
+        length = offset + duration
+    return offsets, length
+
+
+def _decode_command(slides):
+    """
+    ffmpeg decoding every clip once, in order, padded or trimmed to exactly
+    its slide's duration, as one raw float32 mono stream on stdout.
+    """
+    cmd = [_ffmpeg_exe(), "-hide_banner", "-loglevel", "error"]
+    filters = []
+    for i, (_, aud, duration) in enumerate(slides):
+        cmd += ["-i", aud]
+        samples = round(duration * NARRATION_SAMPLE_RATE)
+        filters.append(
+            f"[{i}:a]aformat=sample_fmts=flt:sample_rates={NARRATION_SAMPLE_RATE}:channel_layouts=mono,"
+            f"apad=whole_len={samples},atrim=end_sample={samples}[a{i}]"
+        )
+    filters.append("".join(f"[a{i}]" for i in range(len(slides))) + f"concat=n={len(slides)}:v=0:a=1[out]")
+    return cmd + ["-filter_complex", ";".join(filters), "-map", "[out]", "-f", "f32le", "pipe:1"]
+
+
+def _encode_command(track_path):
+    return [_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "f32le", "-ar", str(NARRATION_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "aac", "-b:a", "128k", track_path]
+
+
+def build_narration_track(slides, track_path):
+    """
+    Pre-mix the narration of (image, audio, duration) slides into one AAC
+    track at track_path; returns it.
+
+    Every clip is decoded once (one ffmpeg pass over all of them) and
+    streamed through to one encoder. Clip i starts at slide_offsets()[i],
+    CROSSFADE before the previous clip ends, and only those overlaps are
+    mixed here (a linear crossfade), so the work grows linearly with the
+    number of slides and the track is exactly as long as the video.
+    """
+    print(f"🔊 Mixing narration track ({len(slides)} clips)...")
+    overlap = round(CROSSFADE * NARRATION_SAMPLE_RATE)
+
+    decoder = subprocess.Popen(_decode_command(slides), stdout=subprocess.PIPE)
+    encoder = subprocess.Popen(_encode_command(track_path), stdin=subprocess.PIPE)
+    try:
+        tail = None
+        for i, (_, _, duration) in enumerate(slides):
+            samples = round(duration * NARRATION_SAMPLE_RATE)
+            clip = np.frombuffer(decoder.stdout.read(samples * 4), dtype=np.float32)
+
+            if tail is not None:
+                n = min(len(tail), len(clip))
+                fade = np.linspace(0.0, 1.0, n, dtype=np.float32)
+                encoder.stdin.write((tail[:n] * (1 - fade) + clip[:n] * fade).tobytes())
+                clip = clip[n:]
+
+            if i < len(slides) - 1:
+                keep = min(overlap, len(clip))
+                encoder.stdin.write(clip[:len(clip) - keep].tobytes())
+                tail = clip[len(clip) - keep:]
+            else:
+                encoder.stdin.write(clip.tobytes())
+        encoder.stdin.close()
+    except BrokenPipeError:
+        pass  # the encoder exited early; its error is reported below
+    finally:
+        decoder.stdout.close()
+
+    for process, cmd in ((decoder, decoder.args), (encoder, encoder.args)):
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+    return track_path
+
+
+# ----------------------------
+# COMPOSE RENDER (MOVIEPY)
+# ----------------------------
+def _render_compose(slides, narration, output_path):
+    # moviepy is only imported for this render mode
+    from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips
+
+    clips = []
+
+    for i, (img, aud, audio_duration) in enumerate(slides):
         try:
-            image_clip = (
-                ImageClip(img)
-                .resize(width=1280)
-                .set_duration(audio_duration)
-                .set_audio(AudioFileClip(aud))
-            )
-            clips.append(image_clip)
+            image_clip = ImageClip(img)
+            # In-memory frames are already at the video size
+            if isinstance(img, str):
+                image_clip = image_clip.resize(width=VIDEO_WIDTH)
+            clips.append(image_clip.set_duration(audio_duration))
 
         except Exception as e:
-            print(f"❌ ERROR creating clip for {img}: {e}")
+            print(f"❌ ERROR creating clip for {img if isinstance(img, str) else f'slide {i + 1}'}: {e}")
             continue
 
     if not clips:
         print("❌ No valid clips generated. Cannot create video.")
-        return
+        return False
 
     print("🎞 Adding transitions and combining clips...")
 
-    # Crossfade transition
-    final = concatenate_videoclips(
-        clips,
-        method="compose",
-        padding=-0.4
-    ).crossfadein(0.6)
+    # Crossfade transition; the narration is attached once, already mixed
+    narration_clip = AudioFileClip(narration)
+    try:
+        final = concatenate_videoclips(
+            clips,
+            method="compose",
+            padding=-CROSSFADE
+        ).crossfadein(FADE_IN).set_audio(narration_clip)
 
-    print("💾 Rendering final video...")
+        print("💾 Rendering final video...")
 
-    final.write_videofile(
-        output_path,
-        fps=30,
-        codec="libx264",
-        audio_codec="aac"
-    )
+        final.write_videofile(
+            output_path,
+            fps=FPS,
+            codec="libx264",
+            audio_codec="aac"
+        )
+    finally:
+        # Its ffmpeg reader process stays open until closed
+        narration_clip.close()
+    return True
 
-    print(f"🎉 Video saved at:\n{output_path}")
+
+# ----------------------------
+# FAST RENDER (STREAMED FFMPEG)
+# ----------------------------
+def _ffmpeg_exe():
+    """ffmpeg binary bundled with moviepy (imageio-ffmpeg), else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def _in_memory(slides) -> bool:
+    return any(not isinstance(img, str) for img, _, _ in slides)
+
+
+def build_ffmpeg_command(slides, narration, output_path, fade_in=True):
+    """
+    One ffmpeg invocation for a run of slides: every still is shown for
+    exactly its audio duration, slides are joined with xfade (same overlap
+    as the compose path and the narration track) and the result is encoded
+    as it streams, so no frame is ever composited in Python. The
+    pre-mixed narration track is muxed in without re-encoding; with
+    `narration=None` the output is video only (a part for
+    build_concat_command()).
+
+    Stills are looped image files, or, when any slide holds an in-memory
+    frame, one raw RGB frame per slide read from stdin (_render_fast()
+    writes them) with no decode or rescale.
+
+    The filtergraph opens every input at once, so ffmpeg's memory grows
+    with len(slides); _render_fast() keeps it to VIDEO_GROUP_SIZE.
+    """
+    n = len(slides)
+    cmd = [_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error"]
+    filters = []
+
+    if _in_memory(slides):
+        cmd += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{VIDEO_WIDTH}x{VIDEO_HEIGHT}",
+                "-framerate", str(FPS), "-i", "pipe:0"]
+        narration_input = 1
+        filters.append("[0:v]split=" + str(n) + "".join(f"[s{i}]" for i in range(n)))
+        for i, (_, _, duration) in enumerate(slides):
+            frames = max(1, round(duration * FPS))
+            filters.append(
+                f"[s{i}]trim=start_frame={i}:end_frame={i + 1},setpts=PTS-STARTPTS,"
+                f"loop=loop={frames - 1}:size=1:start=0,setpts=N/{FPS}/TB,fps={FPS},setsar=1,format=yuv420p[v{i}]"
+            )
+    else:
+        for img, _, duration in slides:
+            cmd += ["-loop", "1", "-framerate", str(FPS), "-t", f"{duration:.3f}", "-i", img]
+        narration_input = n
+        for i in range(n):
+            filters.append(
+                f"[{i}:v]scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=decrease,"
+                f"pad={VIDEO_WIDTH}:{VIDEO_HEIGHT}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={FPS},format=yuv420p[v{i}]"
+            )
+    if narration:
+        cmd += ["-i", narration]
+
+    offsets, _ = slide_offsets([duration for _, _, duration in slides])
+    video = "[v0]"
+    for i in range(1, n):
+        filters.append(f"{video}[v{i}]xfade=transition=fade:duration={CROSSFADE}:offset={offsets[i]:.3f}[xv{i}]")
+        video = f"[xv{i}]"
+
+    if fade_in:
+        filters.append(f"{video}fade=t=in:st=0:d={FADE_IN}[vout]")
+    else:
+        filters.append(f"{video}null[vout]")
+
+    cmd += ["-filter_complex", ";".join(filters), "-map", "[vout]"]
+    if narration:
+        cmd += ["-map", f"{narration_input}:a"]
+    cmd += [
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+        "-pix_fmt", "yuv420p", "-r", str(FPS),
+    ]
+    if narration:
+        cmd += ["-c:a", "copy", "-movflags", "+faststart"]
+    return cmd + [output_path]
+
+
+def slide_groups(slides, size=None):
+    """
+    Split slides into runs of at most `size` (VIDEO_GROUP_SIZE) that can be encoded
+    separately and joined end to end without re-encoding. Every run but
+    the first starts with the previous run's last slide, held for just
+    the CROSSFADE, so the seam's xfade is rendered in the later run; every
+    run but the last stops CROSSFADE short of its last slide's end, where
+    that seam begins. The runs' lengths add up to the single-pass video.
+    """
+    size = max(1, size or VIDEO_GROUP_SIZE)
+    groups = []
+    for start in range(0, len(slides), size):
+        group = list(slides[start:start + size])
+        if start:
+            img, aud, _ = slides[start - 1]
+            group.insert(0, (img, aud, CROSSFADE))
+        if start + size < len(slides):
+            img, aud, duration = group[-1]
+            group[-1] = (img, aud, max(1 / FPS, duration - CROSSFADE))
+        groups.append(group)
+    return groups
+
+
+def build_concat_command(list_path, narration, output_path):
+    """Join the encoded parts listed in list_path (concat demuxer, no re-encode) and mux the narration."""
+    return [_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path, "-i", narration,
+            "-map", "0:v", "-map", "1:a", "-c", "copy",
+            "-movflags", "+faststart",
+            output_path]
+
+
+def _run_ffmpeg(cmd, slides):
+    if not _in_memory(slides):
+        subprocess.run(cmd, check=True)
+        return
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        for img, _, _ in slides:
+            process.stdin.write(to_video_frame(img).tobytes())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its error is reported below
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+def _render_fast(slides, narration, output_path):
+    print(f"💾 Rendering final video with ffmpeg ({len(slides)} slides)...")
+    groups = slide_groups(slides)
+    if len(groups) == 1:
+        _run_ffmpeg(build_ffmpeg_command(slides, narration, output_path), slides)
+        return
+
+    # Encode the groups one at a time, so memory stays bounded by
+    # VIDEO_GROUP_SIZE however long the lesson is, then join them
+    base = os.path.splitext(output_path)[0]
+    parts = [f"{base}.part{g:03d}.mp4" for g in range(len(groups))]
+    list_path = f"{base}.parts.txt"
+    try:
+        for g, (group, part) in enumerate(zip(groups, parts)):
+            print(f"🎬 Encoding part {g + 1}/{len(groups)} ({len(group)} slides)...")
+            _run_ffmpeg(build_ffmpeg_command(group, None, part, fade_in=g == 0), group)
+
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+        subprocess.run(build_concat_command(list_path, narration, output_path), check=True)
+    finally:
+        for path in parts + [list_path]:
+            if os.path.exists(path):
+                os.remove(path)
 
 
 if __name__ == "__main__":
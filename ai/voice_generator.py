@@ -1,6 +1,17 @@
 import os
+import shutil
 import asyncio
-import edge_tts
+import contextlib
+
+import env
+if __name__ == "__main__":
+    env.load_env()  # before the modules below read their settings
+
+import metrics  # noqa: E402
+from audio_probe import header_duration  # noqa: E402
+from tts_cache import TTSCache  # noqa: E402
+from workspace import LessonWorkspace  # noqa: E402
+from segments import SegmentManifest, segment_text, speakable  # noqa: E402
 
 # ---------------------------------------------
 # Load and clean narration text
@@ -9,45 +20,235 @@ def load_paragraphs(path):
     with open(path, "r", encoding="utf-8") as f:
         text = f.read().strip()
 
-    # Remove unwanted symbols
-    text = text.replace("*", "")
+    # Same paragraphs as the image stage, with unwanted symbols removed
+    return [speakable(p) for p in segment_text(text)]
+
+
+# ---------------------------------------------
+# Edge-TTS backend
+# ---------------------------------------------
+VOICE = "en-US-AriaNeural"  # very natural female voice
+RATE = os.getenv("TTS_RATE", "+0%")
+PITCH = os.getenv("TTS_PITCH", "+0Hz")
+VOLUME = os.getenv("TTS_VOLUME", "+0%")
+MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = 3
+RETRY_BASE = 1.0  # seconds, doubled on every retry
+
+# Failures worth retrying, besides connection errors, timeouts, HTTP 429
+# and 5xx: edge_tts and aiohttp errors, matched by class name so neither
+# has to be imported here. Anything else (bad voice, bad SSML, a local
+# write error) fails at once.
+TRANSIENT_ERRORS = {
+    "NoAudioReceived", "WebSocketError",
+    "ClientConnectionError", "ServerDisconnectedError", "ClientPayloadError",
+}
+
+
+def _is_transient(error) -> bool:
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class EdgeTTSBackend:
+    def __init__(self, rate: str = RATE, pitch: str = PITCH, volume: str = VOLUME):
+        self.rate = rate
+        self.pitch = pitch
+        self.volume = volume
+
+    def settings(self) -> dict:
+        """Everything besides text and voice that changes the audio (part of the cache key)."""
+        return {"backend": "edge-tts", "rate": self.rate, "pitch": self.pitch, "volume": self.volume}
+
+    async def synthesize(self, text, voice, path):
+        import edge_tts  # on first use: it pulls in aiohttp
+
+        communicate = edge_tts.Communicate(text, voice, rate=self.rate, pitch=self.pitch, volume=self.volume)
+        await communicate.save(path)
 
-    # Split into paragraphs
-    paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
 
-    return paragraphs
+# ---------------------------------------------
+# TTS cache
+# ---------------------------------------------
+# Clips are reused across runs and lessons while the text, voice and
+# settings are unchanged. TTS_CACHE_DIR="" disables the cache.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "tts"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+
+_tts_cache = None
+
+
+def get_tts_cache():
+    """Shared narration cache, or None when TTS_CACHE_DIR is set to an empty string."""
+    global _tts_cache
+    if _tts_cache is None and TTS_CACHE_DIR:
+        _tts_cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB * 1024 * 1024)
+    return _tts_cache
+
+
+def _backend_settings(backend) -> dict:
+    settings = getattr(backend, "settings", None)
+    return settings() if settings else {"backend": type(backend).__name__}
+
+
+def _copy_into_place(src, out_path):
+    tmp_path = out_path + ".part"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, out_path)
+
+
+async def _restore_cached(cache, key, out_path):
+    """Copy a cached clip to out_path; returns its duration, or False on a miss."""
+    entry = cache.get(key)
+    if entry is None:
+        return False
+
+    path, duration = entry
+    # File copies run off the event loop, so other clips keep streaming
+    await asyncio.to_thread(_copy_into_place, path, out_path)
+    return duration if duration is not None else header_duration(out_path)
+
+
+async def synthesize_paragraph(backend, text, voice, out_path, semaphore=None, label=""):
+    """
+    Synthesize one paragraph into `out_path`, retrying transient failures
+    (see _is_transient()).
+    Audio is written to a .part file and renamed into place, so the video
+    step never picks up a half-written file.
+    """
+    path, _ = await synthesize_clip(backend, text, voice, out_path, semaphore, label)
+    return path
+
+
+async def synthesize_clip(backend, text, voice, out_path, semaphore=None, label=""):
+    """
+    synthesize_paragraph() that also returns the clip's duration:
+    (out_path, seconds). A clip already in the TTS cache is copied into
+    place without calling the backend; a new one is added to the cache.
+    """
+    cache = get_tts_cache()
+    key = cache.key(text, voice, _backend_settings(backend)) if cache else None
+    if cache:
+        duration = await _restore_cached(cache, key, out_path)
+        if duration is not False:
+            metrics.inc("tts_clips", source="cached")
+            print(f"♻ Cached audio {label}: {out_path}")
+            return out_path, duration
+
+    tmp_path = out_path + ".part"
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            # Only the request holds a slot; the backoff below doesn't
+            async with semaphore or contextlib.nullcontext():
+                print(f"🔊 Generating audio {label}...")
+                with metrics.span("tts.synthesize"):
+                    await backend.synthesize(text, voice, tmp_path)
+            os.replace(tmp_path, out_path)
+            metrics.inc("tts_clips", source="synthesized")
+            print(f"✔ Saved: {out_path}")
+            duration = header_duration(out_path)
+            if cache:
+                await asyncio.to_thread(cache.put, key, out_path, duration)
+            return out_path, duration
+
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if attempt == MAX_RETRIES or not _is_transient(e):
+                raise
+            metrics.inc("tts_retries")
+            delay = RETRY_BASE * 2 ** attempt
+            print(f"⚠ Audio {label} failed ({e}), retrying in {delay:.0f}s...")
+            await asyncio.sleep(delay)
 
 
 # ---------------------------------------------
 # Generate narration using Edge-TTS
 # ---------------------------------------------
-async def generate_audio(paragraphs, output_dir="ai/output/audio"):
+async def generate_audio(paragraphs, output_dir=None, max_concurrency=MAX_CONCURRENCY, backend=None, workspace=None):
+    """
+    Synthesize every paragraph, at most `max_concurrency` at a time, into
+    `output_dir` (default: the workspace's audio dir).
+    Returns the audio paths in paragraph order.
+    """
+    output_dir = output_dir or (workspace or LessonWorkspace.legacy()).audio_dir
     os.makedirs(output_dir, exist_ok=True)
-
-    VOICE = "en-US-AriaNeural"  # very natural female voice
+    backend = backend or EdgeTTSBackend()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
     print(f"🎤 Using voice: {VOICE}")
 
-    for i, para in enumerate(paragraphs, start=1):
-        out_path = os.path.join(output_dir, f"audio_{i}.wav")
-        print(f"🔊 Generating audio {i}/{len(paragraphs)}...")
-
-        communicate = edge_tts.Communicate(para, VOICE)
-        await communicate.save(out_path)
-
-        print(f"✔ Saved: {out_path}")
+    total = len(paragraphs)
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(synthesize_paragraph(
+                backend,
+                para,
+                VOICE,
+                os.path.join(output_dir, f"audio_{i}.wav"),
+                semaphore,
+                f"{i}/{total}"
+            ))
+            for i, para in enumerate(paragraphs, start=1)
+        ]
+
+    return [t.result() for t in tasks]
+
+
+async def generate_segment_audio(manifest, workspace, max_concurrency=MAX_CONCURRENCY, backend=None):
+    """
+    Synthesize only the manifest segments whose audio is missing or was
+    made from different text, recording each result in the manifest.
+    """
+    os.makedirs(workspace.audio_dir, exist_ok=True)
+    backend = backend or EdgeTTSBackend()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    pending = manifest.pending("audio")
+    total = len(manifest.segments)
+
+    async def voice(seg):
+        path, duration = await synthesize_clip(
+            backend,
+            speakable(seg["text"]),
+            VOICE,
+            workspace.segment_audio_path(seg["id"]),
+            semaphore,
+            f"{seg['index']}/{total}"
+        )
+        manifest.set_audio(seg["index"], path, duration=duration)
+
+    async with asyncio.TaskGroup() as tg:
+        for seg in pending:
+            tg.create_task(voice(seg))
+
+    return len(pending)
 
 
 # ---------------------------------------------
 # MAIN
 # ---------------------------------------------
 if __name__ == "__main__":
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    text_path = os.path.join(BASE_DIR, "output", "explanation.txt")
+    workspace = LessonWorkspace.legacy()
+
+    with open(workspace.explanation_path, "r", encoding="utf-8") as f:
+        narration = f.read()
+
+    manifest = SegmentManifest.for_workspace(workspace)
+    manifest.sync_text(narration)
+    print(f"Found {len(manifest.segments)} paragraphs ({len(manifest.pending('audio'))} need audio).")
 
-    paragraphs = load_paragraphs(text_path)
-    print(f"Found {len(paragraphs)} paragraphs.")
+    asyncio.run(generate_segment_audio(manifest, workspace))
 
-    asyncio.run(generate_audio(paragraphs))
+    cache = get_tts_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"\n🗂 TTS cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} reused), {stats['bytes'] / 1024 / 1024:.1f} MB")
 
     print("\n🎉 All audio files generated successfully!")
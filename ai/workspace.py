@@ -0,0 +1,167 @@
+import os
+import uuid
+import shutil
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scratch space for jobs in progress, and where finished lessons are published.
+WORKSPACES_ROOT = os.getenv("LESSON_WORKSPACES_ROOT", os.path.join(BASE_DIR, "output", "jobs"))
+PUBLISH_ROOT = os.getenv("LESSON_PUBLISH_ROOT", os.path.join(BASE_DIR, "output", "lessons"))
+
+# Final artifacts moved out of the scratch space on publish.
+PUBLISHED_ARTIFACTS = (
+    os.path.join("video", "final_video.mp4"),
+    "explanation.txt",
+    "image_prompts.txt",
+    "timings.json",
+)
+
+
+# ----------------------------
+# LESSON WORKSPACE
+# ----------------------------
+class LessonWorkspace:
+    """
+    Job-scoped directory layout shared by every stage, so several lessons
+    can be generated on one host without touching each other's files.
+
+        <root>/<job_id>/explanation.txt
+                       /image_prompts.txt
+                       /frames/frame_01.png (or .ppm) ...
+                       /audio/audio_1.wav ...
+                       /video/final_video.mp4
+
+    publish() moves the final artifacts to <publish_root>/<job_id>, a
+    symlink that is switched atomically to each new version; cleanup()
+    removes the scratch directory.
+    """
+
+    def __init__(self, job_id: str = None, root: str = WORKSPACES_ROOT, publish_root: str = PUBLISH_ROOT):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.root = os.path.join(root, self.job_id)
+        self.publish_dir = os.path.join(publish_root, self.job_id)
+
+    @classmethod
+    def legacy(cls):
+        """The shared ai/output layout used when a stage script is run by hand."""
+        return cls("output", root=BASE_DIR, publish_root=BASE_DIR)
+
+    def create(self):
+        os.makedirs(self.frames_dir, exist_ok=True)
+        os.makedirs(self.audio_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.video_path), exist_ok=True)
+        return self
+
+    # ----------------------------
+    # PATHS
+    # ----------------------------
+    def path(self, *parts) -> str:
+        return os.path.join(self.root, *parts)
+
+    @property
+    def explanation_path(self) -> str:
+        return self.path("explanation.txt")
+
+    @property
+    def prompts_path(self) -> str:
+        return self.path("image_prompts.txt")
+
+    @property
+    def frames_dir(self) -> str:
+        return self.path("frames")
+
+    @property
+    def audio_dir(self) -> str:
+        return self.path("audio")
+
+    @property
+    def video_path(self) -> str:
+        return self.path("video", "final_video.mp4")
+
+    @property
+    def timings_path(self) -> str:
+        return self.path("timings.json")
+
+    def frame_path(self, index: int, ext: str = "png") -> str:
+        return os.path.join(self.frames_dir, f"frame_{index:02d}.{ext}")
+
+    def audio_path(self, index: int) -> str:
+        return os.path.join(self.audio_dir, f"audio_{index}.wav")
+
+    # Manifest segments keep their id when they move, so their artifacts
+    # are named by id rather than by position.
+    def segment_frame_path(self, seg_id: str, ext: str = "png") -> str:
+        return os.path.join(self.frames_dir, f"frame_{seg_id}.{ext}")
+
+    def segment_audio_path(self, seg_id: str) -> str:
+        return os.path.join(self.audio_dir, f"audio_{seg_id}.wav")
+
+    # ----------------------------
+    # PUBLISH / CLEANUP
+    # ----------------------------
+    def publish(self, artifacts=PUBLISHED_ARTIFACTS) -> str:
+        """
+        Move the final artifacts into publish_dir. They are gathered in a
+        new versioned directory next to it, and publish_dir is a symlink
+        that one os.replace() switches over to it, so readers see either
+        the complete previous lesson or the complete new one. Where
+        symlinks aren't available, or publish_dir is still a plain
+        directory from an older publish, the old directory is renamed away
+        first and publish_dir is missing until the new one is renamed in.
+        Returns publish_dir.
+        """
+        if os.path.abspath(self.publish_dir) == os.path.abspath(self.root):
+            return self.publish_dir
+
+        parent = os.path.dirname(self.publish_dir)
+        os.makedirs(parent, exist_ok=True)
+        version = os.path.join(parent, f".{self.job_id}.{uuid.uuid4().hex[:12]}")
+
+        for rel in artifacts:
+            src = self.path(rel)
+            if not os.path.exists(src):
+                continue
+            dst = os.path.join(version, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(src, dst)
+        os.makedirs(version, exist_ok=True)
+
+        previous = os.path.realpath(self.publish_dir) if os.path.islink(self.publish_dir) else None
+        retired = None
+        if os.path.isdir(self.publish_dir) and previous is None:
+            retired = os.path.join(parent, f".{self.job_id}.retired-{os.getpid()}")
+            os.rename(self.publish_dir, retired)
+
+        link = os.path.join(parent, f".{self.job_id}.link-{os.getpid()}")
+        try:
+            if os.path.lexists(link):
+                os.remove(link)
+            os.symlink(os.path.basename(version), link, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            # No symlinks here: publish a plain directory instead
+            if previous:
+                os.remove(self.publish_dir)
+            os.rename(version, self.publish_dir)
+        else:
+            os.replace(link, self.publish_dir)
+
+        for old in (previous, retired):
+            if old:
+                shutil.rmtree(old, ignore_errors=True)
+        return self.publish_dir
+
+    def published_path(self, *parts) -> str:
+        return os.path.join(self.publish_dir, *parts)
+
+    def cleanup(self):
+        """Delete the scratch directory (intermediate frames, audio, prompts)."""
+        if os.path.abspath(self.publish_dir) == os.path.abspath(self.root):
+            return
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.create()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False